@@ -0,0 +1,314 @@
+""" An implementation of the TempoServer using asyncio, which can serve many peers
+    from a single thread. Messages are put in a send queue for each peer and written
+    by a separate task, so a slow peer does not hold up tempo changes being sent to
+    the others. Peers that stop reading or close their connection are removed.
+
+    Requires Python 3.5 or later.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+import socket
+import threading
+import time
+
+from .Code import WarningMsg
+from .ServerManager import Message, MESSAGE_HEADER, MAX_MESSAGE_SIZE
+from .ServerManager import default_codec, get_public_address, read_header, uses_legacy_header
+
+
+def current_task(loop):
+    """ Returns the task being run by `loop`, or None """
+    if hasattr(asyncio, "current_task"):
+        return asyncio.current_task(loop)
+    return asyncio.Task.current_task(loop)
+
+
+class Peer(object):
+    """ A TempoClient connected to an AsyncTempoServer """
+    def __init__(self, server, reader, writer):
+        self.server  = server
+        self.reader  = reader
+        self.writer  = writer
+        self.address = writer.get_extra_info("peername")
+        self.queue   = asyncio.Queue(maxsize=server.queue_size)
+        self.task    = None
+        self.closed  = False
+        self.legacy  = False
+
+    def __repr__(self):
+        return "<Peer {}>".format(self.address)
+
+    def send(self, data):
+        """ Adds data to the queue of messages to send """
+        return self.send_packet(Message(data, self.server.codec, self.legacy).encode())
+
+    def send_packet(self, packet):
+        """ Adds an encoded message to the queue. The peer is removed if it has
+            fallen too far behind """
+        if not self.closed:
+            try:
+                self.queue.put_nowait(packet)
+            except asyncio.QueueFull:
+                self.server.evict(self, "send queue is full", warn=True)
+        return
+
+    async def read_message(self):
+        """ Returns the next message from the peer and True if it has a 4 digit header """
+        header = await self.reader.readexactly(MESSAGE_HEADER.size)
+        bits, legacy = read_header(header)
+        if bits > MAX_MESSAGE_SIZE:
+            raise ValueError("Message of {} bytes is too large".format(bits))
+        data = await self.reader.readexactly(bits)
+        return (default_codec if legacy else self.server.codec).decode(data), legacy
+
+    async def read(self):
+        """ Returns the next message from the peer """
+        data, legacy = await self.read_message()
+        return data
+
+    async def write(self):
+        """ Sends each queued message in turn """
+        try:
+            while True:
+                packet = await self.queue.get()
+                self.writer.write(packet)
+                await asyncio.wait_for(self.writer.drain(), self.server.send_timeout)
+        except asyncio.TimeoutError:
+            self.server.evict(self, "timed out sending", warn=True)
+        except (ConnectionError, OSError):
+            self.server.evict(self, "connection lost")
+        return
+
+    def close(self):
+        """ Stops sending messages and closes the connection """
+        self.closed = True
+        # The writer task finishes by itself if it is the one closing the peer
+        if self.task is not None and self.task is not current_task(self.server.loop):
+            self.task.cancel()
+        self.writer.close()
+        return
+
+
+class AsyncTempoServer(object):
+    """ Used in TempoClock.py to connect to instances of FoxDot over a network in the
+        same way as ServerManager.TempoServer, but handles every peer in one asyncio
+        event loop running in its own thread.
+
+        - `queue_size` is the number of messages that can be waiting to be sent to a
+          peer before it is removed
+        - `send_timeout` is the number of seconds a peer can take to accept data
+        - `peer_timeout` is the number of seconds a peer can go without sending anything.
+          TempoClients send a ping every second. Older versions of FoxDot don't, so the
+          default of None never times out
+    """
+
+    def __init__(self, clock, port=57999, codec=None, queue_size=64, send_timeout=2.0, peer_timeout=None):
+        # tempo clock
+        self.metro = clock
+
+        # Encoding used for messages
+        self.codec = codec if codec is not None else default_codec
+
+        self.queue_size   = queue_size
+        self.send_timeout = send_timeout
+        self.peer_timeout = peer_timeout
+
+        # Address information
+        self.hostname = str(socket.gethostname())
+
+        # Listen on any IP
+        self.ip_addr  = "0.0.0.0"
+        self.port     = int(port)
+
+        self.ip_pub = get_public_address(self.hostname)
+
+        self.peers   = []
+        self.evicted = 0
+
+        # Bind now so that errors are raised here, like TempoServer
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.ip_addr, self.port))
+        self.socket.listen(128)
+        self.server_address = self.socket.getsockname()
+
+        self.loop   = asyncio.new_event_loop()
+        self.server = None
+        self.ready  = threading.Event()
+
+        self.server_thread = threading.Thread(target=self.run)
+        self.server_thread.daemon = True
+        self.running = False
+
+    def __str__(self):
+        return "{} on port {}\n".format(self.ip_pub, self.server_address[1])
+
+    def start(self):
+        """ Starts listening on the socket """
+
+        self.running = True
+        self.server_thread.start()
+        self.ready.wait()
+
+        return
+
+    def run(self):
+        """ Runs the event loop until the server is killed """
+        asyncio.set_event_loop(self.loop)
+
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.handle, sock=self.socket))
+
+        self.ready.set()
+
+        try:
+
+            self.loop.run_forever()
+
+        finally:
+
+            self.server.close()
+
+            for peer in list(self.peers):
+
+                self.evict(peer, "server closed")
+
+            tasks = asyncio.all_tasks(self.loop) if hasattr(asyncio, "all_tasks") else asyncio.Task.all_tasks(self.loop)
+
+            for task in tasks:
+
+                task.cancel()
+
+            self.loop.run_until_complete(asyncio.gather(self.server.wait_closed(), *tasks, return_exceptions=True))
+
+            self.loop.close()
+
+        return
+
+    async def handle(self, reader, writer):
+        """ Called for each new connection to the server """
+
+        peer = Peer(self, reader, writer)
+
+        peer.task = asyncio.ensure_future(peer.write())
+
+        reason = "client disconnected"
+
+        warn = False
+
+        try:
+
+            # First we get latency, and whether the peer can read binary headers
+
+            data, legacy = await asyncio.wait_for(peer.read_message(), self.peer_timeout)
+
+            peer.legacy = uses_legacy_header(data, legacy)
+
+            peer.send({"clock_time": time.time()})
+
+            self.peers.append(peer)
+
+            while not peer.closed:
+
+                data = await asyncio.wait_for(peer.read(), self.peer_timeout)
+
+                recv_time = time.time()
+
+                # Send back the time the ping was received and replied to
+
+                if "ping" in data:
+
+                    peer.send({"pong": [data["ping"], recv_time, time.time()]})
+
+                # Get the requested data and send to client
+
+                elif "request" in data:
+
+                    peer.send(self.metro.get_sync_info())
+
+                elif "new_bpm" in data:
+
+                    self.metro.update_tempo(data["new_bpm"])
+
+        except asyncio.TimeoutError:
+
+            reason = "timed out"
+
+            warn = True
+
+        except asyncio.IncompleteReadError:
+
+            pass
+
+        except (ConnectionError, OSError, ValueError, TypeError) as e:
+
+            reason = str(e)
+
+        finally:
+
+            self.evict(peer, reason, warn)
+
+        return
+
+    def evict(self, peer, reason, warn=False):
+        """ Closes the connection to a peer and stops sending it tempo changes. The
+            reason is shown if `warn` is True, or if the clock is debugging """
+        if not peer.closed:
+
+            peer.close()
+
+            if peer in self.peers:
+
+                self.peers.remove(peer)
+
+                self.evicted += 1
+
+                if warn or self.metro.debugging:
+
+                    WarningMsg("Client disconnected from {} ({})".format(peer.address, reason))
+
+        return
+
+    def broadcast(self, data):
+        """ Sends data to all peers without waiting for it to be sent. Can be called
+            from any thread """
+        if self.running:
+            self.loop.call_soon_threadsafe(self.send_to_peers, data)
+        return
+
+    def send_to_peers(self, data):
+        """ Sends data to all peers, encoding it once for each header format in use """
+        packets = {}
+        for peer in list(self.peers):
+            if peer.legacy not in packets:
+                try:
+                    packets[peer.legacy] = Message(data, self.codec, peer.legacy).encode()
+                except ValueError as e:
+                    packets[peer.legacy] = None
+                    print(e)
+            if packets[peer.legacy] is None:
+                self.evict(peer, "message too large", warn=True)
+            else:
+                peer.send_packet(packets[peer.legacy])
+        return
+
+    def update_tempo(self, bpm):
+        self.broadcast({"new_bpm": bpm})
+        return
+
+    def stats(self):
+        """ Returns the number of connected and removed peers and the messages waiting to be sent """
+        return {"peers": len(self.peers), "evicted": self.evicted,
+                "queued": sum(peer.queue.qsize() for peer in self.peers)}
+
+    def kill(self):
+        """ Properly terminates the server instance """
+        if self.running:
+            self.running = False
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.server_thread.join()
+        else:
+            self.socket.close()
+        return
@@ -16,10 +16,12 @@ from __future__ import absolute_import, division, print_function
 
 import fnmatch
 import os
+import threading
+import time
 import wave
 from contextlib import closing
 from itertools import chain
-from os.path import abspath, join, isabs, isfile, isdir, splitext
+from os.path import abspath, join, isabs, isfile, isdir, islink, splitext
 
 from .Code import WarningMsg
 from .Logging import Timing
@@ -135,7 +137,7 @@ nil = Buffer('', 0)
 
 
 class BufferManager(object):
-    def __init__(self, server=DefaultServer, paths=()):
+    def __init__(self, server=DefaultServer, paths=(), index=True):
         self._server = server
         self._max_buffers = server.max_buffers
         # Keep buffer 0 unallocated because we use it as the "nil" buffer
@@ -145,8 +147,25 @@ class BufferManager(object):
         self._paths = [FOXDOT_LOOP] + list(paths)
         self._ext = ['wav', 'wave', 'aif', 'aiff', 'flac']
 
+        # In-memory index of directory contents, dirname -> (mtime, dirs, files, walk_dirs)
+        self._dir_index = {}
+        # Results of sample lookups, (filename, index) -> path
+        self._sample_cache = {}
+        self._max_cached_samples = 10000
+        # Seconds between checking the index for changes in a background thread.
+        # None to only check directories when a sample is looked up for the first time
+        self._refresh_interval = None
+        self._refresh_thread = None
+
         self.loops = [fn.rsplit(".",1)[0] for fn in os.listdir(FOXDOT_LOOP)]
 
+        # Read the search paths into the index without holding up the clock
+        self._index_thread = None
+        if index:
+            self._index_thread = threading.Thread(target=self.buildIndex)
+            self._index_thread.daemon = True
+            self._index_thread.start()
+
     def __str__(self):
         return "\n".join(["%r: %s" % (k, v) for k, v in sorted(DESCRIPTIONS.items())])
 
@@ -172,6 +191,128 @@ class BufferManager(object):
     def addPath(self, path):
         """ Add a path to the search paths for samples """
         self._paths.append(abspath(path))
+        self._sample_cache = {}
+
+    def refresh(self, force=False):
+        """
+        Checks the modification time of every directory in the sample index
+        and forgets any that have changed, so that they are read again on the
+        next lookup, along with cached lookups of samples in them. If `force`
+        is True the whole index and cache are cleared. Returns True if the
+        index changed.
+
+        Call this after adding files to use them with a sample that has
+        already been looked up. It can also be called every few seconds in a
+        background thread (see `setRefreshInterval`).
+        """
+        if force:
+            self._dir_index = {}
+            self._sample_cache = {}
+            return True
+        changed = False
+        for dirname, entry in list(self._dir_index.items()):
+            if self._mtime(dirname) != entry[0]:
+                self._invalidate(dirname)
+                changed = True
+        return changed
+
+    def _mtime(self, dirname):
+        try:
+            return os.stat(dirname).st_mtime
+        except OSError:
+            return None
+
+    def _invalidate(self, dirname):
+        """ Forgets the contents of a directory and any cached lookups that found
+            a sample in it, or that found nothing """
+        self._dir_index.pop(dirname, None)
+        prefix = join(dirname, '')
+        self._sample_cache = dict((key, path) for key, path in list(self._sample_cache.items())
+                                  if path is not None and not path.startswith(prefix))
+
+    def buildIndex(self):
+        """ Reads every directory in the search paths into the sample index """
+        for root in list(self._paths):
+            for _ in self._walk(root):
+                pass
+
+    def setRefreshInterval(self, seconds):
+        """ Sets how often the sample index is checked for changes in a background
+            thread. Use None, the default, to only refresh the index on demand. """
+        self._refresh_interval = seconds
+        if seconds is not None:
+            self._startRefreshThread()
+
+    def _startRefreshThread(self):
+        if self._refresh_thread is None and self._refresh_interval is not None:
+            self._refresh_thread = threading.Thread(target=self._refreshLoop)
+            self._refresh_thread.daemon = True
+            self._refresh_thread.start()
+
+    def _refreshLoop(self):
+        self.buildIndex()
+        while self._refresh_interval is not None:
+            time.sleep(self._refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                WarningMsg("Could not refresh sample index: %s" % e)
+        self._refresh_thread = None
+
+    def _listDir(self, dirname, check=False):
+        """ Returns the index entry of a directory, reading it if need be. If `check`
+            is True, the directory is read again if it has changed """
+        entry = self._dir_index.get(dirname)
+        if entry is not None and check and self._mtime(dirname) != entry[0]:
+            self._invalidate(dirname)
+            entry = None
+        if entry is None:
+            mtime = os.stat(dirname).st_mtime
+            dirs, files, walk_dirs = [], [], []
+            for name in sorted(os.listdir(dirname)):
+                fullpath = join(dirname, name)
+                if isdir(fullpath):
+                    dirs.append(name)
+                    # Like os.walk, don't follow symbolic links to directories
+                    if not islink(fullpath):
+                        walk_dirs.append(name)
+                else:
+                    files.append(name)
+            entry = self._dir_index[dirname] = (mtime, dirs, files, walk_dirs)
+        return entry
+
+    def _walk(self, path, check=False):
+        """ Equivalent of os.walk that uses the index """
+        try:
+            _, dirs, files, walk_dirs = self._listDir(path, check)
+        except OSError:
+            return
+        yield path, dirs, files
+        for name in walk_dirs:
+            for item in self._walk(join(path, name), check):
+                yield item
+
+    def _lookupSample(self, filename, index=0):
+        """ Finds a sample using the cache of previous lookups """
+        key = (filename, index)
+        try:
+            return self._sample_cache[key]
+        except KeyError:
+            pass
+        self._startRefreshThread()
+        # Only the directories this lookup reads are checked for changes
+        path = self._findSample(filename, index, check=True)
+        # Index the search paths so that new files in them are noticed
+        for root in self._paths:
+            try:
+                self._listDir(root)
+            except OSError:
+                pass
+        cache = self._sample_cache
+        if len(cache) >= self._max_cached_samples:
+            cache = self._sample_cache = {}
+        cache[key] = path
+        return path
 
     def free(self, filenameOrBuf):
         """ Free a buffer. Accepts a filename or buffer number """
@@ -210,7 +351,7 @@ class BufferManager(object):
         dirname = symbolToDir(symbol)
         if dirname is None:
             return nil
-        samplepath = self._findSample(dirname, index)
+        samplepath = self._lookupSample(dirname, index)
         if samplepath is None:
             return nil
         return self._allocateAndLoad(samplepath)
@@ -267,10 +408,10 @@ class BufferManager(object):
                     return foundfile
         return None
 
-    def _getFileInDir(self, dirname, index):
+    def _getFileInDir(self, dirname, index, check=False):
         """ Return nth sample in a directory """
         candidates = []
-        for filename in sorted(os.listdir(dirname)):
+        for filename in self._listDir(dirname, check)[2]:
             name, ext = splitext(filename)
             if ext.lower()[1:] in self._ext:
                 fullpath = join(dirname, filename)
@@ -281,7 +422,7 @@ class BufferManager(object):
             return candidates[index % len(candidates)]
         return None
 
-    def _patternSearch(self, filename, index):
+    def _patternSearch(self, filename, index, check=False):
         """
         Return nth sample that matches a path pattern
 
@@ -298,11 +439,14 @@ class BufferManager(object):
             """ For a path pattern, find all subpaths that match """
             # ** is a special case meaning "all recursive directories"
             if pattern == '**':
-                for dirpath, _, _ in os.walk(path):
+                for dirpath, _, _ in self._walk(path, check):
                     yield dirpath
             else:
-                children = os.listdir(path)
-                for c in fnmatch.filter(children, pattern):
+                try:
+                    _, dirs, files, _ = self._listDir(path, check)
+                except OSError:
+                    return
+                for c in fnmatch.filter(sorted(dirs + files), pattern):
                     yield join(path, c)
 
         candidates = []
@@ -320,8 +464,8 @@ class BufferManager(object):
         match_base = not hasext(filepat)
 
         for path in queue:
-            for subpath, _, filenames in os.walk(path):
-                for filename in sorted(filenames):
+            for subpath, _, filenames in self._walk(path, check):
+                for filename in filenames:
                     basename, ext = splitext(filename)
                     if ext[1:].lower() not in self._ext:
                         continue
@@ -339,12 +483,13 @@ class BufferManager(object):
         return None
 
     @Timing('bufferSearch', logargs=True)
-    def _findSample(self, filename, index=0):
+    def _findSample(self, filename, index=0, check=False):
         """
         Find a sample from a filename or pattern
 
         Will first attempt to find an exact match (by abspath or relative to
         the search paths). Then will attempt to pattern match in search paths.
+        If `check` is True, indexed directories that have changed are read again.
 
         """
         path = self._searchPaths(filename)
@@ -354,7 +499,7 @@ class BufferManager(object):
                 return path
             # If it's a dir, use one of the samples in that dir
             elif isdir(path):
-                foundfile = self._getFileInDir(path, index)
+                foundfile = self._getFileInDir(path, index, check)
                 if foundfile:
                     return foundfile
                 else:
@@ -366,7 +511,7 @@ class BufferManager(object):
         else:
             # If we couldn't find a dir or file with this name, then we use it
             # as a pattern and recursively walk our paths
-            foundfile = self._patternSearch(filename, index)
+            foundfile = self._patternSearch(filename, index, check)
             if foundfile:
                 return foundfile
             WarningMsg("Could not find any sample matching %r" % filename)
@@ -374,7 +519,7 @@ class BufferManager(object):
 
     def loadBuffer(self, filename, index=0):
         """ Load a sample and return the number of a buffer """
-        samplepath = self._findSample(filename, index)
+        samplepath = self._lookupSample(filename, index)
         if samplepath is None:
             return 0
         else:
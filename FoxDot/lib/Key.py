@@ -3,9 +3,18 @@ from __future__ import absolute_import, division, print_function
 from .Patterns import *
 from .TimeVar import TimeVar
 from functools import partial
+from itertools import count
 
 
 class NumberKey(object):
+
+    # The version is changed whenever the value of any PlayerKey changes so that
+    # values stored by `now` are only re-used while nothing they depend on changes
+
+    memoize  = True
+    version  = 0
+    versions = count(1)
+
     def __init__(self, value, reference):
         # the number to store/update
         self.value = value
@@ -16,6 +25,15 @@ class NumberKey(object):
 
         # If p1 is using p2.degree then p1.degree.parent == p1 and p1.degree.value.parent == p2
 
+        # The version and value last returned by `now`
+        self.memo = None
+
+    @classmethod
+    def changed(cls):
+        """ Called when the value of a PlayerKey changes """
+        NumberKey.version = next(cls.versions)
+        return
+
     # Storing mathematical operations
 
     @staticmethod
@@ -456,8 +474,41 @@ class NumberKey(object):
     def child(self, other):
         return NumberKey(self.value, other)
     
+    def depends_on_time(self):
+        """ Returns True if this key uses a TimeVar, so its value can change without
+            any PlayerKey changing """
+        for item in (self.value, self.other):
+            if isinstance(item, TimeVar):
+                return True
+            if isinstance(item, NumberKey) and item.depends_on_time():
+                return True
+        return False
+
     def now(self, other=None):
-        """ Returns the current value in the Key by calling the parent """
+        """ Returns the current value in the Key by calling the parent. The value is
+            stored and re-used until the value of a PlayerKey changes so that a chain
+            of keys used by many players is only evaluated once per change. """
+
+        if other is not None or not self.memoize:
+
+            return self.evaluate(other)
+
+        version = NumberKey.version
+
+        if self.memo is not None and self.memo[0] == version:
+
+            return self.memo[1]
+
+        value = self.evaluate()
+
+        if not self.depends_on_time():
+
+            self.memo = (version, value)
+
+        return value
+
+    def evaluate(self, other=None):
+        """ Works out the current value in the Key from the keys it depends on """
 
         # If we have p1.degree + 2 then self.value is 2 and self.other is p1.degree
         
@@ -505,6 +556,7 @@ class PlayerKey(NumberKey):
     def set(self, value, time):
         self.value = value
         self.last_updated = time
+        self.changed()
         return
     
     def update(self, value, time):
@@ -519,6 +571,7 @@ class PlayerKey(NumberKey):
                     self.value = PGroup(self.value, value)
             else:
                 self.value = value
+            self.changed()
         self.last_updated = time
         return
 
@@ -275,8 +275,110 @@ class OSCMessage(object):
 	def clearData(self):
 		"""Clear any arguments appended so far
 		"""
-		self.typetags = ","
-		self.message  = bytes()
+		self._tags   = [","]
+		self._buffer = bytearray(64)
+		self._size   = 0
+
+	def _getTypetags(self):
+		return "".join(self._tags)
+
+	def _setTypetags(self, typetags):
+		self._tags = list(typetags)
+
+	typetags = property(_getTypetags, _setTypetags, doc="The typetag string, starting with ','")
+
+	def _getMessage(self):
+		return bytes(self._buffer[:self._size])
+
+	def _setMessage(self, message):
+		self._buffer = bytearray(message)
+		self._size   = len(self._buffer)
+
+	message = property(_getMessage, _setMessage, doc="The encoded arguments appended so far")
+
+	def _reserve(self, size):
+		"""Grows the buffer (by at least doubling it) so that another 'size' bytes can be written
+		"""
+		needed = self._size + size
+		if needed > len(self._buffer):
+			self._buffer.extend(bytes(max(needed, 2 * len(self._buffer)) - len(self._buffer)))
+
+	def _write(self, binary):
+		"""Copies already encoded data into the buffer
+		"""
+		size = len(binary)
+		self._reserve(size)
+		self._buffer[self._size:self._size + size] = binary
+		self._size += size
+
+	def _appendArgument(self, argument, typehint=None):
+		"""Encodes a single argument straight into the buffer
+		"""
+		if typehint is None:
+			if type(argument) in FloatTypes:
+				self._reserve(4)
+				_float_struct.pack_into(self._buffer, self._size, float(argument))
+				self._size += 4
+				self._tags.append('f')
+				return
+			elif type(argument) in IntTypes:
+				self._reserve(4)
+				_int_struct.pack_into(self._buffer, self._size, int(argument))
+				self._size += 4
+				self._tags.append('i')
+				return
+			elif type(argument) is str:
+				binary = _OSCStringCached(argument)
+				tag = 's'
+			else:
+				tag, binary = OSCArgument(argument, typehint)
+		elif typehint == 'b':
+			binary = OSCBlob(argument)
+			tag = 'b'
+		elif typehint == 't':
+			binary = OSCTimeTag(argument)
+			tag = 't'
+		else:
+			tag, binary = OSCArgument(argument, typehint)
+
+		self._write(binary)
+		self._tags.append(tag)
+
+	def _appendList(self, arguments):
+		"""Encodes a list of floats, ints and strings using a single struct.pack_into
+		call. Any other arguments are appended one at a time.
+		"""
+		fmt, values, tags = [">"], [], []
+		for arg in arguments:
+			if type(arg) in FloatTypes:
+				fmt.append("f")
+				values.append(float(arg))
+				tags.append("f")
+			elif type(arg) in IntTypes:
+				fmt.append("i")
+				values.append(int(arg))
+				tags.append("i")
+			elif type(arg) is str:
+				binary = _OSCStringCached(arg)
+				fmt.append("%ds" % len(binary))
+				values.append(binary)
+				tags.append("s")
+			else:
+				self._pack(fmt, values, tags)
+				fmt, values, tags = [">"], [], []
+				self.append(arg)
+		self._pack(fmt, values, tags)
+
+	def _pack(self, fmt, values, tags):
+		"""Packs values straight into the buffer
+		"""
+		if len(values):
+			fmt = "".join(fmt)
+			size = struct.calcsize(fmt)
+			self._reserve(size)
+			struct.pack_into(fmt, self._buffer, self._size, *values)
+			self._size += size
+			self._tags.extend(tags)
 
 	def append(self, argument, typehint=None):
 		"""Appends data to the message, updating the typetags based on
@@ -291,31 +393,20 @@ class OSCMessage(object):
 			raise TypeError("Can only append 'OSCMessage' to 'OSCBundle'")
 		
 		if isinstance(argument, (tuple, list)):
-                        for arg in argument:
-                                self.append(arg, typehint)
-                        
-                        return
-        
-		if typehint == 'b':
-			binary = OSCBlob(argument)
-			tag = 'b'
-		elif typehint == 't':
-			binary = OSCTimeTag(argument)
-			tag = 't'
-		else:
-			tag, binary = OSCArgument(argument, typehint)
+			if typehint is None:
+				self._appendList(argument)
+			else:
+				for arg in argument:
+					self.append(arg, typehint)
+
+			return
 
-		self.typetags += tag
-		self.message += binary
+		self._appendArgument(argument, typehint)
 		
 	def getBinary(self):
 		"""Returns the binary representation of the message
 		"""
-		binary = OSCString(self.address)
-		binary += OSCString(self.typetags)
-		binary += self.message
-		
-		return binary
+		return b"".join((OSCString(self.address), OSCString(self.typetags), memoryview(self._buffer)[:self._size]))
 
 	def __repr__(self):
 		"""Returns a string containing the decode Message
@@ -330,7 +421,7 @@ class OSCMessage(object):
 	def __len__(self):
 		"""Returns the number of arguments appended so far
 		"""
-		return (len(self.typetags) - 1)
+		return (len(self._tags) - 1)
 	
 	def __eq__(self, other):
 		"""Return True if two OSCMessages have the same address & content
@@ -655,17 +746,13 @@ class OSCBundle(OSCMessage):
 			
 			binary = OSCBlob(msg.getBinary())
 
-		self.message += binary
-		self.typetags += 'b'
+		self._write(binary)
+		self._tags.append('b')
 		
 	def getBinary(self):
 		"""Returns the binary representation of the message
 		"""
-		binary = OSCString("#bundle")
-		binary += OSCTimeTag(self.timetag)
-		binary += self.message
-		
-		return binary
+		return b"".join((_bundle_string, OSCTimeTag(self.timetag), memoryview(self._buffer)[:self._size]))
 
 	def _reencapsulate(self, decoded):
 		if decoded[0] == "#bundle":
@@ -725,6 +812,27 @@ def OSCString(next):
 		next = str(next)
 	return struct.pack(">%ds" % (OSCstringLength), next)
 
+_float_struct = struct.Struct(">f")
+_int_struct   = struct.Struct(">i")
+
+_bundle_string = OSCString("#bundle")
+
+# Encoded strings that have been used as arguments e.g. SynthDef and argument names
+_string_cache = {}
+_string_cache_size = 1024
+
+def _OSCStringCached(next):
+	"""Returns OSCString(next), re-using the encoding of strings seen before
+	"""
+	try:
+		return _string_cache[next]
+	except KeyError:
+		binary = OSCString(next)
+		if len(_string_cache) >= _string_cache_size:
+			_string_cache.clear()
+		_string_cache[next] = binary
+		return binary
+
 def OSCBlob(next):
 	"""Convert a string into an OSC Blob.
 	An OSC-Blob is a binary encoded block of data, prepended by a 'size' (int32).
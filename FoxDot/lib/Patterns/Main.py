@@ -79,6 +79,10 @@ class metaPattern(object):
     bracket_style = "[]"
     debugging = False
 
+    # Expanded values of a materialized Pattern, see `materialize`
+    _expanded = None
+    max_materialized = 65536
+
     def __init__(self, data=[]):
 
         # Keep track of the names of any Pattern sub-classes that
@@ -120,6 +124,8 @@ class metaPattern(object):
             8
             ```
         """
+        if self._expanded is not None:
+            return len(self._expanded)
         lengths = [1] + [len(p) for p in self.data if isinstance(p, Pattern)]
         return LCM(*lengths) * len([item for item in self.data if not isinstance(item, EmptyItem)])
     
@@ -178,7 +184,55 @@ class metaPattern(object):
         new.__dict__ = {key: value for key, value in self.__dict__.items()}
         if new_data is not None:
             new.data = new_data
+            new._invalidate()
         return new
+
+    def materialize(self, max_size=None):
+        """ Stores the values of the expanded Pattern in a flat list so that
+            indexing, iterating, and finding the length don't need to recurse
+            into nested Patterns. Only possible for Patterns of fixed values
+            i.e. no generators or empty items. The list is discarded when the
+            Pattern is changed using its own methods, but not if a nested
+            Pattern is changed directly. Returns True if the Pattern was
+            materialized.
+            ```
+            >>> pat = P[0,1,2,[3,4]]
+            >>> pat.materialize()
+            True
+            >>> pat[7]
+            4
+            ```
+        """
+        if self._expanded is not None:
+            return True
+        if not self.is_static():
+            return False
+        size = len(self)
+        if size == 0 or size > (max_size or self.max_materialized):
+            return False
+        self._expanded = [self.getitem(i) for i in range(size)]
+        return True
+
+    def _invalidate(self):
+        """ Discards any values worked out from the data, called when it changes """
+        self._expanded = None
+        self.__dict__.pop("_expanded_len", None)
+
+    def is_materialized(self):
+        """ Returns True if the Pattern's expanded values are stored """
+        return self._expanded is not None
+
+    def is_static(self):
+        """ Returns True if indexing the Pattern always returns the same
+            values i.e. it only contains fixed values and nested Patterns """
+        if type(self) is not Pattern:
+            return False
+        for item in self.data:
+            if isinstance(item, (EmptyItem, GeneratorPattern)):
+                return False
+            if isinstance(item, Pattern) and not item.is_static():
+                return False
+        return True
     
     # Pattern container methods
  
@@ -189,6 +243,9 @@ class metaPattern(object):
 
     def getitem(self, key, get_generator=False):
         """ Is called by __getitem__ """
+        # Materialized patterns are a single list lookup
+        if self._expanded is not None and type(key) is int:
+            return self._expanded[key % len(self._expanded)]
         # We can get multiple values by indexing with a pattern or tuple
         if isinstance(key, (metaPattern, tuple)):
             val = self.__class__([self.getitem(n) for n in key])
@@ -207,6 +264,7 @@ class metaPattern(object):
         return val
     
     def __setitem__(self, key, value):
+        self._invalidate()
         if isinstance(key, slice):
             self.data[key] = Format(value) # TODO - make sure this works
         else:
@@ -222,10 +280,15 @@ class metaPattern(object):
         return
 
     def setitem(self, key, value):
+        self._invalidate()
         self.data[key] = Format(value)
             
     def __iter__(self):
         """ Returns a generator object for this Pattern """
+        if self._expanded is not None:
+            for item in self._expanded:
+                yield item
+            return
         for i in range(len(self)):
             yield self.getitem(i)
 
@@ -247,6 +310,7 @@ class metaPattern(object):
             
     def __setslice__(self, i, j, item):
         """ Only works in Python 2 """
+        self._invalidate()
         self.data[i:j] = Format(item)
 
     # Integer returning
@@ -323,8 +387,14 @@ class metaPattern(object):
     def __ne__(self, other):
         return PNe(self, other)
     def eq(self, other):
+        values = PEqual(self, asStream(other))
+        if values is not None:
+            return self.__class__(values)
         return self.__class__([int(value == modi(asStream(other), i)) for i, value in enumerate(self)])
     def ne(self, other):
+        values = PNotEqual(self, asStream(other))
+        if values is not None:
+            return self.__class__(values)
         return self.__class__([int(value != modi(asStream(other), i)) for i, value in enumerate(self)])
     # def gt(self, other):
     #     return self.__class__([int(value > modi(asStream(other), i)) for i, value in enumerate(self)])
@@ -336,8 +406,11 @@ class metaPattern(object):
     #     return self.__class__([int(value <= modi(asStream(other), i)) for i, value in enumerate(self)])
     def __gt__(self, other):
         #return self.__class__([int(value > modi(asStream(other), i)) for i, value in enumerate(self)])
-        values = []
         other = asStream(other)
+        values = PGt(self, other)
+        if values is not None:
+            return self.__class__(values)
+        values = []
         for i, value in enumerate(self): # possibly LCM in future
             value = value > other[i]
             if not isinstance(value, PGroup):
@@ -347,8 +420,11 @@ class metaPattern(object):
 
     def __ge__(self, other):
         #return self.__class__([int(value >= modi(asStream(other), i)) for i, value in enumerate(self)])
-        values = []
         other = asStream(other)
+        values = PGe(self, other)
+        if values is not None:
+            return self.__class__(values)
+        values = []
         for i, value in enumerate(self): # possibly LCM in future
             value = value >= other[i]
             if not isinstance(value, PGroup):
@@ -358,8 +434,11 @@ class metaPattern(object):
 
     def __lt__(self, other):
         #return self.__class__([int(value < modi(asStream(other), i)) for i, value in enumerate(self)])
-        values = []
         other = asStream(other)
+        values = PLt(self, other)
+        if values is not None:
+            return self.__class__(values)
+        values = []
         for i, value in enumerate(self): # possibly LCM in future
             value = value < other[i]
             if not isinstance(value, PGroup):
@@ -369,8 +448,11 @@ class metaPattern(object):
 
     def __le__(self, other):
         #return self.__class__([int(value <= modi(asStream(other), i)) for i, value in enumerate(self)])
-        values = []
         other = asStream(other)
+        values = PLe(self, other)
+        if values is not None:
+            return self.__class__(values)
+        values = []
         for i, value in enumerate(self): # possibly LCM in future
             value = value <= other[i]
             if not isinstance(value, PGroup):
@@ -692,6 +774,7 @@ class metaPattern(object):
         return new
 
     def append(self, item):
+        self._invalidate()
         self.data.append(item)
         self.make()
         return self
@@ -703,22 +786,27 @@ class metaPattern(object):
         return new
     
     def i_rotate(self, n=1):
+        self._invalidate()
         self.data = self.data[n:] + self.data[0:n]
         return self
 
     def i_reverse(self):
+        self._invalidate()
         self.data.reverse()
         return self
 
     def i_sort(self):
+        self._invalidate()
         self.data = Pattern(sorted(self.data))
         return self
 
     def i_shuf(self):
+        self._invalidate()
         shuffle(self.data)
         return self
 
     def set(self, index, value):
+        self._invalidate()
         self.data[index] = asStream(value)
         return self
 
@@ -845,6 +933,8 @@ class metaPattern(object):
     def make(self):
         """ This method automatically laces and groups the data """
 
+        self._invalidate()
+
         #: Force data into an iterable form
         if isinstance(self.data, str):
 
@@ -880,6 +970,9 @@ class PGroup(metaPattern):
     
     bracket_style = "()"
 
+    # Expanded length, stored by `get_expanded_len` as PGroups are rarely changed
+    _expanded_len = None
+
     def __init__(self, seq=[], *args):
 
         if not args:
@@ -914,6 +1007,7 @@ class PGroup(metaPattern):
             self.data = new_data
 
     def extend(self, item):
+        self._invalidate()
         self.data.extend(item)
         return self
 
@@ -2,10 +2,54 @@ from __future__ import absolute_import, division, print_function
 
 from ..Utils import *
 
+try:
+    import numpy as _numpy
+except ImportError:
+    _numpy = None
+
 """
     Module for key operations on Python lists or FoxDot Patterns
 """
 
+# Patterns of numbers with at least this many values are operated on using NumPy, if installed
+NUMPY_THRESHOLD = 64
+
+def _numeric_array(data):
+    """ Returns the values of a list as a NumPy array if they are all ints
+        or all floats, otherwise None. Ints are limited in size so that
+        operations on them can't overflow a 64-bit int. """
+    types = set(map(type, data))
+    if len(types) != 1:
+        return None
+    dtype = types.pop()
+    if dtype is float:
+        return _numpy.array(data, dtype=_numpy.float64)
+    if dtype is int and -2**31 < min(data) and max(data) < 2**31:
+        return _numpy.array(data, dtype=_numpy.int64)
+    return None
+
+def _operate_arrays(ufunc, A, B, length, integers=True):
+    """ Returns the result of a NumPy function applied to two lists of
+        numbers as a list, or None if it can't be done exactly as the
+        element-wise Python operation would. """
+    a = _numeric_array(A)
+    if a is None:
+        return None
+    b = _numeric_array(B)
+    if b is None:
+        return None
+    if not integers and a.dtype.kind == b.dtype.kind == "i":
+        return None
+    try:
+        with _numpy.errstate(all="ignore"):
+            result = ufunc(_numpy.resize(a, length), _numpy.resize(b, length))
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+    # Leave errors, such as dividing by zero, for the Python loop to handle
+    if result.dtype.kind == "f" and not _numpy.isfinite(result).all():
+        return None
+    return result.tolist()
+
 PATTERN_WEIGHTS = ["Pattern", "PGroupPrime", "PGroup"]
 
 def DominantPattern(*patterns):
@@ -21,10 +65,24 @@ def DominantPattern(*patterns):
 
 class POperand:
 
-    def __init__(self, func):
+    def __init__(self, func, ufunc=None, swap=False, integers=True):
         
         self.operate = func
 
+        # NumPy equivalent of func, used for long patterns of numbers
+
+        self.ufunc = None
+
+        if _numpy is not None and ufunc is not None:
+
+            ufunc = getattr(_numpy, ufunc)
+
+            self.ufunc = (lambda a, b: ufunc(b, a)) if swap else ufunc
+
+        # If False, the NumPy function isn't used when both patterns are ints
+
+        self.integers = integers
+
     def __call__(self, A, B):
         """ A is always a Pattern or PGroup.
         """
@@ -48,7 +106,19 @@ class POperand:
 
         i, length = 0, LCM(len(A.data), len(B.data))
 
-        P1 = []
+        P1 = None
+
+        if self.ufunc is not None and length >= NUMPY_THRESHOLD:
+
+            P1 = _operate_arrays(self.ufunc, A.data, B.data, length, self.integers)
+
+            if P1 is not None:
+
+                i = length
+
+        if P1 is None:
+
+            P1 = []
 
         while i < length:
 
@@ -91,27 +161,55 @@ def rXor(a, b): return b ^ a
 def rOr(a, b):  return b | a
 
 # Pattern operations
-PAdd = POperand(Add)
+PAdd = POperand(Add, "add")
 
-PSub = POperand(Sub)
-PSub2 = POperand(rSub)
+PSub = POperand(Sub, "subtract")
+PSub2 = POperand(rSub, "subtract", swap=True)
 
-PMul = POperand(Mul)
+PMul = POperand(Mul, "multiply")
 
-PDiv = POperand(Div)
-PDiv2 = POperand(rDiv)
+PDiv = POperand(Div, "true_divide")
+PDiv2 = POperand(rDiv, "true_divide", swap=True)
 
-PFloor = POperand(FloorDiv)
-PFloor2 = POperand(rFloorDiv)
+PFloor = POperand(FloorDiv, "floor_divide")
+PFloor2 = POperand(rFloorDiv, "floor_divide", swap=True)
 
-PMod = POperand(Mod)
-PMod2 = POperand(rMod)
+PMod = POperand(Mod, "remainder")
+PMod2 = POperand(rMod, "remainder", swap=True)
 
-PPow = POperand(Pow)
-PPow2 = POperand(rPow)
+# Python ints to a power are exact (or floats if negative) so aren't done in NumPy
+PPow = POperand(Pow, "power", integers=False)
+PPow2 = POperand(rPow, "power", swap=True, integers=False)
 
 PGet = POperand(Get)
 
 # Pattern comparisons -> need to maybe have a equals func?
 PEq = lambda a, b: (all([int(a[i]==b[i]) for i in range(len(a))]) if len(a) == len(b) else False) if a.__class__ == b.__class__ else False
-PNe = lambda a, b: (any([int(a[i]!=b[i]) for i in range(len(a))]) if len(a) == len(b) else True) if a.__class__ == b.__class__ else True
\ No newline at end of file
+PNe = lambda a, b: (any([int(a[i]!=b[i]) for i in range(len(a))]) if len(a) == len(b) else True) if a.__class__ == b.__class__ else True
+
+class PComparison:
+    """ Element-wise comparison of a Pattern of numbers with another using
+        NumPy. Calling returns a list of 0s and 1s, or None if the Patterns
+        are too short or contain anything other than numbers, in which case
+        the comparison is done in Python. """
+
+    def __init__(self, ufunc):
+
+        self.ufunc = getattr(_numpy, ufunc) if _numpy is not None else None
+
+    def __call__(self, A, B):
+
+        if self.ufunc is None or len(A.data) < NUMPY_THRESHOLD:
+
+            return None
+
+        values = _operate_arrays(self.ufunc, A.data, B.data, len(A.data))
+
+        return [int(value) for value in values] if values is not None else None
+
+PGt = PComparison("greater")
+PGe = PComparison("greater_equal")
+PLt = PComparison("less")
+PLe = PComparison("less_equal")
+PEqual = PComparison("equal")
+PNotEqual = PComparison("not_equal")
@@ -8,11 +8,14 @@
 from __future__ import absolute_import, division, print_function
 
 import re
+import threading
+
+from collections import OrderedDict
 
 from .PlayString import *
 from .Generators import PRand
 from .PGroups    import PGroupMod
-from .Main       import Pattern, metaPattern, PatternMethod, PGroup
+from .Main       import Pattern, metaPattern, PatternMethod, PGroup, GeneratorPattern
 
 from ..Utils import modi, LCM
 
@@ -23,11 +26,86 @@ re_arrow  = r"<.*?>"
 square_type=PGroupMod
 braces_type=PRand
 
+class PlayStringCache(object):
+    """ Stores the output of parsing the most recently used play strings so that
+        re-evaluating a player with an unchanged string does not parse it again.
+        Items are copied on the way out so that no two players share any Patterns
+        or random generators. """
+    def __init__(self, size=256):
+        self.size   = size
+        self.items  = OrderedDict()
+        self.lock   = threading.Lock()
+        self.hits   = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, string):
+        """ Returns a copy of the parsed `string` or None if it is not stored """
+        with self.lock:
+            output = self.items.pop(string, None)
+            if output is None:
+                self.misses += 1
+                return None
+            self.items[string] = output # Move to the most recently used end
+            self.hits += 1
+        return fresh_copy(output)
+
+    def add(self, string, output):
+        """ Stores the parsed `string`, discarding the least recently used if full """
+        if not self.size:
+            return
+        with self.lock:
+            self.items[string] = fresh_copy(output)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+        return
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+        return
+
+    def resize(self, size):
+        """ Sets the number of play strings to store, 0 disables the cache """
+        with self.lock:
+            self.size = size
+            while len(self.items) > (size or 0):
+                self.items.popitem(last=False)
+        return
+
+    def stats(self):
+        return {"size": len(self.items), "hits": self.hits, "misses": self.misses}
+
+play_string_cache = PlayStringCache()
+
 def ParsePlayString(string):
     """ Returns the parsed play string used by sample player """
-    output, _ = feed(string)
+    output = play_string_cache.get(string)
+    if output is None:
+        output, _ = feed(string)
+        play_string_cache.add(string, output)
     return output
 
+def fresh_copy(item):
+    """ Returns a copy of a parsed play string item that has the same values but
+        does not share any lists, Patterns, or generator state with the original """
+    if isinstance(item, str):
+        return item
+    elif isinstance(item, list):
+        return [fresh_copy(value) for value in item]
+    elif isinstance(item, metaPattern):
+        # Same as `true_copy` but skips the call to `__init__`
+        new = item.__class__.__new__(item.__class__)
+        new.__dict__ = dict(item.__dict__)
+        new.data = [fresh_copy(value) for value in item.data]
+        new._invalidate()
+        return new
+    elif isinstance(item, GeneratorPattern):
+        return item.__class__(*[fresh_copy(arg) for arg in item.args], **item.kwargs)
+    return item
+
 def arrow_zip(pat1, pat2):
     """ Zips two patterns together. If one item is a tuple, it extends the tuple / PGroup
         i.e. arrow_zip([(0,1),3], [2]) -> [(0,1,2),(3,2)]
@@ -59,19 +137,27 @@ def arrow_zip(pat1, pat2):
 
     return output
 
-def feed(string):
+def feed(string, start=0, stop=None):
     """ Used to recursively parse nested strings, returns a list object (not Pattern),
-        and a boolean denoting if the list contains a nested list """
-    
-    string = PlayString(string)
+        and a boolean denoting if the list contains a nested list. Nested strings
+        are parsed in place using `start` and `stop` instead of being copied. """
+
+    if not isinstance(string, PlayString):
+
+        string = PlayString(string)
+
+    if stop is None:
+
+        stop = len(string)
+
     items  = [] # The actual pattern
 
     layer_pattern = False
     contains_nest = False
     
-    i = 0
+    i = start
     
-    while i < len(string):
+    while i < stop:
 
         char = string[i]
 
@@ -79,12 +165,10 @@ def feed(string):
         if char == "<":
 
             # Parse the contents of the brackets if found
-            j = string.index(">", start=i+1)
-            s = string[i+1:j]
+            j = string.index(">", start=i+1, stop=stop)
+            chars, _ = feed(string, i+1, j)
             i = j
 
-            chars, _ = feed(s)
-
             if len(chars) == 0:
 
                 e = "Empty '<>' brackets in string"
@@ -107,13 +191,11 @@ def feed(string):
         elif char == "(":
 
             # Parse the contents of the brackets if found
-            j = string.index(")", start=i+1)
+            j = string.index(")", start=i+1, stop=stop)
             
-            s = string[i+1:j]
+            chars, _ = feed(string, i+1, j)
             i = j
 
-            chars, _ = feed(s)
-
             if len(chars) == 0:
 
                 e = "Empty '()' brackets in string"
@@ -130,12 +212,10 @@ def feed(string):
         elif char == "{":
 
             # Parse the contents of the brackets if found
-            j = string.index("}", start=i+1)
-            s = string[i+1:j]
+            j = string.index("}", start=i+1, stop=stop)
+            chars, _ = feed(string, i+1, j)
             i = j
 
-            chars, _ = feed(s)
-
             if len(chars) == 0:
 
                 e = "Empty '{}' brackets in string"
@@ -149,12 +229,10 @@ def feed(string):
         # Look for a '[]'
         elif char == "[":
             
-            j = string.index("]", start=i+1)
-            s = string[i+1:j]
+            j = string.index("]", start=i+1, stop=stop)
+            chars, contains_nest = feed(string, i+1, j)
             i = j
 
-            chars, contains_nest = feed(s)
-
             if len(chars) == 0:
 
                 e = "Empty '[]' brackets in string"
@@ -13,6 +13,10 @@ br_pairs = {"(":")",
             "]":"[",
             "{":"}",
             "}":"{"}
+br_open  = {")":"(",
+            "]":"[",
+            "}":"{",
+            ">":"<"}
 
 class ParseError(Exception):
     pass
@@ -23,6 +27,7 @@ class PlayString:
     def __init__(self, string):
         self.string   = list(string)
         self.original = str(string)
+        self.pairs    = match_brackets(self.string)
     def __repr__(self):
         return repr(self.string)
     def __len__(self):
@@ -31,17 +36,41 @@ class PlayString:
         return self.string[key]
     def __setitem__(self, key, value):
         self.string[key] = value
-    def index(self, sub, start=0):
-        """ Returns the index of the closing bracket """
+        self.pairs = match_brackets(self.string)
+    def index(self, sub, start=0, stop=None):
+        """ Returns the index of the closing bracket, which must come before `stop` """
         br = "([{<"[")]}>".index(sub)]
-        count = 0
-        for i in range(start, len(self.string)):
-            char = self.string[i]
-            if char == br:
-                count += 1
-            elif char == sub:
-                if count > 0:
-                    count -= 1
-                else:
-                    return i
-        raise ParseError("Closing bracket '%s' missing in string '%s'" % (sub, self.original))
\ No newline at end of file
+        stop = len(self.string) if stop is None else stop
+        if start > 0 and self.string[start - 1] == br:
+            # Opening bracket is just before start so use the look-up table
+            i = self.pairs.get(start - 1, stop)
+            if i < stop:
+                return i
+        else:
+            count = 0
+            for i in range(start, stop):
+                char = self.string[i]
+                if char == br:
+                    count += 1
+                elif char == sub:
+                    if count > 0:
+                        count -= 1
+                    else:
+                        return i
+        raise ParseError("Closing bracket '%s' missing in string '%s'" % (sub, self.original))
+
+def match_brackets(string):
+    """ Returns a dictionary of the index of each opening bracket in `string` to the
+        index of its closing bracket, found in a single pass. Only brackets of the
+        same type are counted when matching them, so "(x[o)]" pairs 0 with 4 and 2
+        with 5. """
+    stacks = {"(": [], "[": [], "{": [], "<": []}
+    pairs  = {}
+    for i, char in enumerate(string):
+        if char in stacks:
+            stacks[char].append(i)
+        elif char in br_open:
+            stack = stacks[br_open[char]]
+            if stack:
+                pairs[stack.pop()] = i
+    return pairs
@@ -147,6 +147,11 @@ from __future__ import absolute_import, division, print_function
 from os.path import dirname
 from random import shuffle, choice
 from copy import copy, deepcopy
+from fractions import Fraction
+from bisect import bisect_left
+
+import sys
+import threading
 
 from .Settings import SamplePlayer, LoopPlayer
 from .Code import WarningMsg, debug_stdout
@@ -160,12 +165,12 @@ from .Repeat import *
 from .Patterns import *
 from .Midi import *
 
-from .Root import Root
+from .Root import Root, Note
 from .Scale import Scale
 
 from .Bang import Bang
 
-from .TimeVar import TimeVar
+from .TimeVar import TimeVar, mapvar
 
 class Player(Repeatable):
 
@@ -302,16 +307,35 @@ class Player(Repeatable):
         self.current_dur = None
         self.old_pattern_dur = None
         self.old_dur = None
+
+        # The 'dur' Pattern and TimeVar values used for current_dur, see `rhythm`
+        self.rhythm_source = None
+        self.rhythm_values = None
+
+        # Start time of each event in one cycle of current_dur, see `get_dur_sums`
+        self.dur_sums = None
+        self.dur_sums_source = None
         
         self.isplaying = False
         self.isAlive = True
 
         # These dicts contain the attribute and modifier values that are sent to SuperCollider     
 
-        self.attr  = {}
+        self.attr  = EventPlan(self)
         self.modifier = Pattern()
         self.mod_data = 0
 
+        # Events worked out ahead of the clock, see `prerender`
+
+        self.rendered = []
+        self.render_version = 0
+        self.render_lock = threading.RLock()
+
+        # If True, notes without effects are played by a single synth node
+        # instead of a group, see `SCLangServerManager.get_direct_bundle`
+
+        self.direct = False
+
         # Keyword arguments that are used internally
 
         self.scale = None
@@ -376,6 +400,10 @@ class Player(Repeatable):
 
         return self
 
+    def dependencies(self):
+        """ Returns the other players whose keys are used by this player's attributes """
+        return self.attr.depends_on
+
     def test_for_circular_reference(self, attr, value, last_parent=None, last_key=None):
         """ Used to raise an exception if a player's attribute refers to itself e.g. `p1 >> pads(dur=p1.dur)` """
 
@@ -432,50 +460,59 @@ class Player(Repeatable):
             
             if name not in self.__vars:
 
-                # Get any alias
+                with self.render_lock:
 
-                name = self.alias.get(name, name)
+                    self.set_attribute(name, value)
 
-                if name == "dur":
+                return
+            
+        self.__dict__[name] = value
 
-                    value, self._delay_offset = CalculateDelaysFromDur(value) # can we avoid using this?
+        return
 
-                value = asStream(value)
+    def set_attribute(self, name, value):
+        """ Stores a value used in each event as a Pattern, called by `__setattr__` """
 
-                # raise a ValueError if trying to reference itself -- doesn't handle indirect references to itself
+        # Get any alias
 
-                for item in value: # maybe use a deepiter method
+        name = self.alias.get(name, name)
 
-                    self.test_for_circular_reference(name, item)
+        if name == "dur":
 
-                # Update the attribute dict
-                
-                self.attr[name] = value
+            value, self._delay_offset = CalculateDelaysFromDur(value) # can we avoid using this?
 
-                # Remove from the stored pattern dict / call those
+        value = asStream(value)
 
-                self.update_pattern_root(name)
+        # raise a ValueError if trying to reference itself -- doesn't handle indirect references to itself
 
-                # keep track of what values we change with +-
+        for item in value: # maybe use a deepiter method
 
-                if (self.synthdef == SamplePlayer and name == "sample") or (self.synthdef != SamplePlayer and name == "degree"):
+            self.test_for_circular_reference(name, item)
 
-                    self.modifier = value
+        # Update the attribute dict
+        
+        self.attr[name] = value
 
-                # Update any playerkey
+        # Remove from the stored pattern dict / call those
 
-                if name in self.__dict__:
+        self.update_pattern_root(name)
 
-                    if isinstance(self.__dict__[name], PlayerKey):
+        # keep track of what values we change with +-
 
-                        self.__dict__[name].update_pattern()
-                else:
+        if (self.synthdef == SamplePlayer and name == "sample") or (self.synthdef != SamplePlayer and name == "degree"):
 
-                    self.update_player_key(name, self.now(name), 0) # self.now might be an issue
+            self.modifier = value
 
-                return
-            
-        self.__dict__[name] = value
+        # Update any playerkey
+
+        if name in self.__dict__:
+
+            if isinstance(self.__dict__[name], PlayerKey):
+
+                self.__dict__[name].update_pattern()
+        else:
+
+            self.update_player_key(name, self.now(name), 0) # self.now might be an issue
 
         return
 
@@ -569,64 +606,87 @@ class Player(Repeatable):
             Player in the clock based on the current clock time and this player's
             current duration value. """
 
-        # If stopping, kill the event
+        with self.render_lock:
 
-        if self.stopping and self.metro.now() >= self.stop_point:
-            
-            self.kill()
-            
-            return
+            # If stopping, kill the event
 
-        # If the duration has changed, work out where the internal markers should be
+            if self.stopping and self.metro.now() >= self.stop_point:
+                
+                self.kill()
+                
+                return
 
-        # This could be in its own private function
+            # If the duration has changed, work out where the internal markers should be
 
-        force_count = kwargs.get("count", False)
-        dur_updated = self.dur_updated() 
+            # This could be in its own private function
 
-        if dur_updated or force_count is True:
+            force_count = kwargs.get("count", False)
+            dur_updated = self.dur_updated() 
 
-            try:
+            if dur_updated or force_count is True:
 
-                self.event_n, self.event_index = self.count(self.event_index if not force_count else None)
+                try:
 
-            except TypeError as e:
+                    self.event_n, self.event_index = self.count(self.event_index if not force_count else None)
 
-                print(e)
+                except TypeError as e:
 
-                print("TypeError: Innappropriate argument type for 'dur'")
+                    print(e)
 
-        # Get the current state -- tidy this up
+                    print("TypeError: Innappropriate argument type for 'dur'")
 
-        dur = 0
+            # Use the event if it was worked out ahead of time
 
-        while True:
+            rendered = self.pop_rendered() if self.rendered else None
 
-            # This could be in a separate method
+            if rendered is not None:
 
-            self.get_event()
-            
-            # Set a 'None' to 0
+                dur = self.play_rendered(rendered, **kwargs)
 
-            if self.event['dur'] is None:
+            else:
 
-                dur = 0
+                # Get the current state
 
-            # If there are more than one dur (happens sometimes because of threading), only use first
+                dur = self.find_event()
 
-            try:
+                # Play the note
 
-                if len(self.event['dur']) > 0:
+                self.sent_messages = []
+                
+                self.send(verbose=(self.metro.solo == self and kwargs.get('verbose', True) and type(self.event['dur']) != rest))
+                
+                # If using custom bpm
 
-                    self.event['dur'] = self.event['dur'][0]                    
+                dur *= self.tempo_shift()
 
-            except TypeError:
+            # Schedule the next event
 
-                pass
+            self.event_index = self.event_index + dur
+
+            self.metro.schedule(self, self.event_index, kwargs={})
+
+            # Change internal marker
+
+            self.event_n += 1 
+            self.notes_played += 1
+
+            # Work out the next events in the background
 
-            finally:
+            if self.can_prerender():
 
-                dur = float(self.event['dur'])
+                self.metro.prerenderer.request(self)
+
+        return
+
+    def find_event(self):
+        """ Works out the values of the next event with a non-zero duration,
+            starting at `self.event_n`, and returns its duration """
+
+        while True:
+
+            self.get_event()
+
+            dur = self.event_duration(self.event)
 
             # Skip events with durations of 0
 
@@ -638,39 +698,224 @@ class Player(Repeatable):
 
                 break
 
-        # Play the note
+        return dur
 
-        self.sent_messages = []
-        
-        self.send(verbose=(self.metro.solo == self and kwargs.get('verbose', True) and type(self.event['dur']) != rest))
-        
-        # If using custom bpm
+    def event_duration(self, event):
+        """ Returns the duration of an event as a float """
+
+        # Set a 'None' to 0
+
+        if event['dur'] is None:
+
+            dur = 0
 
-        if self.event['bpm'] is not None:
+        # If there are more than one dur (happens sometimes because of threading), only use first
+
+        try:
+
+            if len(event['dur']) > 0:
+
+                event['dur'] = event['dur'][0]                    
+
+        except TypeError:
+
+            pass
+
+        finally:
+
+            dur = float(event['dur'])
+
+        return dur
+
+    def tempo_shift(self, event=None):
+        """ Returns the amount to multiply the duration of the current event, or
+            `event`, by when using a custom bpm """
+
+        if event is None:
+
+            event = self.event
+
+        if event['bpm'] is not None:
 
             try:
 
-                tempo_shift = float(self.metro.bpm) / float(self.event['bpm'])
+                return float(self.metro.bpm) / float(event['bpm'])
 
             except (AttributeError, TypeError, ZeroDivisionError):
 
-                tempo_shift = 1
+                pass
+
+        return 1
 
-            dur *= tempo_shift
+    # --- Rendering events ahead of the clock
 
-        # Schedule the next event
+    def can_prerender(self):
+        """ Returns True if the next events of this player can be worked out
+            ahead of the clock i.e. every attribute is a fixed value and the
+            clock's `lookahead` is set """
 
-        self.event_index = self.event_index + dur
+        if not self.metro.lookahead or not self.isplaying or self.stopping:
 
-        self.metro.schedule(self, self.event_index, kwargs={})
+            return False
 
-        # Change internal marker
+        if self.attr.unfixed or self.bang_kwargs or self.__dict__.get("_versus") is not None:
 
-        self.event_n += 1 
-        self.notes_played += 1
+            return False
+
+        if str(self.synthdef) == "MidiOut":
+
+            return False
+
+        try:
+
+            self.render_context()
+
+        except (TypeError, ValueError):
+
+            return False
+
+        return True
+
+    def render_context(self):
+        """ Returns the values that rendered events depend on that can change
+            without the player being updated: the tempo, scale, and root """
+
+        scale = getattr(self.scale, "data", self.scale)
+
+        return (self.metro.get_bpm(), tuple(float(x) for x in scale), float(Root.default))
+
+    def clear_rendered(self):
+        """ Discards any events worked out ahead of the clock """
+
+        with self.render_lock:
+
+            self.render_version += 1
+
+            discarded, self.rendered = self.rendered, []
+
+        # Free the buses of notes that won't be played
+
+        for rendered in discarded:
+
+            for bundle in rendered.bundles:
+
+                lease = getattr(bundle, "lease", None)
+
+                if lease is not None:
+
+                    self.metro.server.buses.cancel(*lease)
 
         return
 
+    def prerender(self):
+        """ Works out and compiles the next event that hasn't been rendered yet, if
+            it is within `self.metro.lookahead` beats of this player's next event.
+            Returns True if an event was rendered. Called by the clock's `Prerenderer`. """
+
+        with self.render_lock:
+
+            if not self.can_prerender():
+
+                return False
+
+            if self.rendered:
+
+                last = self.rendered[-1]
+
+                event_n, event_index = last.event_n + 1, last.event_index + last.dur
+
+            else:
+
+                event_n, event_index = self.event_n, self.event_index
+
+            if event_index >= self.event_index + self.metro.lookahead:
+
+                return False
+
+            context = self.render_context()
+
+            # Work out the event from a copy of the player's event, so that other
+            # threads never see the values of an event that hasn't been played
+
+            event, n = dict(self.event), event_n
+
+            while True:
+
+                event = self.calculate_event(event, n)
+
+                dur = self.event_duration(event)
+
+                # Skip events with durations of 0
+
+                if dur == 0:
+
+                    n += 1
+
+                else:
+
+                    break
+
+            verbose = type(event['dur']) != rest
+
+            # Bundles are re-stamped with the time of the block they are sent in,
+            # but buses are leased from the time the event is expected to play
+
+            start_time = self.metro.beat_to_time(event_index)
+
+            bundles, freq, bufnum = self.compile_messages(0, start_time=start_time, event=event, sent_messages=[], verbose=verbose)
+
+            rendered = RenderedEvent(event_n, n, event_index, event, dur * self.tempo_shift(event),
+                                     bundles, freq, bufnum, verbose, self.get_event_length(event), context)
+
+            self.rendered = self.rendered + [rendered]
+
+        return True
+
+    def pop_rendered(self):
+        """ Returns the rendered event for the player's current position, or None
+            and discards the rendered events if they don't match it """
+
+        rendered = self.rendered[0]
+
+        if rendered.start_n == self.event_n and rendered.event_index == self.event_index and rendered.context == self.render_context():
+
+            self.rendered = self.rendered[1:]
+
+            self.metro.prerenderer.used += 1
+
+            return rendered
+
+        self.metro.prerenderer.discarded += len(self.rendered)
+
+        self.clear_rendered()
+
+        return None
+
+    def play_rendered(self, rendered, **kwargs):
+        """ Adds the bundles of a rendered event to the current queue block
+            and returns its duration """
+
+        self.event_n = rendered.event_n
+        self.event = rendered.event
+
+        self.update_all_player_keys()
+
+        self.current_event_length = rendered.length
+
+        if rendered.verbose and self.metro.solo == self and kwargs.get('verbose', True):
+
+            for bundle in rendered.bundles:
+
+                bundle.setTimeTag(self.queue_block.time + bundle.timetag)
+
+                if self.condition():
+
+                    self.queue_block.osc_messages.append(bundle)
+
+        self.store_sent_values(rendered.freq, rendered.bufnum)
+
+        return rendered.dur
+
     def count(self, time=None, event_after=False):
         """ Counts the number of events that will have taken place between 0 and `time`. If
             `time` is not specified the function uses self.metro.now(). Setting `event_after`
@@ -678,18 +923,19 @@ class Player(Repeatable):
 
         n = 0
         acc = 0
-        dur = 0
         now = (time if time is not None else self.metro.now())
         # bpm = float(self.metro.bpm if self.bpm == None else self.bpm) # TODO: use this to better caclulate event_index -- why?
 
         durations = self.rhythm() if self.current_dur is None else self.current_dur
-        total_dur = float(sum(durations))
+        dur_sums  = self.get_dur_sums(durations)
+        total_dur = dur_sums[-1]
 
         if total_dur == 0:
 
             WarningMsg("Player object has a total duration of 0. Set to 1")
 
             durations = [1]
+            dur_sums  = [0, 1]
             total_dur =  1 
             self.dur  =  1
     
@@ -697,7 +943,7 @@ class Player(Repeatable):
 
         try:
 
-            n = int(len(durations) * (acc / total_dur))
+            n = len(durations) * int(round(acc / total_dur))
 
         except TypeError as e:
 
@@ -709,54 +955,73 @@ class Player(Repeatable):
 
         if acc != now:
 
-            while True:
+            # Find the first event in this cycle that starts at or after `now`
 
-                dur = float(modi(durations, n))
+            i, last = bisect_left(dur_sums, now - acc, 1, len(dur_sums) - 1), len(dur_sums) - 1
 
-                if acc + dur == now:
+            # `now - acc` may be rounded so check the times as they are compared below
 
-                    acc += dur
+            while i > 1 and acc + dur_sums[i - 1] >= now:
 
-                    n += 1
+                i -= 1
 
-                    break
+            while i < last and acc + dur_sums[i] < now:
 
-                elif acc + dur > now:
+                i += 1
 
-                    if event_after:
+            if acc + dur_sums[i] == now or event_after:
 
-                        acc += dur
-                        n += 1
+                n   += i
+                acc += dur_sums[i]
 
-                    break
+            else:
 
-                else:
-                    
-                    acc += dur
-                    n += 1
+                n   += i - 1
+                acc += dur_sums[i - 1]
 
         # Returns value for self.event_n and self.event_index
 
         return n, acc
 
+    def get_dur_sums(self, durations):
+        """ Returns a list of the time at which each event in one cycle of `durations`
+            starts followed by the total duration. The list is stored until a different
+            `durations` Pattern is used. """
+        if durations is not self.dur_sums_source:
+            dur_sums = [0]
+            for value in durations:
+                dur_sums.append(dur_sums[-1] + float(value))
+            self.dur_sums = dur_sums
+            self.dur_sums_source = durations
+        return self.dur_sums
+
     def dur_updated(self):
         """ Returns True if the players duration has changed since the last call """
         dur = self.rhythm()
-        if dur != self.old_dur:
+        if dur is not self.old_dur and dur != self.old_dur:
             self.old_dur = dur
             return True
         return False
 
     def rhythm(self):
-        """ Returns the "now" value of the duration """
+        """ Returns the "now" value of the duration. The same Pattern is returned until
+            the 'dur' attribute or the value of any TimeVar it contains changes. """
+        source = self.attr['dur']
+        if source is self.rhythm_source and self.rhythm_values is None:
+            return self.current_dur
         rhythm = []
-        for value in self.attr['dur']:
+        uses_timevar = False
+        for value in source:
             #rhythm.append(self.unpack(value))
             if isinstance(value, TimeVar):
                  rhythm.append(value.now())
+                 uses_timevar = True
             else:
                  rhythm.append(value)
-        self.current_dur = asStream(rhythm)
+        if source is not self.rhythm_source or rhythm != self.rhythm_values:
+            self.current_dur = asStream(rhythm)
+        self.rhythm_source = source
+        self.rhythm_values = rhythm if uses_timevar else None
         return self.current_dur
 
     def update(self, synthdef, degree, **kwargs):
@@ -855,6 +1120,10 @@ class Player(Repeatable):
 
             self.metro.schedule(self, self.event_index)
 
+        # Sort the attributes into constant and dynamic values for get_event
+
+        self.attr.compile()
+
         return self
 
     def stutter(self, amount=None, **kwargs):
@@ -1171,8 +1440,9 @@ class Player(Repeatable):
 
     # --- Methods for preparing and sending OSC messages to SuperCollider
 
-    def unpack(self, item, debug=False):
-        """ Converts a pgroup to floating point values and updates and time var or playerkey relations """
+    def unpack(self, item, debug=False, event_n=None):
+        """ Converts a pgroup to floating point values and updates and time var or playerkey relations.
+            Patterns are indexed using `event_n`, or `self.event_n` if it is None """
 
         if isinstance(item, TimeVar):
 
@@ -1190,13 +1460,14 @@ class Player(Repeatable):
 
             elif self.queue_block is not None and item.parent in self.queue_block:
 
-                # Update the parent with an up-to-date value
+                # Update the parent with an up-to-date value by calling it before this
+                # player, which means its event is only worked out once in this block
 
                 if not self.queue_block.already_called(item.parent):
 
                     # This doesn't account for PGroups being separated in time
 
-                    item.parent.get_event()
+                    self.queue_block.call(item.parent, self)
 
                     # item.parent.update_player_key(item.key, item.parent.now(item.key), 0)
 
@@ -1215,30 +1486,35 @@ class Player(Repeatable):
 
         if isinstance(item, Pattern): # We might have had a pattern stored! TODO- is this the best time to check this
 
-            item = item[self.event_n]
+            item = item[self.event_n if event_n is None else event_n]
 
         if isinstance(item, PGroup):
 
             # Make sure any values in the PGroup have their "now" methods called
 
-            item = item.convert_data(self.unpack)    
+            item = item.convert_data(self.unpack, event_n=event_n)
 
         return item
 
-    def get_key(self, key, i, **kwargs):
-        return group_modi(kwargs.get(key, self.event[key]), i)
+    def get_key(self, key, i, event=None, **kwargs):
+        if event is None:
+            event = self.event
+        return group_modi(kwargs.get(key, event[key]), i)
 
     # Private method
 
-    def __get_current_delay(self, i, kwargs):
-        delay = float(group_modi(kwargs.get('delay', self.event.get('delay', 0)), i))
+    def __get_current_delay(self, i, kwargs, event=None):
+        if event is None:
+            event = self.event
+        delay = float(group_modi(kwargs.get('delay', event.get('delay', 0)), i))
         func = self.case_modulation["delay"]
-        return func(delay, i)
+        return func(delay, i, event=event)
 
-    def now(self, attr="degree", x=0, **kwargs):
-        """ Calculates the values for each attr to send to the server at the current clock time """
+    def now(self, attr="degree", x=0, event_n=None, **kwargs):
+        """ Calculates the values for each attr to send to the server at the current clock time,
+            or for event number `event_n` if it is given """
 
-        index = self.event_n + x
+        index = (self.event_n if event_n is None else event_n) + x
 
         try:
 
@@ -1255,7 +1531,7 @@ class Player(Repeatable):
 
         if attr_value is not None:
 
-            attr_value = self.unpack(attr_value)
+            attr_value = self.unpack(attr_value, event_n=event_n)
 
         return attr_value
 
@@ -1300,15 +1576,7 @@ class Player(Repeatable):
     def get_event(self):
         """ Returns a dictionary of attr -> now values """
 
-        attributes = copy(self.attr)
-        
-        for key in attributes:
-
-            if len(attributes[key]) > 0:
-
-                self.event[key] = self.now(key)
-
-        self.event = self.get_prime_funcs(self.event)
+        self.calculate_event()
 
         # Update internal player keys / schedule future updates
 
@@ -1316,9 +1584,46 @@ class Player(Repeatable):
 
         return self
 
-    def new_message(self, index=0, **kwargs):
+    def calculate_event(self, event=None, event_n=None):
+        """ Works out the values in `self.event` for `self.event_n` without
+            updating the player's keys. If `event` is given, its values are
+            worked out for `event_n` instead. Returns the event """
+
+        current = event is None
+
+        if current:
+
+            event, event_n = self.event, self.event_n
+
+        plan = self.attr
+
+        # Constant values and flat sequences of numbers don't need unpacking
+
+        event.update(plan.constants)
+
+        for key, values in plan.sequences.items():
+
+            event[key] = values[event_n % len(values)]
+
+        for key in plan.dynamic:
+
+            event[key] = self.now(key, event_n=event_n)
+
+        event = self.get_prime_funcs(event)
+
+        if current:
+
+            self.event = event
+
+        return event
+
+    def new_message(self, index=0, event=None, **kwargs):
         """ Returns the header of an osc message to be added to by osc_message() """
 
+        if event is None:
+
+            event = self.event
+
         # Start with the envelope
         
         # message = {"env": group_modi(kwargs.get("env", self.event['env']), index)}
@@ -1327,13 +1632,13 @@ class Player(Repeatable):
 
         if self.synthdef == SamplePlayer:
 
-            degree = group_modi(kwargs.get("degree", self.event['degree']), index)
-            sample = group_modi(kwargs.get("sample", self.event["sample"]), index)
-            rate   = group_modi(kwargs.get("rate", self.event["rate"]), index)
+            degree = group_modi(kwargs.get("degree", event['degree']), index)
+            sample = group_modi(kwargs.get("sample", event["sample"]), index)
+            rate   = group_modi(kwargs.get("rate", event["rate"]), index)
 
             if rate < 0:
 
-                sus = group_modi(kwargs.get("sus", self.event["sus"]), index)
+                sus = group_modi(kwargs.get("sus", event["sus"]), index)
 
                 pos = self.metro.beat_dur(sus)
 
@@ -1347,12 +1652,12 @@ class Player(Repeatable):
 
         elif self.synthdef == LoopPlayer:
 
-            pos = group_modi(kwargs.get("degree", self.event["degree"]), index)
-            buf = group_modi(kwargs.get("buf", self.event["buf"]), index)
+            pos = group_modi(kwargs.get("degree", event["degree"]), index)
+            buf = group_modi(kwargs.get("buf", event["buf"]), index)
 
             # Get a user-specified tempo
 
-            given_tempo = group_modi(kwargs.get("tempo", self.event.get("tempo", self.metro.bpm)), index)
+            given_tempo = group_modi(kwargs.get("tempo", event.get("tempo", self.metro.bpm)), index)
 
             if given_tempo is None:
 
@@ -1368,7 +1673,7 @@ class Player(Repeatable):
 
             # If there is a negative rate, move the pos forward
 
-            rate = group_modi(kwargs.get("rate", self.event["rate"]), index)
+            rate = group_modi(kwargs.get("rate", event["rate"]), index)
 
             if rate == 0:
 
@@ -1380,7 +1685,7 @@ class Player(Repeatable):
 
             if rate < 0:
 
-                sus = group_modi(kwargs.get("sus", self.event["sus"]), index)
+                sus = group_modi(kwargs.get("sus", event["sus"]), index)
 
                 pos += self.metro.beat_dur(sus)
 
@@ -1388,9 +1693,9 @@ class Player(Repeatable):
 
         else:
 
-            degree = group_modi(kwargs.get("degree", self.event["degree"]), index)
-            octave = group_modi(kwargs.get("oct", self.event["oct"]), index)
-            root   = group_modi(kwargs.get("root", self.event["root"]), index)
+            degree = group_modi(kwargs.get("degree", event["degree"]), index)
+            octave = group_modi(kwargs.get("oct", event["oct"]), index)
+            root   = group_modi(kwargs.get("root", event["root"]), index)
 
             midinote = midi( kwargs.get("scale", self.scale), octave, degree, root )
 
@@ -1400,48 +1705,62 @@ class Player(Repeatable):
             
         return message
 
-    def osc_message(self, index=0, **kwargs):
+    def osc_message(self, index=0, event=None, **kwargs):
         """ Creates an OSC packet to play a SynthDef in SuperCollider,
             use kwargs to force values in the packet, e.g. pan=1 will force ['pan', 1] """
 
+        if event is None:
+
+            event = self.event
+
         fx_dict = {}
-        message = self.new_message(index, **kwargs)
+        message = self.new_message(index, event, **kwargs)
 
-        attributes = self.attr.copy()
+        plan = self.attr
 
-        # Go through the attr dictionary and add kwargs
+        # Add the constant values that were converted when the attribute was set
 
-        for key in attributes:
+        for key, val in plan.message_constants.items():
 
-            try:
+            if key not in message and key not in kwargs:
 
-                # Don't use fx keywords or foxdot keywords except "degree"
+                message[key] = val
 
-                if (key not in self.keywords) and (key not in self.fx_attributes or key in self.base_attributes):
+        # Go through the other attributes (fx keywords and foxdot keywords except "degree" are already filtered out)
 
-                    # Ignore any keys we might already have processed
+        message_keys = plan.message_keys
 
-                    if key in message:
+        if kwargs:
 
-                        continue
+            message_keys = message_keys + tuple(key for key in plan.constant_keys if key in kwargs)
 
-                    # Convert to float
+        for key in message_keys:
+
+            try:
 
-                    val = float(group_modi(kwargs.get(key, self.event[key]), index))
+                # Ignore any keys we might already have processed
 
-                    # Special case modulation
+                if key in message:
 
-                    if key in self.case_modulation:
+                    continue
 
-                        func = self.case_modulation[key]
+                # Convert to float
 
-                        val = func(val, index, **kwargs)
+                val = float(group_modi(kwargs.get(key, event[key]), index))
 
-                    # Only send non-zero values
+                # Special case modulation
 
-                    if val != 0 or key in self.required_keys or key in self.envelope_keywords: 
+                if key in self.case_modulation:
 
-                        message[key] = val
+                    func = self.case_modulation[key]
+
+                    val = func(val, index, event=event, **kwargs)
+
+                # Only send non-zero values
+
+                if val != 0 or key in self.required_keys or key in self.envelope_keywords: 
+
+                    message[key] = val
 
             except KeyError as e:
 
@@ -1449,49 +1768,47 @@ class Player(Repeatable):
 
         # See if any fx_attributes 
 
-        for key in self.fx_keys:
-
-            if key in attributes: 
+        for key in plan.fx_keys:
 
-                # Only use effects where the "title" effect value is not 0
+            # Only use effects where the "title" effect value is not 0
 
-                val = group_modi(kwargs.get(key, self.event[key]), index)
+            val = group_modi(kwargs.get(key, event[key]), index)
 
-                if val != 0:
+            if val != 0:
 
-                    fx_dict[key] = []
+                fx_dict[key] = []
 
-                    # Look for any other attributes require e.g. room and verb
+                # Look for any other attributes require e.g. room and verb
 
-                    for n, sub_key in enumerate(FxList[key].args):
+                for n, sub_key in enumerate(FxList[key].args):
 
-                        if sub_key in self.event:
+                    if sub_key in event:
 
-                            # If the sub_key is another attribute like sus, get it from the message
+                        # If the sub_key is another attribute like sus, get it from the message
 
-                            if sub_key in message:
+                        if sub_key in message:
 
-                                val = message[sub_key]
+                            val = message[sub_key]
 
-                            # Get the value from the event
+                        # Get the value from the event
 
-                            else:
+                        else:
 
-                                try:
+                            try:
 
-                                    val = group_modi(kwargs.get(sub_key, self.event[sub_key]), index)
+                                val = group_modi(kwargs.get(sub_key, event[sub_key]), index)
 
-                                except TypeError as e:
+                            except TypeError as e:
 
-                                    val = 0
+                                val = 0
 
-                                except KeyError as e:
+                            except KeyError as e:
 
-                                    del fx_dict[key]
+                                del fx_dict[key]
 
-                                    break
+                                break
 
-                            fx_dict[key] += [sub_key, val]
+                        fx_dict[key] += [sub_key, val]
 
         return message, fx_dict
 
@@ -1501,20 +1818,65 @@ class Player(Repeatable):
             Use kwargs to overide values in the current event """
 
         timestamp = timestamp if timestamp is not None else self.queue_block.time
+
+        bundles, freq, bufnum = self.compile_messages(timestamp, **kwargs)
+
+        for compiled_msg in bundles:
+
+            # We can set a condition to only send messages
+
+            if self.condition(): 
+
+                self.queue_block.osc_messages.append(compiled_msg)
+
+        # "bang" the line
+
+        if bundles and self.bang_kwargs:
+
+            self.bang()
+
+        # Store (and update PlayerKeys) the calculated values
+
+        self.store_sent_values(freq, bufnum)
+        
+        return
+
+    def compile_messages(self, timestamp, start_time=None, event=None, sent_messages=None, **kwargs):
+        """ Returns a list of the OSC bundles for the current event to be
+            sent at `timestamp`, and the lists of frequencies and buffers used.
+            `start_time` is the machine time the event will play if the bundles
+            are re-stamped before they are sent. If `event` is given, it is
+            compiled instead of the current event and the messages compiled
+            are added to `sent_messages` """
+
         verbose   = kwargs.get("verbose", True)
 
-        banged       = False
+        start_time = timestamp if start_time is None else start_time
+
+        bundles      = []
         freq, bufnum = [], []
         
         last_msg = None
 
-        self.current_event_length = self.get_event_length(**kwargs)
+        if event is None:
+
+            event, sent_messages = self.event, self.sent_messages
+
+            length = self.current_event_length = self.get_event_length(**kwargs)
+
+        else:
+
+            length = self.get_event_length(event, **kwargs)
 
-        for i in range(self.current_event_length):
+            if sent_messages is None:
+
+                sent_messages = []
+
+        for i in range(length):
 
             # Get the basic osc_msg
 
-            osc_msg, effects = self.osc_message(i, **kwargs)
+            osc_msg, effects = self.osc_message(i, event, **kwargs)
 
             # Keep track of the frequency
 
@@ -1530,7 +1892,7 @@ class Player(Repeatable):
 
                 # Look at delays and schedule events later if need be
 
-                delay = self.__get_current_delay(i, kwargs)
+                delay = self.__get_current_delay(i, kwargs, event)
 
                 ### ----
 
@@ -1556,33 +1918,22 @@ class Player(Repeatable):
 
                     key = (osc_msg, effects, delay)
 
-                    if key not in self.sent_messages:
+                    if key not in sent_messages:
 
                         # Keep note of what messages we are sending
 
-                        self.sent_messages.append(key)
+                        sent_messages.append(key)
 
                         # Compile the message with time tag
 
                         delay = self.metro.beat_dur(delay)
 
-                        compiled_msg = self.metro.server.get_bundle(synthdef, osc_msg, effects, timestamp = timestamp + delay)
-
-                        # We can set a condition to only send messages
-
-                        if self.condition(): 
-
-                            self.queue_block.osc_messages.append(compiled_msg)
+                        bundles.append(self.metro.server.get_bundle(synthdef, osc_msg, effects, timestamp = timestamp + delay, direct = self.direct, start = start_time + delay))
 
-                        # "bang" the line
+        return bundles, freq, bufnum
 
-                        if not banged and self.bang_kwargs:
-
-                            self.bang()
-
-                            banged = True
-
-        # Store (and update PlayerKeys) the calculated values
+    def store_sent_values(self, freq, bufnum):
+        """ Stores the frequencies or buffers of the last event sent """
 
         if self.synthdef == SamplePlayer:
 
@@ -1591,7 +1942,7 @@ class Player(Repeatable):
         else:
 
             self.freq = freq
-        
+
         return
 
     def set_queue_block(self, queue_block):
@@ -1941,6 +2292,217 @@ class GroupAttr(list):
             if callable(p):
                 p.__call__(*args, **kwargs)
 
+if sys.version_info[0] > 2:
+    plan_scalars = (int, float, str, Fraction, type(None))
+else:
+    plan_scalars = (int, long, float, str, unicode, Fraction, type(None))
+
+def key_parents(value, parents=None):
+    """ Returns a dictionary of id to player for each player whose keys are used
+        in `value` e.g. `p1` for `p2 >> pads(p1.degree + 2)` """
+    if parents is None:
+        parents = {}
+    if isinstance(value, NumberKey):
+        if value.parent is not None:
+            parents[id(value.parent)] = value.parent
+        key_parents(value.value, parents)
+        key_parents(value.other, parents)
+    elif isinstance(value, metaPattern):
+        for item in value.data:
+            key_parents(item, parents)
+    elif isinstance(value, mapvar):
+        key_parents(value.key, parents)
+    return parents
+
+def is_fixed_value(value):
+    """ Returns True if a value in an attribute's pattern is the same every
+        time it is used i.e. not a TimeVar, PlayerKey, or generator """
+    if type(value) in plan_scalars or isinstance(value, (rest, Note)):
+        return True
+    if isinstance(value, PGroup):
+        return all(is_fixed_value(item) for item in value.data)
+    return False
+
+class RenderedEvent(object):
+    """ An event worked out ahead of the clock by `Player.prerender` """
+    def __init__(self, start_n, event_n, event_index, event, dur, bundles, freq, bufnum, verbose, length, context):
+        self.start_n     = start_n
+        self.event_n     = event_n
+        self.event_index = event_index
+        self.event       = event
+        self.dur         = dur
+        self.bundles     = bundles
+        self.freq        = freq
+        self.bufnum      = bufnum
+        self.verbose     = verbose
+        self.length      = length
+        self.context     = context
+
+class EventPlan(dict):
+    """
+    Dictionary of a Player's attribute patterns that also sorts each attribute
+    by how its value is found for each event. Sorting is done when an attribute
+    is set, and again in `Player.update`, so that `Player.get_event` and
+    `Player.osc_message` only need to unpack the dynamic values:
+
+    - `constants`: attributes that are a single number or string
+    - `sequences`: attributes that are a flat pattern of numbers or strings
+    - `dynamic`: anything else e.g. TimeVars, PlayerKeys, PGroups, or nested patterns,
+      which are materialized (see `Pattern.materialize`) where possible
+
+    Attributes whose values aren't fixed, so the player's events can't be
+    worked out ahead of time (see `Player.prerender`), are listed in `unfixed`.
+    Other players whose keys are used by each attribute are stored in `depends`
+    and all of them in `depends_on`.
+
+    Constant attributes sent to SuperCollider are converted to floats once
+    and stored in `message_constants`. The containers are replaced, not
+    modified, so the clock thread can safely read them while they are updated.
+    """
+
+    def __init__(self, player):
+        dict.__init__(self)
+        self.player = player
+        self.constants = {}
+        self.sequences = {}
+        self.dynamic = ()
+        self.constant_keys = ()
+        self.message_constants = {}
+        self.message_keys = ()
+        self.fx_keys = ()
+        self.unfixed = ()
+        self.depends = {}
+        self.depends_on = ()
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.sort(key, value)
+        return
+
+    def __copy__(self):
+        return dict(self)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+        return
+
+    def is_message_key(self, key):
+        """ Returns True if the attribute is sent to SuperCollider as a SynthDef argument """
+        player = self.player
+        return (key not in player.keywords) and (key not in player.fx_attributes or key in player.base_attributes)
+
+    def sort(self, key, pattern):
+        """ Works out how the value for `key` is found in each event """
+
+        constants = dict((k, v) for k, v in self.constants.items() if k != key)
+        sequences = dict((k, v) for k, v in self.sequences.items() if k != key)
+        message_constants = dict((k, v) for k, v in self.message_constants.items() if k != key)
+
+        dynamic = tuple(k for k in self.dynamic if k != key)
+        constant_keys = tuple(k for k in self.constant_keys if k != key)
+        message_keys = tuple(k for k in self.message_keys if k != key)
+        unfixed = tuple(k for k in self.unfixed if k != key)
+        depends = dict((k, v) for k, v in self.depends.items() if k != key)
+
+        is_constant = False
+
+        if type(pattern) is Pattern and all(type(item) in plan_scalars for item in pattern.data):
+
+            if len(pattern.data) == 1:
+
+                is_constant = True
+
+                constants[key] = pattern.data[0]
+
+            elif len(pattern.data) > 1:
+
+                sequences[key] = pattern.data
+
+        elif len(pattern) > 0:
+
+            dynamic += (key,)
+
+            # Nested patterns of fixed values are indexed from a flat list
+
+            if type(pattern) is Pattern:
+
+                pattern.materialize()
+
+            if not (type(pattern) is Pattern and pattern.is_materialized() and all(is_fixed_value(item) for item in pattern)):
+
+                unfixed += (key,)
+
+            # Other players whose keys are used, see `QueueBlock.ordered`
+
+            parents = key_parents(pattern)
+
+            parents.pop(id(self.player), None)
+
+            if parents:
+
+                depends[key] = parents
+
+        if self.is_message_key(key):
+
+            player = self.player
+
+            val = None
+
+            # Values that need modulating are worked out for each event
+
+            if is_constant and key not in player.case_modulation:
+
+                try:
+
+                    val = float(pattern.data[0])
+
+                except (TypeError, ValueError):
+
+                    pass
+
+            if val is None:
+
+                message_keys += (key,)
+
+            else:
+
+                constant_keys += (key,)
+
+                if val != 0 or key in player.required_keys or key in player.envelope_keywords:
+
+                    message_constants[key] = val
+
+        self.constants, self.sequences, self.dynamic = constants, sequences, dynamic
+
+        self.constant_keys, self.message_constants, self.message_keys = constant_keys, message_constants, message_keys
+
+        self.unfixed = unfixed
+
+        depends_on = {}
+
+        for parents in depends.values():
+
+            depends_on.update(parents)
+
+        self.depends, self.depends_on = depends, tuple(depends_on.values())
+
+        if key in self.player.fx_keys and key not in self.fx_keys:
+
+            self.fx_keys = tuple(k for k in self.player.fx_keys if k in self)
+
+        # Events worked out using the old value are no longer valid
+
+        self.player.clear_rendered()
+
+        return
+
+    def compile(self):
+        """ Sorts every attribute again, e.g. if a pattern was changed in place """
+        for key, value in list(self.items()):
+            self.sort(key, value)
+        return
+
 class rest(object):
     ''' Represents a rest when used with a Player's `dur` keyword
     '''
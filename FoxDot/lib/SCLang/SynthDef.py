@@ -40,6 +40,10 @@ class SynthDefBaseClass(object):
     defaults = {}
     container = SynthDefs
     default_env = Env.perc()
+    # Name of the argument written to the bus by the startSound node
+    bus_input = None
+    # Notes are freed after sus * max_duration seconds, as in Effects.Out
+    max_duration = 8
 
     def __init__(self, name):
         # String name of SynthDef
@@ -53,6 +57,10 @@ class SynthDefBaseClass(object):
         # Name of the file to store the SynthDef
         self.filename     = SYNTHDEF_DIR + "/{}.scd".format(self.name)
 
+        # Name of the version of the SynthDef that plays a note on its own, without
+        # a group, bus, or startSound and makeSound nodes
+        self.direct_name  = "{}_direct".format(self.name)
+
         # SynthDef default arguments
         self.osc         = instance("osc")
         self.freq        = instance("freq")
@@ -98,6 +106,26 @@ class SynthDefBaseClass(object):
         Def += "osc = Pan2.ar(osc, pan);\n"
         Def += "\tReplaceOut.ar(bus, osc)"
         Def += "}).add;\n"
+        Def += self.get_direct_synthdef()
+        return Def
+
+    def get_direct_synthdef(self):
+        """ Returns the version of the SynthDef used for notes without effects. It
+            takes its frequency or rate as an argument, and frees itself and writes
+            to the output in the same way as the makeSound SynthDef """
+        Def  = "SynthDef.new(\{},\n".format(self.direct_name)
+        Def += "{}|{}|\n".format("{", format_args(kwargs=self.defaults, delim='='))
+        Def += "{}\n".format(self.get_base_class_variables(direct=True))
+        Def += "maxsus = sus * {};\n".format(self.max_duration)
+        if self.base:
+            Def += "{}\n".format(self.get_base_class_behaviour(direct=True))
+        Def += "{}".format(self.get_custom_behaviour())
+        Def += "osc = Mix(osc) * 0.5;\n"
+        Def += "osc = Pan2.ar(osc, pan);\n"
+        Def += "osc = EnvGen.ar(Env([1,1,0],[maxsus, 0.1]), doneAction: 2) * osc;\n"
+        Def += "DetectSilence.ar(osc, amp:0.0001, time: 0.1, doneAction: 2);\n"
+        Def += "\tOut.ar(0, osc)"
+        Def += "}).add;\n"
         return Def
 
     def __repr__(self):
@@ -157,11 +185,14 @@ class SynthDefBaseClass(object):
         """ Defines the initial setup for every SynthDef """
         return
 
-    def get_base_class_behaviour(self):
-        return "\n".join(self.base)
+    def get_base_class_behaviour(self, direct=False):
+        base = self.base
+        if self.bus_input is not None and not direct:
+            base = ["{} = In.kr(bus, 1);".format(self.bus_input)] + base
+        return "\n".join(base)
 
-    def get_base_class_variables(self):
-        return "var {};".format(", ".join(self.var))
+    def get_base_class_variables(self, direct=False):
+        return "var {};".format(", ".join(self.var + ["maxsus"] if direct else self.var))
 
     def get_custom_behaviour(self):
         string = ""
@@ -271,6 +302,7 @@ class SynthDefBaseClass(object):
         osc_message['amp'] *= self.balance
 
 class SynthDef(SynthDefBaseClass):
+    bus_input = "freq"
     def __init__(self, *args, **kwargs):
         SynthDefBaseClass.__init__(self, *args, **kwargs)
         # add vib depth?
@@ -278,12 +310,12 @@ class SynthDef(SynthDefBaseClass):
     def add_base_class_behaviour(self):
         """ Defines the initial setup for every SynthDef """
         SynthDefBaseClass.add_base_class_behaviour(self)
-        self.base.append("freq = In.kr(bus, 1);")
         self.base.append("freq = [freq, freq+fmod];")
         #freq = Select.kr(freq + fmod > freq,  [freq, ([freq+fmod])]);
         return
 
 class SampleSynthDef(SynthDefBaseClass):
+    bus_input = "rate"
     def __init__(self, *args, **kwargs):
         SynthDefBaseClass.__init__(self, *args, **kwargs)
         self.buf = self.new_attr_instance("buf")
@@ -292,11 +324,14 @@ class SampleSynthDef(SynthDefBaseClass):
         self.defaults['pos']   = 0
         self.defaults['room']  = 0.1
         self.defaults['rate']  = 1.0
-        self.base.append("rate = In.kr(bus, 1);")
 
 
 # SynthDef from sc file
 class FileSynthDef(SynthDefBaseClass):
+    def __init__(self, *args, **kwargs):
+        SynthDefBaseClass.__init__(self, *args, **kwargs)
+        self.direct_name = None
+
     def write(self):
         pass
 
@@ -338,6 +373,7 @@ class CompiledSynthDef(SynthDefBaseClass):
     def __init__(self, name, filename):
         super(CompiledSynthDef, self).__init__(name)
         self.filename = filename
+        self.direct_name = None
 
     def _load_synth(self):
         SynthDef.server.loadCompiled(self.filename)
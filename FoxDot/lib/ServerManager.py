@@ -7,12 +7,15 @@ if sys.version_info[0] > 2:
     import queue
 else:
     import Queue as queue
+import heapq
 import json
 import socket
+import struct
 import sys
 import threading
 import time
-from collections import namedtuple
+from collections import deque, namedtuple
+from operator import itemgetter
 from threading import Thread
 
 from .Code import WarningMsg
@@ -41,6 +44,15 @@ class SCLangClient(OSCClient):
         except Exception as e:
             print(e)
 
+    def send_binary(self, data):
+        """ Sends an OSC packet that has already been encoded. Returns True if it was sent """
+        try:
+            self.socket.sendall(data)
+        except Exception as e:
+            print(e)
+            return False
+        return True
+
 
 class OSCConnect(SCLangClient):
     def __init__(self, address):
@@ -98,6 +110,15 @@ class SCLangBidirectionalClient(OSCServer):
         except Exception as e:
             print(e)
 
+    def send_binary(self, data):
+        """ Sends an OSC packet that has already been encoded. Returns True if it was sent """
+        try:
+            self.client.socket.sendall(data)
+        except Exception as e:
+            print(e)
+            return False
+        return True
+
     def receive(self, pattern, timeout=2):
         """
         Retrieve the first message matching the pattern
@@ -118,6 +139,182 @@ class SCLangBidirectionalClient(OSCServer):
                 return data
             now = time.time()
 
+class BundleTemplate(object):
+    """
+    Pre-encoded binary for the messages in an OSC bundle. A bundle's "shape" is
+    the address, string arguments, and the type of each number argument of its
+    messages e.g. `(("/g_new", int, int, int), ("/s_new", "startSound", int, ...))`.
+    Everything apart from the numbers (message sizes, addresses, type tags, and
+    strings) is encoded once so that each new bundle only needs the numbers
+    packing into the template using a single `struct.pack` call.
+    """
+    def __init__(self, shape):
+
+        self.shape    = shape
+        self.typetags = "," + ("b" * len(shape))
+
+        fmt       = [">"]
+        constants = []
+        order     = []
+        chunk     = bytes()
+        count     = 0
+
+        for message in shape:
+
+            address, args = message[0], message[1:]
+
+            tags = "," + "".join("s" if type(arg) is str else ("f" if arg in FloatTypes else "i") for arg in args)
+
+            header = OSCString(address) + OSCString(tags)
+
+            size = len(header) + sum(len(OSCString(arg)) if type(arg) is str else 4 for arg in args)
+
+            # Each message is stored in the bundle as a blob
+
+            chunk += struct.pack(">i", size) + header
+
+            for arg in args:
+
+                if type(arg) is str:
+
+                    chunk += OSCString(arg)
+
+                else:
+
+                    if len(chunk):
+
+                        fmt.append("{}s".format(len(chunk)))
+                        order.append(len(constants))
+                        constants.append(chunk)
+                        chunk = bytes()
+
+                    fmt.append("f" if arg in FloatTypes else "i")
+                    order.append(-1 - count)
+                    count += 1
+
+        if len(chunk):
+
+            fmt.append("{}s".format(len(chunk)))
+            order.append(len(constants))
+            constants.append(chunk)
+
+        # Numbers are appended to the constants when packing, so get their final index
+
+        order = [i if i >= 0 else len(constants) - 1 - i for i in order]
+
+        self.constants = tuple(constants)
+        self.struct    = struct.Struct("".join(fmt))
+        self.order     = itemgetter(*order) if len(order) > 1 else (lambda values: (values[order[0]],))
+
+    @staticmethod
+    def get_shape(messages):
+        """ Returns the shape of a list of (address, arguments) tuples and the
+            list of number arguments. Returns `None, None` if an argument
+            can't be packed using a template """
+
+        shape   = []
+        numbers = []
+
+        for address, args in messages:
+
+            item = [address]
+
+            for arg in args:
+
+                if type(arg) is str:
+
+                    item.append(arg)
+
+                elif type(arg) in FloatTypes or type(arg) in IntTypes:
+
+                    item.append(type(arg))
+                    numbers.append(arg)
+
+                else:
+
+                    return None, None
+
+            shape.append(tuple(item))
+
+        return tuple(shape), numbers
+
+    def pack(self, numbers):
+        """ Returns the binary data for the bundle's messages """
+        return self.struct.pack(*self.order(self.constants + tuple(numbers)))
+
+class BusAllocator(object):
+    """
+    Hands out the audio buses used by each note. A bus is leased until the note
+    using it is expected to have finished, and only then returned to a free list
+    to be reused. When every bus is in use, the one whose note ends soonest is
+    reused and counted as an overflow in `stats`.
+    """
+    def __init__(self, first=4, last=100, channels=2):
+        self.channels = channels
+        self.lock = threading.Lock()
+        self.reset(first, last)
+
+    def reset(self, first, last):
+        """ Frees all buses and uses the ones from `first` up to, but not including, `last` """
+        with self.lock:
+            self.first     = first
+            self.last      = last
+            self.free      = deque(range(first, last - self.channels + 1, self.channels))
+            self.size      = len(self.free)
+            self.leases    = [] # heap of (end time, bus)
+            self.allocated = 0
+            self.overflows = 0
+            self.peak      = 0
+        return
+
+    def clear(self):
+        """ Frees all buses """
+        return self.reset(self.first, self.last)
+
+    def release(self, now):
+        """ Returns buses whose leases end before `now` to the free list """
+        leases = self.leases
+        while leases and leases[0][0] <= now:
+            self.free.append(heapq.heappop(leases)[1])
+        return
+
+    def lease(self, until, now=None):
+        """ Returns a bus that isn't needed by another note before time `until` """
+        with self.lock:
+            self.release(time.time() if now is None else now)
+            if self.free:
+                bus = self.free.popleft()
+            elif self.leases:
+                bus = heapq.heappop(self.leases)[1]
+                if self.overflows == 0:
+                    WarningMsg("All {} audio buses are in use, notes may be cut off".format(self.size))
+                self.overflows += 1
+            else:
+                raise ValueError("No audio buses between {} and {}".format(self.first, self.last))
+            heapq.heappush(self.leases, (until, bus))
+            self.allocated += 1
+            self.peak = max(self.peak, len(self.leases))
+        return bus
+
+    def cancel(self, until, bus):
+        """ Frees a bus before its lease ends e.g. when a note is not going to be played """
+        with self.lock:
+            try:
+                self.leases.remove((until, bus))
+            except ValueError:
+                return
+            heapq.heapify(self.leases)
+            self.free.append(bus)
+        return
+
+    def stats(self):
+        """ Returns the number of buses in use, the most used at once, and the number
+            of times a bus had to be taken from a note that might still be playing """
+        with self.lock:
+            self.release(time.time())
+            return {"buses": self.size, "in_use": len(self.leases), "peak": self.peak,
+                    "allocated": self.allocated, "overflows": self.overflows}
+
 # TODO -- Create an abstract base class that could be sub-classed for users who want to send their OSC messages elsewhere
 
 class ServerManager(object):
@@ -161,15 +358,26 @@ class SCLangServerManager(ServerManager):
         self.forward = None
 
         self.node = 1000
+        self.max_node = 2 ** 31 - 1
+        self.node_lock = threading.Lock()
         self.num_input_busses = 2
         self.num_output_busses = 2
-        self.bus = self.num_input_busses + self.num_output_busses
         self.max_busses = 100
         self.max_buffers = 1024
 
+        # The makeSound SynthDef frees a note after sus * max_duration + 0.1 seconds
+        # at most (see Effects.Out), so its bus isn't reused before then
+        self.max_note_duration = 8
+        self.note_release = 0.1
+        self.buses = BusAllocator(self.num_input_busses + self.num_output_busses, self.max_busses)
+
         self.fx_setup_done = False
         self.fx_names = {}
 
+        # Pre-encoded bundles for each combination of synth and effects
+        self.bundle_templates = {}
+        self.max_bundle_templates = 1024
+
         # OSC Connection for custom OSCFunc in SuperCollider
         self.sclang = SCLangBidirectionalClient()
         self.sclang.connect( (self.addr, self.SCLang_port) )
@@ -184,7 +392,7 @@ class SCLangServerManager(ServerManager):
             self.num_input_busses = info.num_input_bus_channels
             self.num_output_busses = info.num_output_bus_channels
             self.max_busses = info.num_audio_bus_channels
-            self.bus = self.num_input_busses + self.num_output_busses
+            self.buses.reset(self.num_input_busses + self.num_output_busses, self.max_busses)
 
         # Clear SuperCollider nodes if any left over from other session etc
 
@@ -202,21 +410,26 @@ class SCLangServerManager(ServerManager):
 
     def nextnodeID(self):
         """ Gets the next node ID to use in SuperCollider """
-        self.node += 1
-        return self.node
+        with self.node_lock:
+            self.node += 1
+            if self.node > self.max_node:
+                self.node = 1001
+            return self.node
 
     def query(self):
         """ Prints debug status to SuperCollider console """
         self.client.send(OSCMessage("/status"))
         return
 
-    def nextbusID(self):
-        """ Gets the next SuperCollider bus to use """
-        self.bus += 2
-        # Make sure we still have 2 audio channels available
-        if self.bus + 1 >= self.max_busses:
-            self.bus = self.num_input_busses + self.num_output_busses
-        return self.bus
+    def nextbusID(self, until=None):
+        """ Gets the next SuperCollider bus to use, which won't be used by
+            another note before the time `until` """
+        return self.buses.lease(time.time() if until is None else until)
+
+    def note_end_time(self, packet, start):
+        """ Returns the latest time a note starting at machine time `start` could
+            still be using its bus """
+        return start + float(packet["sus"]) * self.max_note_duration + self.note_release
 
     def sendOSC(self, packet):
         """ Compiles and sends an 's_new' OSC message for SuperCollider """
@@ -258,8 +471,6 @@ class SCLangServerManager(ServerManager):
 
 
     def get_init_node(self, node, bus, group_id, synthdef, packet):
-    
-        msg = OSCMessage("/s_new")
 
         # Make sure messages release themselves after 8 * the duration at max (temp)
         
@@ -277,9 +488,7 @@ class SCLangServerManager(ServerManager):
         
         osc_packet = ["startSound", node, 0, group_id, 'bus', bus, "sus", max_sus] + value
 
-        msg.append( osc_packet )
-        
-        return msg, node
+        return ("/s_new", osc_packet), node
 
     def get_control_effect_nodes(self, node, bus, group_id, effects):
 
@@ -294,19 +503,14 @@ class SCLangServerManager(ServerManager):
                 # Get next node ID
                 node, last_node = self.nextnodeID(), node
             
-                msg = OSCMessage("/s_new")
-            
                 osc_packet = [self.fx_names[fx], node, 1, group_id, 'bus', bus] + this_effect
             
-                msg.append(osc_packet)
-            
-                pkg.append(msg)
+                pkg.append(("/s_new", osc_packet))
 
         return pkg, node
 
-    def get_synth_node(self, node, bus, group_id, synthdef, packet):
-        
-        msg = OSCMessage("/s_new")
+    def get_synth_args(self, packet):
+        """ Returns the arguments for a synth node from a packet as floats """
 
         new_message = {}
 
@@ -323,6 +527,12 @@ class SCLangServerManager(ServerManager):
                     WarningMsg( "Could not convert '{}' argument '{}' to float. Set to 0".format( key, packet[key] ))
                     new_message[key] = 0.0
 
+        return new_message
+
+    def get_synth_node(self, node, bus, group_id, synthdef, packet):
+
+        new_message = self.get_synth_args(packet)
+
         # Get next node ID
 
         node, last_node = self.nextnodeID(), node
@@ -330,9 +540,7 @@ class SCLangServerManager(ServerManager):
         osc_packet = [synthdef.name, node, 1, group_id, synthdef.bus_name, bus] \
             + self.create_osc_msg(new_message)
 
-        msg.append( osc_packet )
-
-        return msg, node
+        return ("/s_new", osc_packet), node
 
     def get_pre_env_effect_nodes(self, node, bus, group_id,effects):
 
@@ -346,10 +554,8 @@ class SCLangServerManager(ServerManager):
 
                 # Get next node ID
                 node, last_node = self.nextnodeID(), node
-                msg = OSCMessage("/s_new")
                 osc_packet = [self.fx_names[fx], node, 1, group_id, 'bus', bus] + this_effect
-                msg.append( osc_packet )
-                pkg.append(msg)
+                pkg.append(("/s_new", osc_packet))
     
         return pkg, node
 
@@ -388,11 +594,9 @@ class SCLangServerManager(ServerManager):
             dest = "BasicEnvelope"
 
         node, last_node = self.nextnodeID(), node
-        msg = OSCMessage("/s_new")
         osc_packet = [dest, node, 1, group_id, 'bus', bus] + self.create_osc_msg(env_packet)
-        msg.append( osc_packet )
 
-        return msg, node
+        return ("/s_new", osc_packet), node
 
     def get_post_env_effect_nodes(self, node, bus, group_id, effects ):
 
@@ -406,47 +610,54 @@ class SCLangServerManager(ServerManager):
 
                 # Get next node ID
                 node, last_node = self.nextnodeID(), node
-                msg = OSCMessage("/s_new")
                 osc_packet = [self.fx_names[fx], node, 1, group_id, 'bus', bus] + this_effect
-                msg.append( osc_packet )
-                pkg.append(msg)
+                pkg.append(("/s_new", osc_packet))
 
         return pkg, node
 
     def get_exit_node(self, node, bus, group_id, packet):
         
-        msg = OSCMessage("/s_new")
         node, last_node = self.nextnodeID(), node
         osc_packet = ['makeSound', node, 1, group_id, 'bus', bus, 'sus', float(packet["sus"])]
-        msg.append( osc_packet )
 
-        return msg, node
+        return ("/s_new", osc_packet), node
 
-    def get_bundle(self, synthdef, packet, effects, timestamp=0):    
+    def get_bundle(self, synthdef, packet, effects, timestamp=0, direct=False, start=None):
+        """ Returns the OSCBundle for a note. `start` is the machine time the note
+            will play, which is `timestamp` unless the bundle is re-stamped later
+            (see `Player.prerender`). The bundle's `lease` is the (end time, bus)
+            used by the note """
 
         # Get the actual synthdef object
 
         synthdef = self.synthdefs[synthdef]
 
-        # Create a bundle
-        
-        bundle = OSCBundle(time=timestamp)
-
         # Create a specific message for midi
 
         if synthdef.name == "MidiOut": # this should be in a dict of synthdef to functions maybe? we need a "nudge to sync"
 
             return self.get_midi_message(synthdef, packet)
 
+        # Notes without effects can be played by a single node
+
+        if direct and not effects and synthdef.direct_name is not None:
+
+            return self.get_direct_bundle(synthdef, packet, timestamp)
+
+        # List of (address, arguments) for each message in the bundle
+
+        messages = []
+
         # Create a group for the note
         group_id = self.nextnodeID()
-        msg = OSCMessage("/g_new")
-        msg.append( [group_id, 1, 1] )
-        
-        bundle.append(msg)
+
+        messages.append( ("/g_new", [group_id, 1, 1]) )
 
         # Get the bus and SynthDef nodes
-        this_bus  = self.nextbusID()
+        if start is None:
+            start = timestamp or time.time()
+        bus_until = self.note_end_time(packet, start)
+        this_bus  = self.nextbusID(bus_until)
         this_node = self.nextnodeID()
 
         synthdef.preprocess_osc(packet)
@@ -457,49 +668,95 @@ class SCLangServerManager(ServerManager):
 
         # Add effects to control rate e.g. vibrato        
 
-        bundle.append( msg )
+        messages.append( msg )
 
         pkg, this_node = self.get_control_effect_nodes(this_node, this_bus, group_id, effects)
 
-        for msg in pkg:
-
-            bundle.append(msg)
+        messages.extend(pkg)
 
         # trigger synth
 
         msg, this_node = self.get_synth_node(this_node, this_bus, group_id, synthdef, packet)
 
-        bundle.append(msg)
+        messages.append(msg)
 
         # ORDER 1
 
         pkg, this_node = self.get_pre_env_effect_nodes(this_node, this_bus, group_id, effects)
 
-        for msg in pkg:
-
-            bundle.append(msg)
+        messages.extend(pkg)
 
         # ENVELOPE
 
         # msg, this_node = self.get_synth_envelope(this_node, this_bus, group_id, synthdef, packet)
 
-        # bundle.append( msg )
+        # messages.append( msg )
 
         # ORDER 2 (AUDIO EFFECTS)
 
         pkg, this_node = self.get_post_env_effect_nodes(this_node, this_bus, group_id, effects)
     
-        for msg in pkg:
-    
-            bundle.append(msg)
+        messages.extend(pkg)
 
         # OUT
 
         msg, _ = self.get_exit_node(this_node, this_bus, group_id, packet)
 
-        bundle.append(msg)
+        messages.append(msg)
+
+        bundle = self.compile_bundle(messages, timestamp)
+
+        bundle.lease = (bus_until, this_bus)
         
-        return bundle        
+        return bundle
+
+    def get_direct_bundle(self, synthdef, packet, timestamp=0):
+        """ Returns a bundle with a single `/s_new` message that plays a note on the
+            SynthDef's "direct" version, which writes straight to the output and
+            frees itself, so no group, bus, or startSound and makeSound nodes are
+            needed """
+
+        synthdef.preprocess_osc(packet)
+
+        osc_packet = [synthdef.direct_name, self.nextnodeID(), 1, 1] + self.create_osc_msg(self.get_synth_args(packet))
+
+        return self.compile_bundle([("/s_new", osc_packet)], timestamp)
+
+    def compile_bundle(self, messages, timestamp=0):
+        """ Creates an OSCBundle from a list of (address, arguments) tuples. Bundles
+            with the same addresses, string arguments, and number types share a
+            pre-encoded `BundleTemplate` so that only the numbers are packed """
+
+        bundle = OSCBundle(time=timestamp)
+
+        shape, numbers = BundleTemplate.get_shape(messages)
+
+        if shape is None:
+
+            # Contains values the template can't pack, so encode as normal
+
+            for address, osc_packet in messages:
+
+                msg = OSCMessage(address)
+                msg.append(osc_packet)
+                bundle.append(msg)
+
+            return bundle
+
+        template = self.bundle_templates.get(shape, None)
+
+        if template is None:
+
+            if len(self.bundle_templates) >= self.max_bundle_templates:
+
+                self.bundle_templates.clear()
+
+            template = self.bundle_templates[shape] = BundleTemplate(shape)
+
+        bundle.message  = template.pack(numbers)
+        bundle.typetags = template.typetags
+
+        return bundle
 
     def send(self, address, message):
         """ Sends message (a list) to SuperCollider """
@@ -635,61 +892,140 @@ except ImportError:
 
 
 
+class JSONCodec(object):
+    """ Converts the data sent between TempoServer and TempoClient to and from
+        JSON. Any object with `encode` and `decode` methods that convert between
+        Python data and bytes can be used instead by passing it as `codec` """
+    name = "json"
+    def encode(self, data):
+        return json.dumps(data, separators=(',',':')).encode("utf-8")
+    def decode(self, data):
+        return json.loads(data.decode("utf-8"))
+
+default_codec = JSONCodec()
+
+# Each message is prefixed with its length as an unsigned 32 bit int. Messages must
+# be shorter than 16MB so the first byte of the header is always 0, which tells
+# them apart from the 4 digit ASCII lengths used by older versions of FoxDot
+
+MESSAGE_HEADER   = struct.Struct("!I")
+MAX_MESSAGE_SIZE = (1 << 24) - 1
+
+# Older versions can only read JSON with a 4 digit header, so a TempoClient sends its
+# first message that way and includes this flag to say that it can read binary headers.
+# Servers reply to clients without the flag using 4 digit headers.
+
+BINARY_HEADER_FLAG = "binary"
+LEGACY_MAX_SIZE    = 9999
+
 class Message:
-    """ Wrapper for JSON messages sent to the server """
-    def __init__(self, data):
-        self.data = data
-    def __str__(self):
-        """ Prepares the json message to be sent with first 4 digits
-            denoting the length of the message """
-        packet = str(json.dumps(self.data, separators=(',',':')))
-        length = "{:04d}".format( len(packet) )
-        return length + packet
+    """ Wrapper for messages sent to the server. The data is encoded once, using
+        `codec`, and prefixed with its length. If `legacy` is True, the data is
+        sent as JSON with a 4 digit length for older versions of FoxDot """
+    def __init__(self, data, codec=None, legacy=False):
+        self.data   = data
+        self.codec  = codec if codec is not None and not legacy else default_codec
+        self.legacy = legacy
+        self.packet = None
+    def encode(self):
+        """ Returns the header and encoded data as bytes """
+        if self.packet is None:
+            payload = self.codec.encode(self.data)
+            if self.legacy:
+                if len(payload) > LEGACY_MAX_SIZE:
+                    raise ValueError("Message of {} bytes is too large for older versions of FoxDot".format(len(payload)))
+                self.packet = "{:04d}".format(len(payload)).encode() + payload
+            else:
+                if len(payload) > MAX_MESSAGE_SIZE:
+                    raise ValueError("Message of {} bytes is too large to send".format(len(payload)))
+                self.packet = MESSAGE_HEADER.pack(len(payload)) + payload
+        return self.packet
     def __len__(self):
-        return len(str(self))
-    def asString(self):
-        return str(self)
+        return len(self.encode())
 
-def read_from_socket(sock):
-    """ Reads data from the socket """
-    # Get number single int that tells us how many digits to read
+def read_exactly(sock, size):
+    """ Reads `size` bytes from the socket, returns None if the connection is closed first """
+    data = b""
+    while len(data) < size:
+        try:
+            chunk = sock.recv(size - len(data))
+        except (socket.error, OSError, ValueError):
+            return None
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def read_header(header):
+    """ Returns the length of a message from its header and whether it was sent
+        by an older version of FoxDot, which uses 4 digits and JSON """
+    if header[:1] != b"\x00":
+        return int(header.decode()), True
+    return MESSAGE_HEADER.unpack(header)[0], False
+
+def read_message(sock, codec=None):
+    """ Reads a message from the socket and returns it with True if it has a 4 digit
+        header, or (None, False) if the connection is closed or the message is invalid """
+    header = read_exactly(sock, MESSAGE_HEADER.size)
+    if header is None:
+        return None, False
     try:
-        bits = int(sock.recv(4).decode())
-    except:
-        return None
+        bits, legacy = read_header(header)
+    except ValueError:
+        return None, False
+    if legacy:
+        codec = default_codec
     if bits > 0:
-        # Read the remaining data (JSON)
-        data = sock.recv(bits).decode()
-        # Convert back to Python data structure
-        return json.loads(data)
-
-def send_to_socket(sock, data):
-    """ Converts Python data structure to JSON message and
-        sends to a connected socket """
-    msg = Message(data)
-    # Get length and store as string
-    msg_len, msg_str = len(msg), str(msg).encode()
-    # Continually send until we know all of the data has been sent
-    sent = 0
-    while sent < msg_len:
-        bits = sock.send(msg_str[sent:])
-        sent += bits
+        data = read_exactly(sock, bits)
+        if data is None:
+            return None, False
+        try:
+            return (codec if codec is not None else default_codec).decode(data), legacy
+        except ValueError:
+            pass
+    return None, False
+
+def read_from_socket(sock, codec=None):
+    """ Reads a message from the socket, returns None if the connection is closed
+        or the message is invalid """
+    return read_message(sock, codec)[0]
+
+def uses_legacy_header(data, legacy):
+    """ Returns True if replies to a client's first message should use 4 digit headers """
+    return legacy and not (isinstance(data, list) and BINARY_HEADER_FLAG in data)
+
+def send_to_socket(sock, data, codec=None, legacy=False):
+    """ Encodes a Python data structure and sends it to a connected socket """
+    sock.sendall(Message(data, codec, legacy).encode())
     return
 
 class ThreadedServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
     """ Base class """
     pass
 
+def get_public_address(hostname):
+    """ Public ip for server is the first IPv4 address we find, else just show the hostname """
+    try:
+        for info in socket.getaddrinfo(hostname, None):
+            if info[0] == 2:
+                return info[4][0]
+    except socket.gaierror:
+        pass
+    return hostname
+
 class TempoServer(ThreadedServer):
     """ Used in TempoClock.py to connect to instances of FoxDot over a network. Sends
         bpm changes over the network. On initial request this sends the start_time value
         of the clock """
 
-    def __init__(self, clock, port=57999):
+    def __init__(self, clock, port=57999, codec=None):
         # tempo clock
         RequestHandler.metro  = self.metro = clock
         RequestHandler.master = self
 
+        # Encoding used for messages
+        self.codec = codec if codec is not None else default_codec
+
         # Address information
         self.hostname = str(socket.gethostname())
 
@@ -697,16 +1033,7 @@ class TempoServer(ThreadedServer):
         self.ip_addr  = "0.0.0.0"
         self.port     = int(port)
 
-        # Public ip for server is the first IPv4 address we find, else just show the hostname
-        self.ip_pub = self.hostname
-        
-        try:
-            for info in socket.getaddrinfo(socket.gethostname(), None):
-                if info[0] == 2:
-                    self.ip_pub = info[4][0]
-                    break
-        except socket.gaierror:
-            pass
+        self.ip_pub = get_public_address(self.hostname)
 
         # Instantiate server process
 
@@ -749,20 +1076,38 @@ class RequestHandler(socketserver.BaseRequestHandler):
     """
     master = None
 
+    def setup(self):
+        """ Overload """
+        self.codec  = self.master.codec
+        self.lock   = threading.Lock()
+        self.legacy = False
+        return
+
+    def send(self, data):
+        """ Sends data to the client. Tempo updates are sent from other threads
+            so messages are sent one at a time """
+        with self.lock:
+            send_to_socket(self.request, data, self.codec, self.legacy)
+        return
+
     def handle(self):
         """ Overload """
 
-        # First we get latency
+        # First we get latency, and whether the client can read binary headers
+
+        data, legacy = read_message(self.request, self.codec)
 
-        read_from_socket(self.request)
+        self.legacy = uses_legacy_header(data, legacy)
 
-        send_to_socket(self.request, {"clock_time": time.time()})
+        self.send({"clock_time": time.time()})
 
         self.master.peers.append(self)
 
         while True:
 
-            data = read_from_socket(self.request)
+            data = read_from_socket(self.request, self.codec)
+
+            recv_time = time.time()
 
             if data is None:
 
@@ -772,11 +1117,17 @@ class RequestHandler(socketserver.BaseRequestHandler):
 
             else:
 
+                # Send back the time the ping was received and replied to
+
+                if "ping" in data:
+
+                    self.send({"pong": [data["ping"], recv_time, time.time()]})
+
                 # Get the requested data and send to client
 
-                if "request" in data:
+                elif "request" in data:
 
-                    send_to_socket(self.request, self.metro.get_sync_info())
+                    self.send(self.metro.get_sync_info())
 
                 elif "new_bpm" in data:
 
@@ -787,15 +1138,99 @@ class RequestHandler(socketserver.BaseRequestHandler):
 
     def update_tempo(self, bpm):
 
-        send_to_socket(self.request, {"new_bpm": bpm })
+        self.send({"new_bpm": bpm })
 
         return
 
 
+class ClockOffset:
+    """ Estimates the difference between the time on a TempoServer and on this machine
+        from timestamped pings, in the same way as NTP. For each ping:
+
+            offset = ((t1 - t0) + (t2 - t3)) / 2
+            delay  = (t3 - t0) - (t2 - t1)
+
+        where t0 and t3 are the local times the ping was sent and the reply received,
+        and t1 and t2 the server times the ping was received and replied to. The error
+        in an offset is at most half its delay, so the offset of the sample with the
+        smallest delay out of the last `size` is used. Samples further from the current
+        estimate than can be explained by their delay and the jitter are discarded
+        unless `max_spikes` arrive in a row, which means the offset has really changed.
+    """
+    def __init__(self, size=8, spike=3.0, max_spikes=3):
+        self.samples    = deque(maxlen=size)
+        self.spike      = spike
+        self.max_spikes = max_spikes
+        self.spikes     = 0
+        self.offset     = None
+        self.delay      = None
+        self.jitter     = 0.0
+        self.count      = 0
+        self.rejected   = 0
+
+    def add(self, t0, t1, t2, t3):
+        """ Adds a sample and returns True if it was not rejected as an outlier """
+        offset = ((t1 - t0) + (t2 - t3)) * 0.5
+        delay  = max((t3 - t0) - (t2 - t1), 0.0)
+
+        self.count += 1
+
+        if self.offset is not None:
+
+            limit = (delay + self.delay) * 0.5 + self.spike * self.jitter
+
+            if abs(offset - self.offset) > limit:
+
+                self.spikes += 1
+
+                if self.spikes < self.max_spikes:
+
+                    self.rejected += 1
+
+                    return False
+
+                # The offset has stepped, so older samples are no use
+
+                self.samples.clear()
+
+        self.spikes = 0
+
+        self.samples.append((delay, offset))
+
+        self.delay, self.offset = min(self.samples)
+
+        if len(self.samples) > 1:
+
+            self.jitter = (sum((sample[1] - self.offset) ** 2 for sample in self.samples) / (len(self.samples) - 1)) ** 0.5
+
+        else:
+
+            self.jitter = 0.0
+
+        return True
+
+    def stats(self):
+        """ Returns the current estimate as a dictionary """
+        return {"offset": self.offset, "delay": self.delay, "jitter": self.jitter,
+                "samples": self.count, "rejected": self.rejected}
+
+
 class TempoClient:
-    def __init__(self, clock):
+    def __init__(self, clock, codec=None, ping_interval=1.0):
         self.metro = clock
 
+        self.codec  = codec if codec is not None else default_codec
+        self.lock   = threading.Lock()
+        self.legacy = False
+
+        # Seconds to wait for the server to reply when connecting
+        self.timeout = 5
+
+        # Time between pings used to estimate the offset from the server clock
+        self.ping_interval = ping_interval
+        self.clock_offset  = ClockOffset()
+        self.stopped       = threading.Event()
+
         self.server_hostname = None
         self.server_port     = None
         self.server_address  = None
@@ -824,21 +1259,41 @@ class TempoClient:
 
             raise(ConnectionError("Could not connect to host '{}'".format( self.server_hostname ) ) )
 
-        # connect to the server and listen for new updates for the tempo-clock
+        # Send init message with a header older versions of FoxDot can read. The reply
+        # is the server's machine time and uses a binary header if the server can
 
-        self.listening = True
-        self.daemon = Thread(target=self.listen)
-        self.daemon.start()
-
-        # Send init message
         self.start_time = None
         self.stop_time  = None
         self.latency    = None
 
-        send_to_socket(self.socket, ["init"])
-        
+        self.socket.settimeout(self.timeout)
+
         self.start_timing()
 
+        send_to_socket(self.socket, ["init", BINARY_HEADER_FLAG], legacy=True)
+
+        time_data, self.legacy = read_message(self.socket, self.codec)
+
+        self.stop_timing()
+
+        self.socket.settimeout(None)
+
+        if time_data is None:
+
+            self.socket.close()
+
+            raise socket.error("No reply from host '{}'".format(self.server_hostname))
+
+        self.clock_offset.add(self.start_time, time_data["clock_time"], time_data["clock_time"], self.stop_time)
+
+        self.metro.calculate_nudge(time_data["clock_time"], self.stop_time, self.latency)
+
+        # connect to the server and listen for new updates for the tempo-clock
+
+        self.listening = True
+        self.daemon = Thread(target=self.listen)
+        self.daemon.start()
+
         return self
 
     def start_timing(self):
@@ -850,30 +1305,37 @@ class TempoClient:
 
     def send(self, data):
         """ Sends data to server """
-        return send_to_socket(self.socket, data)
+        with self.lock:
+            send_to_socket(self.socket, data, self.codec, self.legacy)
+        return
 
     def listen(self):
         """ Listens out for data coming from the server and passes it on
             to the handler.
         """
-        # First message is machine clock time
+        # Keep measuring the offset in case the clocks drift apart. Older versions
+        # of FoxDot don't reply to pings
 
-        time_data = read_from_socket(self.socket)
+        if not self.legacy:
 
-        self.stop_timing()
-
-        self.metro.calculate_nudge(time_data["clock_time"], self.stop_time, self.latency)
+            self.pinger = Thread(target=self.ping)
+            self.pinger.daemon = True
+            self.pinger.start()
         
         # Enter loop
 
         while self.listening:
             
-            data = read_from_socket(self.socket)
+            data = read_from_socket(self.socket, self.codec)
             
             if data is None:
                 break
+
+            if "pong" in data:
+
+                self.update_offset(*(data["pong"] + [time.time()]))
             
-            if "sync" in data:
+            elif "sync" in data:
                 for key in ("start_time", "bpm", "beat", "time"):
                     if key in data["sync"]:
                         self.metro.set_attr(key, data["sync"][key])
@@ -883,12 +1345,41 @@ class TempoClient:
                 self.metro.update_tempo(data["new_bpm"])
         return
 
+    def ping(self):
+        """ Sends the current time to the server every `ping_interval` seconds """
+        while not self.stopped.wait(self.ping_interval):
+            try:
+                self.send({"ping": time.time()})
+            except (socket.error, OSError):
+                break
+        return
+
+    def update_offset(self, t0, t1, t2, t3):
+        """ Adds the times from a ping to the offset estimate and slews the clock's
+            hard_nudge towards it """
+        if self.clock_offset.add(t0, t1, t2, t3):
+            self.metro.adjust_nudge(-self.clock_offset.offset)
+        return
+
+    def stats(self):
+        """ Returns the estimated offset, delay and jitter between this machine
+            and the server in seconds """
+        stats = self.clock_offset.stats()
+        stats["hard_nudge"] = self.metro.hard_nudge
+        return stats
+
     def update_tempo(self, bpm):
-        send_to_socket(self.socket, {"new_bpm": bpm})
+        self.send({"new_bpm": bpm})
 
     def kill(self):
         """ Properly terminates the connection to the server """
         self.listening = False
+        self.stopped.set()
+        try:
+            # Wakes the listening thread
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except (socket.error, OSError):
+            pass
         self.socket.close()
         return
 
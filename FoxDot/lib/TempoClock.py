@@ -8,18 +8,31 @@
     a queue of event blocks, instances of the `QueueBlock` class, which themselves contain queue
     items, instances of the `QueueObj` class, which themseles contain the actual object or function
     to be called. The `TempoClock` is continually running and checks if any queue block should 
-    be activated. A queue block has a "beat" value for which its contents should be activated. To make
-    sure that events happen on time, the `TempoClock` will begin processing the contents 0.25
-    seconds before it is *actually* meant to happen in case there is a large amount to process.  When 
-    a queue block is activated, a new thread is created to process all of the callable objects it
-    contains. If it calls a `Player` object, the queue block keeps track of the OSC messages generated 
-    until all `Player` objects in the block have been called. At this point the thread is told to
-    sleep until the remainder of the 0.25 seconds has passed. This value is stored in `Clock.latency`
-    and is adjustable. If you find that there is a noticeable jitter between events, i.e. irregular
-    beat lengths, you can increase the latency by simply evaluating the following in FoxDot:
+    be activated. Rather than polling constantly, the clock sleeps until shortly before the next
+    queue block is due and is woken early if something is scheduled sooner. Set
+    `Clock.event_driven = False` to poll every `Clock.sleep_time` seconds instead. A queue block
+    has a "beat" value for which its contents should be activated. To make sure that events happen
+    on time, the `TempoClock` will begin processing the contents 0.25 seconds before it is
+    *actually* meant to happen in case there is a large amount to process. When a queue block is
+    activated, it is handed to one of a fixed number of worker threads (set using `Clock.workers`)
+    which processes all of the callable objects it contains. Players that don't use each other's
+    values can be called at the same time by setting `Clock.render_workers` to the number of
+    threads to use. If it calls a `Player` object, the queue block keeps track of the OSC messages
+    generated until all `Player` objects in the block have been called. At this point the thread is
+    told to sleep until the remainder of the 0.25 seconds has passed. This value is stored in
+    `Clock.latency` and is adjustable. If you find that there is a noticeable jitter between
+    events, i.e. irregular beat lengths, you can increase the latency by simply evaluating the
+    following in FoxDot:
 
         Clock.latency = 0.5
 
+    Alternatively, players whose attributes are all fixed values (no `var`s, references to other
+    players, or random generators) can have their events worked out and compiled ahead of time
+    by a background thread. Set `Clock.lookahead` to the number of beats to render in advance,
+    which leaves little more than sending the messages to be done within the latency:
+
+        Clock.lookahead = 4
+
     To stop the clock from scheduling further events, use the `Clock.clear()` method, which is
     bound to the shortcut key, `Ctrl+.`. You can schedule non-player objects in the clock by
     using `Clock.schedule(func, beat, args, kwargs)`. By default `beat` is set to the next
@@ -56,16 +69,24 @@ from .Patterns import asStream
 from .TimeVar import TimeVar
 from .Midi import MidiIn, MIDIDeviceNotFound
 from .Utils import modi
-from .ServerManager import TempoClient
+from .ServerManager import TempoClient, OSCBundle
 
 from time import sleep, time, clock
 from fractions import Fraction
+from collections import deque
 from traceback import format_exc as error_stack
 
 import sys
+import heapq
+import struct
 import threading
 import inspect
 
+if sys.version_info[0] > 2:
+    import queue
+else:
+    import Queue as queue
+
 class TempoClock(object):
 
     tempo_server = None
@@ -81,10 +102,14 @@ class TempoClock(object):
         self.largest_sleep_time = 0
         self.last_block_dur = 0.0
 
+        # Numeric type used to store time, see `set_time_base`
+
         self.dtype=Fraction
+        self.time_base = "fraction"
 
         # Store time as a rational number
-        
+
+        self.time_lock  = threading.Lock()
         self.time       = self.dtype(0) # Seconds elsapsed
         self.beat       = self.dtype(0) # Beats elapsed
         self.start_time = self.dtype(time()) # could set to 0?
@@ -118,6 +143,40 @@ class TempoClock(object):
         self.hard_nudge = 0.0
         self.sleep_time = 0.0001 # The duration to sleep while continually looping
 
+        # When synced to a TempoServer, hard_nudge is moved towards new estimates of the
+        # clock offset by at most `nudge_slew` seconds per second, unless the estimate
+        # is more than `nudge_step` seconds away, in which case it is set immediately
+        self.nudge_slew = 0.0005
+        self.nudge_step = 0.128
+        self.nudge_time = None
+
+        # If True, the clock thread sleeps until the next event instead of polling
+        self.event_driven   = True
+        self.spin_time      = 0.002 # Time before an event to switch to polling
+        self.max_sleep_time = 0.05  # Longest the clock thread will sleep for in one go
+        self.workers    = 4      # Number of threads used to process queue blocks
+
+        # If more than 0, players in a block that don't depend on each other are
+        # called at the same time using this many threads
+        self.render_workers = 0
+
+        # If True, the bundles in a queue block are merged into as few datagrams as possible
+        self.batch_osc         = False
+        self.max_datagram_size = 1472 # Largest UDP payload that fits in an Ethernet MTU
+
+        # Number of datagrams and bytes sent to the server
+        self.osc_stats      = {"blocks": 0, "datagrams": 0, "bytes": 0}
+        self.osc_stats_lock = threading.Lock()
+
+        # Long-lived threads that queue blocks are dispatched to
+        self.dispatcher = DispatchPool(self.workers)
+        self.render_pool = DispatchPool(1)
+
+        # Number of beats ahead of the clock that players with fixed attributes are
+        # worked out and compiled in a background thread (see `Player.prerender`)
+        self.lookahead   = 0
+        self.prerenderer = Prerenderer()
+
         # Debug
         self.debugging = False
         self.__setup   = True
@@ -130,8 +189,8 @@ class TempoClock(object):
         cls.server = server
         return
 
-    def start_tempo_server(self, serv):
-        self.tempo_server = serv(self)
+    def start_tempo_server(self, serv, **kwargs):
+        self.tempo_server = serv(self, **kwargs)
         self.tempo_server.start()
         return
 
@@ -140,9 +199,9 @@ class TempoClock(object):
             self.tempo_server.kill()
         return
 
-    def connect(self, ip_address, port=57999):
+    def connect(self, ip_address, port=57999, codec=None):
         try:
-            self.tempo_client = TempoClient(self)
+            self.tempo_client = TempoClient(self, codec)
             self.tempo_client.connect(ip_address, port)
             self.tempo_client.send({"request" : ["bpm", "start_time", "beat", "time"]})
         except ConnectionRefusedError as e:
@@ -184,6 +243,10 @@ class TempoClock(object):
                 self.tempo_server.update_tempo(value)
                 
         else:
+            if attr == "workers" and self.__setup:
+                self.dispatcher.resize(value)
+            elif attr == "render_workers" and self.__setup and value > 0:
+                self.render_pool.resize(value)
             self.__dict__[attr] = value
         return
 
@@ -230,6 +293,20 @@ class TempoClock(object):
             print("{}: No MIDI devices found".format(e))
         return
 
+    def dispatch_stats(self):
+        """ Returns a dictionary of counters from the queue block dispatch threads
+            e.g. the number of blocks waiting and the lag (in seconds) between a
+            block being popped from the queue and a thread starting to process it """
+        return self.dispatcher.stats()
+
+    def osc_send_stats(self):
+        """ Returns a dictionary of the total number of queue blocks that
+            have sent messages, and the number of datagrams and bytes sent """
+        with self.osc_stats_lock:
+            stats = dict(self.osc_stats)
+        stats["datagrams_per_block"] = stats["datagrams"] / stats["blocks"] if stats["blocks"] else 0
+        return stats
+
     def debug(self, on=True):
         """ Toggles debugging information printing to console """
         self.debugging = bool(on)
@@ -243,23 +320,67 @@ class TempoClock(object):
         self.time = time() - self.start_time
         for player in self.playing:
             player(count=True)
+        self.queue.wake_up()
+        return
+
+    def set_time_base(self, base="fraction", ppq=1920):
+        """ Sets the numeric type the clock uses to store time. Can be one of:
+
+            - "fraction" (default) stores time as exact rational numbers
+            - "float" stores time as floating point numbers, which is much faster
+            - "ticks" also uses floating point numbers but events are scheduled on
+              a grid of `ppq` integer ticks per beat, so events that should happen
+              at the same time (e.g. after adding durations of 1/3 three times) are
+              always grouped together and the queue is ordered by machine integers
+        """
+
+        if base not in ("fraction", "float", "ticks"):
+
+            raise ValueError("Unknown time base '{}'".format(base))
+
+        self.dtype = Fraction if base == "fraction" else float
+        self.time_base = base
+
+        with self.time_lock:
+            self.time       = self.dtype(self.time)
+            self.beat       = self.dtype(self.beat)
+            self.start_time = self.dtype(self.start_time)
+
+        self.queue.set_resolution(ppq if base == "ticks" else None)
+
         return
 
     def calculate_nudge(self, time1, time2, latency):
         """ Approximates the nudge value of this TempoClock based on the machine time.time()
             value from another machine and the latency between them """
-        self.hard_nudge = time2 - (time1 + latency)
+        self.adjust_nudge(time2 - (time1 + latency))
+        return
+
+    def adjust_nudge(self, value):
+        """ Slews the hard_nudge value towards `value`, the estimated difference between
+            the time on this machine and a TempoServer, so that beats do not jump """
+        now = time()
+        if self.nudge_time is None or abs(value - self.hard_nudge) > self.nudge_step:
+            self.hard_nudge = value
+        else:
+            limit = self.nudge_slew * (now - self.nudge_time)
+            self.hard_nudge += max(-limit, min(limit, value - self.hard_nudge))
+        self.nudge_time = now
         return
 
     def get_sync_info(self):
         """ Returns a serialisable value for Fraction values etc"""
 
+        start_time = Fraction(self.start_time)
+        beat       = Fraction(self.beat)
+        time       = Fraction(self.time)
+
         data = {
             "sync" : {
-                "start_time" : (self.start_time.numerator, self.start_time.denominator),
+                "start_time" : (start_time.numerator, start_time.denominator),
                 "bpm"        : float(self.bpm), # TODO: serialise timevar etc
-                "beat"       : (self.beat.numerator, self.beat.denominator),
-                "time"       : (self.time.numerator, self.time.denominator)
+                "beat"       : (beat.numerator, beat.denominator),
+                "time"       : (time.numerator, time.denominator)
             }
         }
 
@@ -275,7 +396,7 @@ class TempoClock(object):
 
         else:
 
-            setattr(self, key, Fraction(value[0], value[1]))
+            setattr(self, key, self.dtype(Fraction(value[0], value[1])))
 
         return
 
@@ -287,24 +408,43 @@ class TempoClock(object):
         """ Returns the *actual* elapsed time (in beats) when adjusting for latency etc """
         # Get number of seconds elapsed
         now = self.get_elapsed_sec()
-        # Increment the beat counter
-        self.beat += (now - self.time) * (self.dtype(self.get_bpm()) / 60)
-        # Store time
-        self.time  = now
+        bpm = self.dtype(self.get_bpm())
+        with self.time_lock:
+            # Increment the beat counter
+            self.beat += (now - self.time) * (bpm / 60)
+            # Store time
+            self.time  = now
         return self.beat
 
+    def current_beat(self):
+        """ Returns the *actual* elapsed time (in beats) without updating the stored
+            time. Used when the clock thread might be asleep and self.beat is out of date """
+        with self.time_lock:
+            beat, last_time = self.beat, self.time
+        return beat + (self.get_elapsed_sec() - last_time) * (self.dtype(self.get_bpm()) / 60)
+
     def now(self):
         """ Returns the total elapsed time (in beats as opposed to seconds) """
         if self.ticking is False: # Get the time w/o latency if not ticking
-            self.beat = self.true_now()
-        return self.beat + self.beat_dur(self.latency)
+            beat = self.beat = self.true_now()
+        elif self.event_driven:
+            beat = self.current_beat()
+        else:
+            beat = self.beat
+        return beat + self.beat_dur(self.latency)
 
     def osc_message_time(self):
         """ Returns the true time that an osc message should be run i.e. now + latency """
         return time() + self.latency
+
+    def beat_to_time(self, beat):
+        """ Returns the machine time that osc messages for events at `beat` will be
+            stamped with, assuming the tempo doesn't change """
+        return self.osc_message_time() + float(self.beat_dur(beat - self.now()))
         
     def start(self):
         """ Starts the clock thread """
+        self.dispatcher.start()
         main = threading.Thread(target=self.run)
         main.daemon = True
         main.start()
@@ -319,7 +459,23 @@ class TempoClock(object):
 
         block.time = self.osc_message_time()
 
-        for item in block:
+        # Players that can be called at the same time
+
+        parallel = block.independent() if self.render_workers > 0 else []
+
+        parallel = parallel if len(parallel) > 1 else []
+
+        parallel_ids = set(id(item) for item in parallel)
+
+        for item in block.ordered():
+
+            # Call all the independent players once any functions have been called
+
+            if parallel and id(item) in parallel_ids:
+
+                self.__render_players(block, parallel)
+
+                parallel = []
 
             # The item might get called by another item in the queue block
 
@@ -339,11 +495,56 @@ class TempoClock(object):
 
         # Send all the message to supercollider together
 
-        block.send_osc_messages()
+        block.send_osc_messages(self.batch_osc, self.max_datagram_size)
+
+        if block.datagrams:
+
+            with self.osc_stats_lock:
+
+                self.osc_stats["blocks"]    += 1
+                self.osc_stats["datagrams"] += block.datagrams
+                self.osc_stats["bytes"]     += block.bytes_sent
 
         # Store the osc messages
 
-        self.history.add(block.beat, block.osc_messages)
+        self.history.add_packets(block.beat, block.packets)
+
+        return
+
+    def __render_players(self, block, items):
+        """ Calls the Player objects in `items` using the threads in `render_pool` and
+            adds their OSC messages to the block in the same order as `items` """
+
+        views = [QueueBlockView(block) for item in items]
+
+        done = threading.Semaphore(0)
+
+        def render(job):
+            item, view = job
+            try:
+                item.obj.set_queue_block(view)
+                block.call(item)
+            finally:
+                done.release()
+            return
+
+        for job in zip(items, views):
+
+            self.render_pool.submit(render, job)
+
+        for item in items:
+
+            done.acquire()
+
+        for item, view in zip(items, views):
+
+            block.osc_messages.extend(view.osc_messages)
+
+            # Players that didn't schedule another event still refer to this block
+
+            if item.obj.queue_block is view:
+
+                item.obj.set_queue_block(block)
 
         return
 
@@ -364,7 +565,7 @@ class TempoClock(object):
 
                 if len(self.current_block):
 
-                    threading.Thread(target=self.__run_block, args=(self.current_block,)).start()
+                    self.dispatcher.submit(self.__run_block, self.current_block)
 
             # If using a midi-clock, update the values
 
@@ -372,12 +573,37 @@ class TempoClock(object):
 
                 self.midi_clock.update()
 
+            # Sleep until the next event is due unless we need to poll the midi-clock
+
+            elif self.event_driven:
+
+                self.wait_for_event(beat, self.queue.next())
+
+                continue
+
             if self.sleep_time > 0:
 
                 sleep(self.sleep_time)
 
         return
 
+    def wait_for_event(self, beat, next_event):
+        """ Blocks the clock thread until `self.spin_time` seconds before `next_event`
+            (for at most `self.max_sleep_time` seconds) or until an earlier event is
+            scheduled. Within the spin window the clock polls as usual. """
+
+        seconds = min(float(self.beat_dur(next_event - beat)), self.max_sleep_time) - self.spin_time
+
+        if seconds > 0:
+
+            self.queue.wait(next_event, seconds)
+
+        elif self.sleep_time > 0:
+
+            sleep(self.sleep_time)
+
+        return
+
 
     def schedule(self, obj, beat=None, args=(), kwargs={}):
         """ TempoClock.schedule(callable, beat=None)
@@ -433,7 +659,7 @@ class TempoClock(object):
 
     def next_event(self):
         """ Returns the beat index for the next event to be called """
-        return self.queue[-1][1]
+        return self.queue.next()
 
     def call(self, obj, dur, args=()):
         """ Returns a 'schedulable' wrapper for any callable object """
@@ -461,7 +687,9 @@ class TempoClock(object):
 
     def shift(self, n):
         """ Offset the clock time """
-        self.beat += n
+        with self.time_lock:
+            self.beat += n
+        self.queue.wake_up()
         return
 
     def clear(self):
@@ -484,17 +712,61 @@ class TempoClock(object):
         self.playing = []
         self.ticking = False
 
+        self.queue.wake_up()
+
         return
 
 #####
 
 class Queue(object):
+    """ Priority queue of `QueueBlock` instances ordered by beat. Blocks are kept in
+        a binary heap so that adding an event is O(log n) and events scheduled for
+        a beat that already has a block are coalesced into it via a beat -> block
+        dictionary lookup. """
     def __init__(self, parent):
-        self.data = []
+        self.data   = [] # heap of (beat, id, block) entries
+        self.blocks = {} # beat -> QueueBlock for blocks still in the queue
         self.parent = parent
+        self.ppq    = None # If set, beats are stored as integer ticks
+        self.lock   = threading.RLock()
+        self.wake   = threading.Condition(self.lock) # Notified when the next event changes
+        self.count  = 0  # Tie-breaker so that QueueBlocks are never compared
 
     def __repr__(self):
-        return "\n".join([str(item) for item in self.data]) if len(self.data) > 0 else "[]"
+        return "\n".join([str(item) for item in self]) if len(self.data) > 0 else "[]"
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        """ Yields the QueueBlocks, latest first, as they were stored before using a heap """
+        with self.lock:
+            entries = sorted(self.data, reverse=True)
+        for entry in entries:
+            yield entry[-1]
+
+    def set_resolution(self, ppq=None):
+        """ Sets the number of ticks per beat used to order and group events. If
+            `ppq` is None, the beat values are used as they are """
+        with self.lock:
+            self.ppq = None if ppq is None else int(ppq)
+            entries  = [entry[-1] for entry in self.data]
+            del self.data[:]
+            self.blocks.clear()
+            for block in entries:
+                key = self.get_key(block.beat)
+                if key in self.blocks:
+                    self.blocks[key].merge(block)
+                else:
+                    self.blocks[key] = block
+                    self.count += 1
+                    heapq.heappush(self.data, (key, self.count, block))
+            self.wake.notify_all()
+        return
+
+    def get_key(self, beat):
+        """ Returns the value used to order and group events at `beat` """
+        return beat if self.ppq is None else int(round(beat * self.ppq))
 
     def add(self, item, beat, args=(), kwargs={}):
         """ Adds a callable object to the queue at a specified beat, args and kwargs for the
@@ -521,49 +793,41 @@ class Queue(object):
 
                     del kwargs[key]
 
-        # If the new event is before the next scheduled event,
-        # move it to the 'front' of the queue
+        with self.lock:
 
-        if beat < self.next():
+            key = self.get_key(beat)
 
-            self.data.append(QueueBlock(self, item, beat, args, kwargs))
+            # If another event is happening at the same time, schedule together
 
-            block = self.data[-1]
+            block = self.blocks.get(key, None)
 
-        else:
+            if block is not None:
 
-            # If the event is after the next scheduled event, work
-            # out its position in the queue
+                block.add(item, args, kwargs)
 
-            # need to be careful in case self.data changes size
-            
-            for block in self.data:
+            # Otherwise create a new block and push it onto the heap
 
-                # If another event is happening at the same time, schedule together
-
-                if beat == block.beat:
-
-                    block.add(item, args, kwargs)                    
+            else:
 
-                    break
+                # Use the beat of the tick the event falls on
 
-                # If the event is later than the next event, schedule it here
+                if self.ppq is not None:
 
-                if beat > block.beat:
+                    beat = key / self.ppq
 
-                    try:
+                block = QueueBlock(self, item, beat, args, kwargs)
 
-                        i = self.data.index(block)
+                self.blocks[key] = block
 
-                    except ValueError:
+                self.count += 1
 
-                        i = 0
+                heapq.heappush(self.data, (key, self.count, block))
 
-                    self.data.insert(i, QueueBlock(self, item, beat, args, kwargs))
+                # Wake the clock thread if this is now the next event
 
-                    block = self.data[i]
+                if self.data[0][-1] is block:
 
-                    break
+                    self.wake.notify_all()
 
         # Tell any players about what queue item they are in
 
@@ -574,19 +838,41 @@ class Queue(object):
         return
 
     def clear(self):
-        while len(self.data):
-            del self.data[-1]
+        with self.lock:
+            del self.data[:]
+            self.blocks.clear()
+            self.wake.notify_all()
+        return
+
+    def wait(self, beat, timeout):
+        """ Blocks for `timeout` seconds unless an event earlier than `beat`
+            is already in the queue or gets added in that time """
+        with self.wake:
+            if not self.next() < beat:
+                self.wake.wait(timeout)
+        return
+
+    def wake_up(self):
+        """ Wakes the clock thread if it is waiting for the next event """
+        with self.wake:
+            self.wake.notify_all()
         return
 
     def pop(self):
-        return self.data.pop() if len(self.data) > 0 else list()
+        """ Removes and returns the QueueBlock with the earliest beat """
+        with self.lock:
+            if len(self.data) > 0:
+                key, _, block = heapq.heappop(self.data)
+                del self.blocks[key]
+                return block
+        return list()
 
     def next(self):
-        if len(self.data) > 0:
-            try:
-                return self.data[-1].beat
-            except IndexError:
-                pass
+        """ Returns the beat of the earliest QueueBlock """
+        try:
+            return self.data[0][-1].beat
+        except IndexError:
+            pass
         return sys.maxsize
 
     def get_server(self):
@@ -605,11 +891,19 @@ class QueueBlock(object):
     def __init__(self, parent, obj, t, args=(), kwargs={}):
 
         self.events         = [ [] for lvl in self.priority_levels ]
-        self.called_events  = []
+        self.called_events  = set() # ids of QueueObj that have been called
         self.called_objects = []
 
+        # id of each object -> its QueueObj, used to find the item for an object
+        self.queue_items    = {}
+
         self.osc_messages   = []
 
+        # Number of datagrams and bytes sent by send_osc_messages
+        self.datagrams      = 0
+        self.bytes_sent     = 0
+        self.packets        = [] # (is_midi, bytes) of each packet sent
+
         self.server = parent.get_server()
 
         self.beat = t
@@ -632,6 +926,8 @@ class QueueBlock(object):
 
         q_obj = QueueObj(obj, args, kwargs)
 
+        self.queue_items.setdefault(id(obj), q_obj)
+
         for i, in_level in enumerate(self.priority_levels):
 
             if in_level(obj):
@@ -641,19 +937,72 @@ class QueueBlock(object):
                 break
         return
 
+    def merge(self, other):
+        """ Adds the items from another QueueBlock to this one """
+        for level, items in zip(self.events, other.events):
+            level.extend(items)
+        for item in other:
+            self.queue_items.setdefault(id(item.obj), item)
+        for item in other.objects():
+            if isinstance(item, Player):
+                item.set_queue_block(self)
+        return
+
     def __call__(self):
         """ Calls self.osc_messages() """
         self.send_osc_messages()
 
-    def send_osc_messages(self):
-        """ Sends all compiled osc messages to the SuperCollider server """
-        for msg in self.osc_messages:
-            if msg.address == "/foxdot_midi": # TODO -- dont hard code this
-                self.server.sclang.send(msg)
+    def send_osc_messages(self, batch=False, max_size=1472):
+        """ Sends all compiled osc messages to the SuperCollider server. If
+            `batch` is True, bundles are merged using `batch_osc_messages` """
+        self.datagrams  = 0
+        self.bytes_sent = 0
+        self.packets    = []
+        messages = self.batch_osc_messages(max_size) if batch else self.osc_messages
+        for msg in messages:
+            # Encode once for sending, counting the bytes, and the clock's history
+            data = msg.getBinary()
+            midi = msg.address == "/foxdot_midi" # TODO -- dont hard code this
+            if midi:
+                self.server.sclang.send_binary(data)
             else:
-                self.server.client.send(msg)        
+                self.server.client.send_binary(data)
+            self.packets.append((midi, data))
+            self.datagrams  += 1
+            self.bytes_sent += len(data)
         return
 
+    def batch_osc_messages(self, max_size=1472):
+        """ Returns a list of OSC packets in which bundles with the same time tag
+            are merged into one bundle, starting a new bundle if the encoded size
+            would be more than `max_size` bytes. SuperCollider doesn't process
+            bundles nested inside other bundles, so bundles with different time
+            tags are always sent separately. """
+        packets = []
+        batches = {}
+        for msg in self.osc_messages:
+            if not isinstance(msg, OSCBundle) or msg.address == "/foxdot_midi":
+                packets.append(msg)
+                continue
+            data = msg.message
+            batch = batches.get(msg.timetag, None)
+            # 16 bytes for "#bundle" and the time tag
+            if batch is None or 16 + batch[2] + len(data) > max_size:
+                # [encoded messages, typetags, size, time tag]
+                batch = batches[msg.timetag] = [[], [], 0, msg.timetag]
+                packets.append(batch)
+            batch[0].append(data)
+            batch[1].append(msg.typetags[1:])
+            batch[2] += len(data)
+        for i, packet in enumerate(packets):
+            if isinstance(packet, list):
+                data, typetags, _, timetag = packet
+                bundle = OSCBundle(time=timetag)
+                bundle.message  = b"".join(data)
+                bundle.typetags = "," + "".join(typetags)
+                packets[i] = bundle
+        return packets
+
     def call(self, item, caller = None):
         """ Calls an item in queue slot """
 
@@ -665,9 +1014,9 @@ class QueueBlock(object):
 
             item = self.get_queue_item(item)
 
-        if item not in self.called_events:
+        if id(item) not in self.called_events:
 
-            self.called_events.append(item)
+            self.called_events.add(id(item))
 
             item()
 
@@ -677,22 +1026,87 @@ class QueueBlock(object):
 
     def already_called(self, obj):
         """ Returns True if the obj (not QueueItem) has been called """
-        return self.get_queue_item(obj) in self.called_events
+        return id(self.get_queue_item(obj)) in self.called_events
 
     def called(self, item):
         """ Returns True if the item is in this QueueBlock and has already been called """
-        return item in self.called_events
+        return id(item) in self.called_events
 
     def get_queue_item(self, obj):
-        for item in self:
-            if item.obj == obj:
-                return item
-        else:
-            raise ValueError("{} not found".format(key))
+        try:
+            return self.queue_items[id(obj)]
+        except KeyError:
+            raise ValueError("{} not found".format(obj))
 
     def players(self):
         return [item for level in self.events[1:3] for item in level]
 
+    def ordered(self):
+        """ Returns the items in the order they should be called. Players are called
+            after any players they use the values of, e.g. `p1` before `p2` if
+            `p2 >> pads(p1.degree + 2)`, so their values are up to date. Players in
+            a cycle of references are called in the order they were added. """
+
+        level = 2 # Player objects
+
+        players = self.events[level]
+
+        ordered = []
+
+        if len(players) > 1:
+
+            # Depth first search for the players each player depends on
+
+            index   = dict((id(item.obj), item) for item in players)
+            visited = set()
+
+            def visit(item):
+                visited.add(id(item))
+                for other in item.obj.dependencies():
+                    other = index.get(id(other), None)
+                    if other is not None and id(other) not in visited:
+                        visit(other)
+                ordered.append(item)
+                return
+
+            for item in players:
+                if id(item) not in visited:
+                    visit(item)
+
+        else:
+
+            ordered = players
+
+        return [item for events in self.events[:level] for item in events] + ordered + [item for events in self.events[level + 1:] for item in events]
+
+    def independent(self):
+        """ Returns the players that don't use the keys of, or have their keys used by,
+            any other player in this block, so they can be called at the same time """
+
+        players = self.events[2]
+
+        connected = set()
+        seen = set()
+
+        for item in players:
+
+            if id(item.obj) in seen:
+
+                connected.add(id(item.obj)) # Called more than once
+
+            seen.add(id(item.obj))
+
+        for item in players:
+
+            for other in item.obj.dependencies():
+
+                if id(other) in seen:
+
+                    connected.add(id(item.obj))
+                    connected.add(id(other))
+
+        return [item for item in players if id(item.obj) not in connected]
+
     def __getitem__(self, key):
         for event in self:
             if event == key:
@@ -707,12 +1121,28 @@ class QueueBlock(object):
         return sum([len(level) for level in self.events])
 
     def __contains__(self, other):
-        return other in self.objects()
+        return id(other) in self.queue_items
 
     def objects(self):
         return [item.obj for level in self.events for item in level]
         
 
+class QueueBlockView(object):
+    """ Used in place of a `QueueBlock` by a player that is called at the same time
+        as other players in the block. The player's OSC messages are stored here
+        and then added to the block in a fixed order. """
+    def __init__(self, block):
+        self.block = block
+        self.osc_messages = []
+    def __getattr__(self, name):
+        return getattr(self.block, name)
+    def __contains__(self, other):
+        return other in self.block
+    def __iter__(self):
+        return iter(self.block)
+    def __len__(self):
+        return len(self.block)
+
 class QueueObj(object):
     """ Class representing each item in a `QueueBlock` instance """
     def __init__(self, obj, args=(), kwargs={}):
@@ -728,16 +1158,290 @@ class QueueObj(object):
     def __call__(self):
         self.obj.__call__(*self.args, **self.kwargs)
 
+class DispatchPool(object):
+    """ A fixed number of long-lived threads that process the queue blocks popped
+        by the `TempoClock`. Each block is processed in its entirety by a single
+        thread, so the order in which items in a block are called is preserved.
+        The number of threads can be changed by setting `Clock.workers` """
+    def __init__(self, size=4):
+        self.size    = max(1, int(size))
+        self.jobs    = queue.Queue()
+        self.threads = []
+        self.lock    = threading.Lock()
+        self.running = False
+
+        # Number of stop messages in the queue that a thread has not taken yet
+
+        self.pending_stops = 0
+
+        # Counters
+
+        self.dispatched = 0
+        self.last_lag   = 0.0
+        self.max_lag    = 0.0
+        self.total_lag  = 0.0
+
+    def __repr__(self):
+        return "<DispatchPool workers={}>".format(self.size)
+
+    def start(self):
+        """ Starts the worker threads if they are not already running """
+        with self.lock:
+            self.running = True
+            while len(self.threads) < self.size:
+                self._add_thread()
+        return
+
+    def _add_thread(self):
+        thread = threading.Thread(target=self.work)
+        thread.daemon = True
+        thread.start()
+        self.threads.append(thread)
+        return
+
+    def resize(self, size):
+        """ Changes the number of worker threads """
+        size = max(1, int(size))
+        with self.lock:
+            self.size = size
+            if self.running:
+                # Threads that have been told to stop keep running if they are needed again
+                cancel = min(self.pending_stops, max(0, self.size - (len(self.threads) - self.pending_stops)))
+                self.pending_stops -= cancel
+                while len(self.threads) - self.pending_stops < self.size:
+                    self._add_thread()
+                # Tell any surplus threads to stop once they are idle
+                for _ in range(len(self.threads) - self.pending_stops - self.size):
+                    self.pending_stops += 1
+                    self.jobs.put(None)
+        return
+
+    def submit(self, func, block):
+        """ Adds a job, `func(block)`, to be processed by the next free thread """
+        if not self.running:
+            self.start()
+        self.jobs.put((func, block, time()))
+        return
+
+    def work(self):
+        """ Loop run by each worker thread """
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                with self.lock:
+                    # Stops that were cancelled by a later resize are ignored
+                    if self.pending_stops > 0:
+                        self.pending_stops -= 1
+                        self.threads.remove(threading.current_thread())
+                        return
+                continue
+            func, block, submitted = job
+            lag = time() - submitted
+            with self.lock:
+                self.dispatched += 1
+                self.last_lag    = lag
+                self.total_lag  += lag
+                if lag > self.max_lag:
+                    self.max_lag = lag
+            try:
+                func(block)
+            except Exception:
+                print(error_stack())
+
+    def depth(self):
+        """ Returns the number of blocks waiting for a free thread """
+        return self.jobs.qsize()
+
+    def stats(self):
+        """ Returns a dictionary of dispatch counters """
+        with self.lock:
+            return {
+                "workers"    : len(self.threads) - self.pending_stops,
+                "depth"      : self.depth(),
+                "dispatched" : self.dispatched,
+                "last_lag"   : self.last_lag,
+                "max_lag"    : self.max_lag,
+                "mean_lag"   : (self.total_lag / self.dispatched) if self.dispatched else 0.0
+            }
+
+    def reset_stats(self):
+        """ Sets the dispatch counters back to 0 """
+        with self.lock:
+            self.dispatched = 0
+            self.last_lag   = 0.0
+            self.max_lag    = 0.0
+            self.total_lag  = 0.0
+        return
+
+class Prerenderer(object):
+    """ A background thread that works out the events of players ahead of the
+        clock, one event at a time, so that they only need to be sent when the
+        clock reaches them. Players are added using `request` and rendered
+        until `Player.prerender` returns False. """
+    def __init__(self):
+        self.jobs    = queue.Queue()
+        self.pending = set()
+        self.lock    = threading.Lock()
+        self.thread  = None
+
+        # Counters
+
+        self.rendered  = 0
+        self.used      = 0
+        self.discarded = 0
+
+    def request(self, player):
+        """ Queues a player to have its upcoming events rendered """
+        with self.lock:
+            if id(player) in self.pending:
+                return
+            self.pending.add(id(player))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.work)
+                self.thread.daemon = True
+                self.thread.start()
+        self.jobs.put(player)
+        return
+
+    def work(self):
+        """ Loop run by the rendering thread """
+        while True:
+            player = self.jobs.get()
+            with self.lock:
+                self.pending.discard(id(player))
+            try:
+                if player.prerender():
+                    self.rendered += 1
+                    self.request(player)
+            except Exception:
+                print(error_stack())
+
+    def stats(self):
+        """ Returns a dictionary of rendering counters """
+        return {
+            "depth"     : self.jobs.qsize(),
+            "rendered"  : self.rendered,
+            "used"      : self.used,
+            "discarded" : self.discarded
+        }
+
 class History(object):
     """
     Stores osc messages send from the TempoClock so that if the
-    Clock is reveresed we can just send the osc messages already sent
+    Clock is reveresed we can just send the osc messages already sent.
+
+    Messages are stored as encoded binary packets in a ring buffer that
+    is bounded by a number of beats (`max_beats`) and/or a number of bytes
+    (`max_bytes`). Setting both to `None` keeps everything. A range of
+    beats can be sent back to the server using `replay` or written to a
+    file using `dump` and read back using `History.load`.
 
     """
-    def __init__(self):
-        self.data = []
+    record = struct.Struct(">dBI") # beat, is midi, packet length
+
+    def __init__(self, max_beats=None, max_bytes=2 ** 22):
+        self.data      = deque()
+        self.size      = 0
+        self.latest    = None
+        self.max_beats = max_beats
+        self.max_bytes = max_bytes
+        self.lock      = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        """ Iterates over (beat, is_midi, packet) tuples in beat order """
+        with self.lock:
+            data = sorted(self.data, key=lambda item: item[0])
+        return iter(data)
+
+    def set_limit(self, max_beats=None, max_bytes=None):
+        """ Changes the size of the ring buffer and discards any packets
+            outside of the new limits """
+        with self.lock:
+            self.max_beats = max_beats
+            self.max_bytes = max_bytes
+            self.trim()
+        return
+
     def add(self, beat, osc_messages):
-        self.data.append(osc_messages)
+        """ Encodes and stores a block's osc messages """
+        return self.add_packets(beat, [(msg.address == "/foxdot_midi", msg.getBinary()) for msg in osc_messages])
+
+    def add_packets(self, beat, packets):
+        """ Stores a list of (is_midi, bytes) packets that have already been
+            encoded, e.g. by `QueueBlock.send_osc_messages` """
+        if not packets:
+            return
+        packets = [(beat, midi, data) for midi, data in packets]
+        with self.lock:
+            self.data.extend(packets)
+            self.size += sum(len(packet[-1]) for packet in packets)
+            if self.latest is None or beat > self.latest:
+                self.latest = beat
+            self.trim()
+        return
+
+    def trim(self):
+        """ Removes the oldest packets until the buffer is within its limits.
+            Should be called with the lock held. """
+        while self.data and ((self.max_bytes is not None and self.size > self.max_bytes) or
+                             (self.max_beats is not None and self.data[0][0] < self.latest - self.max_beats)):
+            self.size -= len(self.data.popleft()[-1])
+        if not self.data:
+            self.latest = None
+        return
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.size   = 0
+            self.latest = None
+        return
+
+    def get_range(self, start=None, end=None):
+        """ Returns a list of (beat, is_midi, packet) tuples with a beat
+            in the range start <= beat < end """
+        return [item for item in self if (start is None or item[0] >= start) and (end is None or item[0] < end)]
+
+    def replay(self, server, start=None, end=None):
+        """ Re-sends the stored packets between two beats to the server. Bundles
+            keep their original time tags so SuperCollider will play them
+            immediately. """
+        failed = 0
+        for beat, midi, packet in self.get_range(start, end):
+            client = server.sclang if midi else server.client
+            if not client.send_binary(packet):
+                failed += 1
+        if failed:
+            Code.WarningMsg("Could not replay {} packet(s)".format(failed))
+        return
+
+    def dump(self, filename, start=None, end=None):
+        """ Writes the stored packets between two beats to a file """
+        with open(filename, "wb") as f:
+            for beat, midi, packet in self.get_range(start, end):
+                f.write(self.record.pack(float(beat), int(midi), len(packet)))
+                f.write(packet)
+        return
+
+    @classmethod
+    def load(cls, filename):
+        """ Reads a file written using `dump` into a new, unbounded, History """
+        history = cls(max_bytes=None)
+        with open(filename, "rb") as f:
+            while True:
+                header = f.read(cls.record.size)
+                if len(header) < cls.record.size:
+                    break
+                beat, midi, length = cls.record.unpack(header)
+                packet = f.read(length)
+                history.data.append((beat, bool(midi), packet))
+                history.size += len(packet)
+        if history.data:
+            history.latest = max(item[0] for item in history.data)
+        return history
 
 from . import Code
 
@@ -9,6 +9,8 @@ from .Patterns import *
 from .Utils  import *
 from .Patterns.Operations import *
 
+from bisect import bisect_right
+
 def fetch(func):
     """ Function to wrap basic lambda operators for TimeVars  """
     def eval_now(a, b):
@@ -30,6 +32,9 @@ class TimeVar:
     metro = None
     depth = 128
 
+    # If True, the index for the last time looked up is stored and re-used
+    memoize = True
+
     def __init__(self, values, dur=None, **kwargs):
 
         if dur is None:
@@ -185,6 +190,10 @@ class TimeVar:
 
         self.values = self.stream(values)
 
+        # Values are indexed each time they are used so store them in a flat list
+
+        self.values.materialize()
+
         a, b = 0, 0
 
         for dur in self.dur:
@@ -192,6 +201,16 @@ class TimeVar:
             b = a + dur
             self.time.append([a,b])
 
+        # Start of each value in a cycle followed by the total duration, used to
+        # find the current index using a binary search
+
+        self.offsets   = [0] + [end for start, end in self.time]
+        self.total_dur = float(sum(self.dur))
+
+        # Last time, index, and proportion returned by `get_current_index`
+
+        self.last_index = None
+
         return self
 
     # Evaluation methods
@@ -215,42 +234,43 @@ class TimeVar:
 
         time = self.current_time(time)
 
-        # Work out how many cycles have already passed
+        # Values are looked up by many players at the same beat
 
-        total_dur = float(sum(self.dur))
+        if self.memoize and self.last_index is not None and self.last_index[0] == time:
 
-        loops = time // total_dur
+            self.proportion = self.last_index[2]
 
-        # And therefore how much time we are into one cycle
+            return self.last_index[1]
 
-        time  = time - (loops * total_dur)
+        # Work out how many cycles have already passed
 
-        # And how many events have passed
+        total_dur = self.total_dur
 
-        total_events = int(loops * len(self.dur))
+        loops = time // total_dur
 
-        count = 0
+        # And therefore how much time we are into one cycle
 
-        for i, value in enumerate(self.dur):
+        cycle_time = time - (loops * total_dur)
 
-            acc = count + value
+        # And how many events have passed
 
-            if acc > time:
+        size = len(self.offsets) - 1
 
-                i = i + total_events
+        total_events = int(loops * size)
 
-                break
+        # Find the first value that ends after cycle_time
 
-            else:
+        i = bisect_right(self.offsets, cycle_time, 1, size) - 1
 
-                count = acc
-        else:
+        count, acc = self.offsets[i], self.offsets[i + 1]
 
-            i = i + total_events
+        i = i + total_events
 
         # Store the % way through this value's time
 
-        self.proportion = (float(time % total_dur) - count) / (acc - count)
+        self.proportion = (float(cycle_time % total_dur) - count) / (acc - count)
+
+        self.last_index = (time, i, self.proportion)
 
         return i
 
@@ -9,6 +9,11 @@ from __future__ import absolute_import, division, print_function
 
 import sys
 
+try:
+    from math import gcd
+except ImportError:
+    from fractions import gcd
+
 # Functions
 
 def stdout(*args):
@@ -25,25 +30,17 @@ def sliceToRange(s):
         raise TypeError("range() integer end argument expected, got NoneType")
 
 def LCM(*args):
-    """ Lowest Common Multiple """
-
-    args = [n for n in args if n != 0]
+    """ Lowest Common Multiple, ignoring zeros """
 
-    # Base case
-    if len(args) == 0:
-        return 1
+    result = 1
 
-    elif len(args) == 1:
-        return args[0]
+    for n in args:
 
-    X = list(args)
+        if n != 0 and n != result:
 
-    while any([X[0]!=K for K in X]):
+            result = result * n // gcd(result, n)
 
-        i = X.index(min(X))
-        X[i] += args[i]
-
-    return X[0]
+    return result
 
 def EuclidsAlgorithm(n, k, lo=0, hi=1):
 
@@ -98,9 +95,13 @@ def modi(array, i, debug=0):
         return array
 
 def get_expanded_len(data):
-    """ (0,(0,2)) returns 4. int returns 1 """
-    if type(data) is str and len(data) == 1:
+    """ (0,(0,2)) returns 4. int returns 1. The result is stored in
+        objects with an `_expanded_len` attribute i.e. PGroups """
+    if type(data) in _single_types or (type(data) is str and len(data) == 1):
         return 1
+    cached = getattr(data, "_expanded_len", False)
+    if cached:
+        return cached
     l = []
     try:
         for item in data:
@@ -108,9 +109,15 @@ def get_expanded_len(data):
                 l.append(get_expanded_len(item))
             except(TypeError, AttributeError):
                 l.append(1)
-        return LCM(*l) * len(data)
+        size = LCM(*l) * len(data)
     except TypeError:
         return 1
+    if cached is None:
+        data._expanded_len = size
+    return size
+
+# Values that always have an expanded length of 1
+_single_types = (int, float, bool, type(None))
 
 def max_length(*patterns):
     """ Returns the largest length pattern """
@@ -6,9 +6,15 @@ except ImportError:
     from tkinter import Menu, BooleanVar
 
 import os.path
+import sys
 from functools import partial
 from ..Settings import *
-from ..ServerManager import TempoServer
+
+# The asyncio tempo server can handle more peers but needs Python 3.5
+if sys.version_info >= (3, 5):
+    from ..AsyncServer import AsyncTempoServer as TempoServer
+else:
+    from ..ServerManager import TempoServer
 from ..Code import FoxDotCode
 
 class MenuBar(Menu):
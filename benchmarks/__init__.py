@@ -0,0 +1,7 @@
+"""
+    Micro-benchmarks for performance sensitive parts of FoxDot. Run each one
+    as a module from the root of the repository e.g.
+
+        python -m benchmarks.bench_timebase
+
+"""
@@ -0,0 +1,40 @@
+""" Compares notes without effects sent as a group of nodes and as a single "direct"
+    synth node: the number of nodes created on scsynth for each note and the time
+    taken to compile and encode the bundle """
+from __future__ import absolute_import, division, print_function
+
+from timeit import default_timer as timer
+
+from FoxDot import Clock
+
+PACKETS = {
+    "pads": {"freq": 261.6, "midinote": 60.0, "amp": 1.0, "sus": 1.0, "pan": -1.0},
+    "play2": {"buf": 1.0, "rate": 1.0, "amp": 1.0, "sus": 0.5, "pan": 0.0},
+}
+
+def bench(server, synthdef, packet, direct, n=5000):
+    """ Time taken to compile and encode a bundle """
+    start = timer()
+    for _ in range(n):
+        server.get_bundle(synthdef, dict(packet), {}, timestamp=1.0, direct=direct).getBinary()
+    return (timer() - start) / n
+
+def count_nodes(server, synthdef, packet, direct):
+    """ Number of nodes and buses a note creates on scsynth """
+    allocated = server.buses.allocated
+    data = server.get_bundle(synthdef, dict(packet), {}, timestamp=1.0, direct=direct).getBinary()
+    return data.count(b"/s_new") + data.count(b"/g_new"), server.buses.allocated - allocated
+
+def main(repeat=5):
+    server = Clock.server
+    print("{:<12} {:>8} {:>8} {:>8} {:>12}".format("synth", "direct", "nodes", "buses", "time (us)"))
+    for synthdef, packet in sorted(PACKETS.items()):
+        for direct in (False, True):
+            nodes, buses = count_nodes(server, synthdef, packet, direct)
+            # Use the best of several runs to reduce noise
+            t = min(bench(server, synthdef, packet, direct) for _ in range(repeat))
+            print("{:<12} {:>8} {:>8} {:>8} {:>12.3f}".format(synthdef, "yes" if direct else "no", nodes, buses, t * 1e6))
+    return
+
+if __name__ == "__main__":
+    main()
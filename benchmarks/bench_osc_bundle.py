@@ -0,0 +1,26 @@
+""" Measures the time taken to compile the OSC bundle for a note """
+from __future__ import absolute_import, division, print_function
+
+from timeit import default_timer as timer
+
+from FoxDot import Clock
+
+def bench_bundle(server, synthdef, packet, effects, n=5000):
+    """ Time taken to compile and encode a bundle """
+    start = timer()
+    for _ in range(n):
+        server.get_bundle(synthdef, dict(packet), effects, timestamp=1.0).getBinary()
+    return (timer() - start) / n
+
+def main(repeat=5):
+    server = Clock.server
+    packet = {"freq": 261.6, "midinote": 60.0, "amp": 1.0, "sus": 1.0, "pan": -1.0, "lpf": 4000.0}
+    cases = (("pads, no effects", {}),
+             ("pads, 3 effects", {"vib": ["vib", 2.0, "vibdepth", 0.02], "room": ["room", 0.5, "mix", 0.2], "echo": ["echo", 0.5, "echotime", 1]}))
+    for name, effects in cases:
+        time = min(bench_bundle(server, "pads", packet, effects) for _ in range(repeat))
+        print("{:<20} {:>10.3f} us".format(name, time * 1e6))
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+""" Compares the OSCMessage encoder with encoding by concatenating bytes objects """
+from __future__ import absolute_import, division, print_function
+
+from timeit import default_timer as timer
+
+from FoxDot.lib.OSC3 import OSCMessage, OSCBundle, OSCArgument, OSCString, OSCBlob, OSCTimeTag
+
+class ConcatMessage(object):
+    """ The previous OSCMessage encoder, which adds each argument to a bytes object """
+    def __init__(self, address):
+        self.address, self.typetags, self.message = address, ",", bytes()
+
+    def append(self, argument, typehint=None):
+        if isinstance(argument, (tuple, list)):
+            for arg in argument:
+                self.append(arg, typehint)
+            return
+        tag, binary = OSCArgument(argument, typehint)
+        self.typetags += tag
+        self.message += binary
+
+    def getBinary(self):
+        return OSCString(self.address) + OSCString(self.typetags) + self.message
+
+def concat_bundle(messages, timetag):
+    """ Encodes a bundle using ConcatMessage """
+    message = bytes()
+    for address, args in messages:
+        msg = ConcatMessage(address)
+        msg.append(args)
+        message += OSCBlob(msg.getBinary())
+    return OSCString("#bundle") + OSCTimeTag(timetag) + message
+
+def encode_bundle(messages, timetag):
+    bundle = OSCBundle(time=timetag)
+    for address, args in messages:
+        msg = OSCMessage(address)
+        msg.append(args)
+        bundle.append(msg)
+    return bundle.getBinary()
+
+def make_note(num_args):
+    """ Returns the messages for a note with `num_args` synth arguments and 3 effects """
+    synth_args = []
+    for i in range(num_args):
+        synth_args += ["arg{}".format(i), i * 0.5]
+    return [("/g_new", [1001, 1, 1]),
+            ("/s_new", ["startSound", 1002, 0, 1001, "bus", 4, "sus", 8.0, "rate", 261.6]),
+            ("/s_new", ["vibrato", 1003, 1, 1001, "bus", 4, "vib", 2.0, "vibdepth", 0.02]),
+            ("/s_new", ["pads", 1004, 1, 1001, "bus", 4] + synth_args),
+            ("/s_new", ["reverb", 1005, 1, 1001, "bus", 4, "room", 0.5, "mix", 0.2]),
+            ("/s_new", ["echo", 1006, 1, 1001, "bus", 4, "echo", 0.5, "echotime", 1]),
+            ("/s_new", ["makeSound", 1007, 1, 1001, "bus", 4, "sus", 1.0])]
+
+def bench(func, messages, n=500):
+    start = timer()
+    for _ in range(n):
+        func(messages, 1.0)
+    return (timer() - start) / n
+
+def main(repeat=7):
+    print("{:>10} {:>16} {:>16}".format("synth args", "concat (us)", "bytearray (us)"))
+    for num_args in (5, 20, 60):
+        messages = make_note(num_args)
+        assert encode_bundle(messages, 1.0) == concat_bundle(messages, 1.0)
+        old = min(bench(concat_bundle, messages) for _ in range(repeat))
+        new = min(bench(encode_bundle, messages) for _ in range(repeat))
+        print("{:>10} {:>16.3f} {:>16.3f}".format(num_args, old * 1e6, new * 1e6))
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+""" Compares Pattern arithmetic with and without NumPy """
+from __future__ import absolute_import, division, print_function
+
+from timeit import default_timer as timer
+
+from FoxDot.lib.Patterns import P, PSine, PRange
+from FoxDot.lib.Patterns import Operations
+
+def bench(n=20):
+    """ Time taken to build a long generative pattern """
+    start = timer()
+    for _ in range(n):
+        pat = P[0:1024] * PRange(0, 3072, 3) + PSine(512)
+        pat = (pat // 4) % 7 - 0.5
+        pat > 2
+    return (timer() - start) / n
+
+def main(repeat=5):
+    threshold = Operations.NUMPY_THRESHOLD
+    try:
+        print("{:<10} {:>12}".format("backend", "time (ms)"))
+        for label, value in (("python", float("inf")), ("numpy", threshold)):
+            if Operations._numpy is None and label == "numpy":
+                print("NumPy is not installed")
+                break
+            Operations.NUMPY_THRESHOLD = value
+            # Use the best of several runs to reduce noise
+            t = min(bench() for _ in range(repeat))
+            print("{:<10} {:>12.3f}".format(label, t * 1e3))
+    finally:
+        Operations.NUMPY_THRESHOLD = threshold
+    return
+
+if __name__ == "__main__":
+    main()
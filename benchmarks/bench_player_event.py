@@ -0,0 +1,43 @@
+""" Measures the time taken for a Player to work out the values of each event """
+from __future__ import absolute_import, division, print_function
+
+from timeit import default_timer as timer
+
+from FoxDot import Player, pads, var
+
+def make_player():
+    """ Returns a Player with a mixture of constant and dynamic attributes """
+    p = Player("bench")
+    p >> pads([0,1,2,(3,5)], dur=[1,1/2], amp=[1,0.5], pan=(-1,1), room=0.5, mix=0.2,
+              chop=var([0,2],4), hpf=[0,500,1000], lpf=4000, formant=1, shape=0.2)
+    return p
+
+def bench_event(player, n=500):
+    """ Time taken to call get_event and build each osc message """
+    start = timer()
+    for i in range(n):
+        player.event_n = i
+        player.get_event()
+        for index in range(player.get_event_length()):
+            player.osc_message(index)
+    return (timer() - start) / n
+
+def bench_message(player, n=2000):
+    """ Time taken to build the osc messages for an event """
+    player.get_event()
+    size = player.get_event_length()
+    start = timer()
+    for _ in range(n):
+        for index in range(size):
+            player.osc_message(index)
+    return (timer() - start) / n
+
+def main(repeat=5):
+    player = make_player()
+    print("{} attributes".format(len(player.attr)))
+    print("get_event + osc_message (us): {:.3f}".format(min(bench_event(player) for _ in range(repeat)) * 1e6))
+    print("osc_message only (us):        {:.3f}".format(min(bench_message(player) for _ in range(repeat)) * 1e6))
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+""" Measures the per-note cost of Player.send and the length helpers it uses """
+from __future__ import absolute_import, division, print_function
+
+from timeit import default_timer as timer
+
+from FoxDot import Player, pads, var
+from FoxDot.lib.Patterns import PGroup
+from FoxDot.lib.Utils import LCM, get_expanded_len
+
+class Block(object):
+    """ Stand-in for the QueueBlock a Player adds its messages to """
+    time = 0
+    osc_messages = []
+
+def make_player():
+    """ Returns a Player with a mixture of constant, grouped and dynamic attributes """
+    p = Player("bench")
+    p >> pads([0,1,2,(3,5)], dur=[1,1/2], amp=[1,0.5], pan=(-1,1,0), room=0.5, mix=0.2,
+              chop=var([0,2],4), hpf=[0,500,1000], lpf=4000, formant=1, shape=0.2)
+    p.set_queue_block(Block())
+    return p
+
+def bench_send(player, n=500):
+    """ Time taken to work out an event and compile its messages """
+    start = timer()
+    for i in range(n):
+        player.event_n = i
+        player.sent_messages = []
+        player.queue_block.osc_messages = []
+        player.get_event()
+        player.send(timestamp=0)
+    return (timer() - start) / n
+
+def bench_lcm(n=3):
+    """ Time taken to find the LCM of co-prime pattern lengths """
+    start = timer()
+    for _ in range(n):
+        LCM(127, 128, 129)
+    return (timer() - start) / n
+
+def bench_expanded_len(n=20000):
+    """ Time taken to find the expanded length of typical event values """
+    values = [0.5, 1, PGroup(-1, 1, 0), PGroup(0, PGroup(2, 4)), "x"]
+    start = timer()
+    for _ in range(n):
+        for value in values:
+            get_expanded_len(value)
+    return (timer() - start) / (n * len(values))
+
+def main(repeat=5):
+    player = make_player()
+    # Use the best of several runs to reduce noise
+    print("Player.send per note (us):    {:.3f}".format(min(bench_send(player) for _ in range(repeat)) * 1e6))
+    print("LCM(127, 128, 129) (us):      {:.3f}".format(min(bench_lcm() for _ in range(repeat)) * 1e6))
+    print("get_expanded_len (us):        {:.3f}".format(min(bench_expanded_len() for _ in range(repeat)) * 1e6))
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+""" Compares parsing sample player strings with and without the play string cache """
+from __future__ import absolute_import, division, print_function
+
+from timeit import default_timer as timer
+
+from FoxDot.lib.Patterns import Pattern
+from FoxDot.lib.Patterns.Parse import feed, play_string_cache
+
+# Play strings like those found in live coding sessions
+CORPUS = [
+    "x-o-", "x-o-[--]", "x-o-{[--]xo}", "(x )( x)o ", "<x-o-><  * >", "x-(-[-o])",
+    "[xx](o )[--]{ *}", "x-o[-x]<(v )(  [vv])>", "{xo[xo](x[oo])}-", "(xv)-o-(oooo)-",
+    "<(x )(xx)[ox]><[--]{-=}( *)>", "V:|o2|[--]", "x [xx]o(-[-=])", "[(xo)[ab]]",
+    "x-o-" * 8, "<x-o-[--]><(  )(  [**])>", "{x[oo](xv)}{ab}", "(x[oo])(-[==]{*!})",
+]
+
+def bench(func, n=20):
+    """ Average time taken to parse a string from the corpus """
+    start = timer()
+    for _ in range(n):
+        for string in CORPUS:
+            func(string)
+    return (timer() - start) / (n * len(CORPUS))
+
+def main(repeat=5):
+    size = play_string_cache.size
+    def uncached(string):
+        return Pattern(string)
+    print("{:<12} {:>12}".format("parse", "time (us)"))
+    try:
+        for label, func, cache_size in (("feed", feed, 0), ("uncached", uncached, 0), ("cached", Pattern, size)):
+            play_string_cache.resize(cache_size)
+            # Use the best of several runs to reduce noise
+            t = min(bench(func) for _ in range(repeat))
+            print("{:<12} {:>12.3f}".format(label, t * 1e6))
+    finally:
+        play_string_cache.resize(size)
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+""" Compares sample lookups with and without the BufferManager's index """
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+import tempfile
+from os.path import join
+from timeit import default_timer as timer
+
+from FoxDot.lib.Buffers import BufferManager
+
+def make_library(path, dirs=50, files=100):
+    """ Creates a sample library of empty files """
+    for i in range(dirs):
+        dirname = join(path, "dir%d" % i)
+        os.mkdir(dirname)
+        for j in range(files):
+            open(join(dirname, "sample%d.wav" % j), "w").close()
+
+def bench(lookup, names, n=5):
+    """ Average time taken to look up a sample """
+    start = timer()
+    for _ in range(n):
+        for name, index in names:
+            lookup(name, index)
+    return (timer() - start) / (n * len(names))
+
+def main(repeat=5):
+    path = tempfile.mkdtemp()
+    try:
+        make_library(path)
+        names = [("dir%d" % i, i) for i in range(0, 50, 5)] + [("**/sample99", 0)]
+        def unindexed(name, index):
+            bm._dir_index = {}
+            return bm._findSample(name, index)
+        bm = BufferManager(index=False)
+        bm._paths = [path]
+        bm.setRefreshInterval(None)
+        print("{:<12} {:>12}".format("lookup", "time (us)"))
+        for label, lookup in (("listdir", unindexed), ("indexed", bm._findSample), ("cached", bm._lookupSample)):
+            # Use the best of several runs to reduce noise
+            t = min(bench(lookup, names) for _ in range(repeat))
+            print("{:<12} {:>12.3f}".format(label, t * 1e6))
+    finally:
+        shutil.rmtree(path)
+    return
+
+if __name__ == "__main__":
+    main()
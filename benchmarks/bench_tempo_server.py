@@ -0,0 +1,107 @@
+""" Load test for the tempo servers. Connects many simulated clients and measures how
+    long the clock's thread is held up by a tempo change and how long it takes to reach
+    every client, with and without a client that has stopped reading """
+from __future__ import absolute_import, division, print_function
+
+import socket
+import sys
+import threading
+
+from timeit import default_timer as timer
+
+from FoxDot.lib.ServerManager import TempoServer, read_from_socket, send_to_socket
+from FoxDot.lib.TempoClock import TempoClock
+
+if sys.version_info >= (3, 5):
+    from FoxDot.lib.AsyncServer import AsyncTempoServer
+else:
+    AsyncTempoServer = None
+
+class Client(threading.Thread):
+    """ Connects like a TempoClient and counts the tempo changes it receives """
+    def __init__(self, port, listen=True):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if not listen:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        self.socket.connect(("127.0.0.1", port))
+        send_to_socket(self.socket, ["init"])
+        read_from_socket(self.socket)
+        self.received = 0
+        self.done = threading.Event()
+        self.expected = None
+        if listen:
+            self.start()
+
+    def run(self):
+        while read_from_socket(self.socket) is not None:
+            self.received += 1
+            if self.received == self.expected:
+                self.done.set()
+
+    def close(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except (socket.error, OSError):
+            pass
+        self.socket.close()
+
+def bench(server_type, peers, stalled=False, n=20, timeout=5):
+    """ Returns the average time update_tempo takes and the time until all peers
+        have received `n` tempo changes, or None if they did not arrive in time """
+    server = server_type(TempoClock(), port=0)
+    server.start()
+    port = server.server_address[1]
+    slow = [Client(port, listen=False)] if stalled else []
+    clients = []
+    try:
+        if stalled:
+            # Fill up the socket buffers of the client that has stopped reading
+            while len(server.peers) < 1:
+                pass
+            padding = threading.Thread(target=server.update_tempo, args=("x" * (1 << 23),))
+            padding.daemon = True
+            padding.start()
+            padding.join(0.5)
+        clients.extend(Client(port) for _ in range(peers))
+        while len(server.peers) < peers + len(slow):
+            pass
+        for client in clients:
+            client.expected = client.received + n
+        calls = []
+        def broadcast():
+            for _ in range(n):
+                start = timer()
+                server.update_tempo(120)
+                calls.append(timer() - start)
+        start = timer()
+        thread = threading.Thread(target=broadcast)
+        thread.daemon = True
+        thread.start()
+        arrived = all(client.done.wait(max(0, timeout - (timer() - start))) for client in clients)
+        fanout = (timer() - start) if arrived else None
+        call = (sum(calls) / len(calls)) if calls else None
+    finally:
+        for client in clients + slow:
+            client.close()
+        server.kill()
+    return call, fanout
+
+def main(repeat=3):
+    servers = [("threaded", TempoServer)]
+    if AsyncTempoServer is not None:
+        servers.append(("asyncio", AsyncTempoServer))
+    print("{:<12} {:>8} {:>8} {:>14} {:>14}".format("server", "peers", "stalled", "call (us)", "fan-out (ms)"))
+    for peers, stalled in ((30, False), (100, False), (30, True)):
+        for label, server_type in servers:
+            results = [bench(server_type, peers, stalled) for _ in range(repeat)]
+            calls   = [r[0] for r in results if r[0] is not None]
+            fanouts = [r[1] for r in results if r[1] is not None]
+            call    = "{:.3f}".format(min(calls) * 1e6) if calls else "blocked"
+            fanout  = "{:.3f}".format(min(fanouts) * 1e3) if fanouts else "timed out"
+            print("{:<12} {:>8} {:>8} {:>14} {:>14}".format(label, peers, "yes" if stalled else "no", call, fanout))
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+""" Compares the round trip time and throughput of tempo sync messages sent using
+    the old 4 digit ASCII header and the current binary header, and checks whether
+    each can read messages that arrive in pieces or are longer than 9999 bytes.
+
+    The binary header is a few microseconds slower per round trip because every
+    read loops until the whole message has arrived. It is used because the old
+    reads could return part of a message and the 4 digit length limits the size
+    of a message, not for speed. """
+from __future__ import absolute_import, division, print_function
+
+import json
+import socket
+import threading
+import time
+
+from timeit import default_timer as timer
+
+from FoxDot.lib.ServerManager import Message, read_from_socket, send_to_socket
+
+SYNC = {"sync": {"bpm": [120, 1], "start_time": [1700000000123456, 1000000], "beat": [1543, 4], "time": [17012, 1000]}}
+
+def legacy_read(sock):
+    """ Reads a message with a 4 digit length as previous versions did """
+    try:
+        bits = int(sock.recv(4).decode())
+    except:
+        return None
+    if bits > 0:
+        return json.loads(sock.recv(bits).decode())
+
+def legacy_encode(data):
+    """ Encodes a message with a 4 digit length as previous versions did """
+    packet = str(json.dumps(data, separators=(',',':')))
+    return ("{:04d}".format(len(packet)) + packet).encode()
+
+def legacy_send(sock, data):
+    """ Sends a message with a 4 digit length as previous versions did """
+    msg = legacy_encode(data)
+    sent = 0
+    while sent < len(msg):
+        sent += sock.send(msg[sent:])
+    return
+
+def echo(sock, read, send):
+    """ Sends each message back until the connection is closed """
+    while True:
+        data = read(sock)
+        if data is None:
+            break
+        send(sock, data)
+    return
+
+def server_socket():
+    """ Returns a listening socket on a free loopback port """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    return listener
+
+def bench(read, send, n=2000):
+    """ Average round trip time and number of messages read per second """
+    listener = server_socket()
+    client = socket.create_connection(listener.getsockname())
+    conn, _ = listener.accept()
+    for sock in (client, conn):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    thread = threading.Thread(target=echo, args=(conn, read, send))
+    thread.start()
+    try:
+        start = timer()
+        for _ in range(n):
+            send(client, SYNC)
+            read(client)
+        rtt = (timer() - start) / n
+        # Send all the messages before reading them back
+        start = timer()
+        for _ in range(n):
+            send(client, SYNC)
+        for _ in range(n):
+            read(client)
+        rate = n / (timer() - start)
+    finally:
+        client.close()
+        thread.join()
+        conn.close()
+        listener.close()
+    return rtt, rate
+
+def check(read, encode, data, pieces=1):
+    """ Returns True if data sent in a number of pieces is read back unchanged """
+    client, conn = socket.socketpair()
+    packet = encode(data)
+    def send():
+        size = len(packet) // pieces + 1
+        for i in range(0, len(packet), size):
+            client.sendall(packet[i:i+size])
+            time.sleep(0.01)
+    thread = threading.Thread(target=send)
+    thread.start()
+    try:
+        return read(conn) == data
+    except Exception:
+        return False
+    finally:
+        thread.join()
+        client.close()
+        conn.close()
+
+def main(repeat=5):
+    framings = (("legacy", legacy_read, legacy_send, legacy_encode),
+                ("binary", read_from_socket, send_to_socket, lambda data: Message(data).encode()))
+    print("{:<12} {:>12} {:>12} {:>8} {:>8}".format("framing", "rtt (us)", "msg/s", "split", "large"))
+    for label, read, send, encode in framings:
+        # Use the best of several runs to reduce noise
+        results = [bench(read, send) for _ in range(repeat)]
+        rtt  = min(r[0] for r in results)
+        rate = max(r[1] for r in results)
+        split = check(read, encode, SYNC, pieces=2)
+        large = check(read, encode, {"request": ["bpm"] * 5000})
+        print("{:<12} {:>12.3f} {:>12.0f} {:>8} {:>8}".format(label, rtt * 1e6, rate,
+              "ok" if split else "fails", "ok" if large else "fails"))
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+""" Compares the cost of the TempoClock hot loop using each time base """
+from __future__ import absolute_import, division, print_function
+
+from timeit import default_timer as timer
+
+from FoxDot.lib.TempoClock import TempoClock
+
+def event():
+    return
+
+def bench_true_now(clock, n=100000):
+    """ Time taken to update the clock's current beat """
+    start = timer()
+    for _ in range(n):
+        clock.true_now()
+    return (timer() - start) / n
+
+def bench_queue(clock, n=2000, dur=1/3):
+    """ Time taken to add and pop events at accumulating beats """
+    beat, step = clock.dtype(0), clock.dtype(dur)
+    start = timer()
+    for _ in range(n):
+        beat += step
+        clock.queue.add(event, beat)
+    while len(clock.queue):
+        clock.queue.next()
+        clock.queue.pop()
+    return (timer() - start) / n
+
+def main(repeat=5):
+    print("{:<10} {:>16} {:>16}".format("time base", "true_now (us)", "add+pop (us)"))
+    for base in ("fraction", "float", "ticks"):
+        clock = TempoClock()
+        clock.set_time_base(base)
+        # Use the best of several runs to reduce noise
+        true_now = min(bench_true_now(clock) for _ in range(repeat))
+        queue    = min(bench_queue(clock) for _ in range(repeat))
+        print("{:<10} {:>16.3f} {:>16.3f}".format(base, true_now * 1e6, queue * 1e6))
+    return
+
+if __name__ == "__main__":
+    main()
@@ -20,7 +20,7 @@ class TestSampleSearch(unittest.TestCase):
             open(fullpath, 'w').close()
             return fullpath
         self.wd = tempfile.mkdtemp()
-        self.bm = BufferManager()
+        self.bm = BufferManager(index=False)
         self.bm._paths = [self.wd]
         self._yeah = touch('yeah.wav')
         mkdir('snares')
@@ -107,3 +107,97 @@ class TestSampleSearch(unittest.TestCase):
         sample = '**/house/*'
         found = self.bm._findSample(sample)
         self.assertEqual(found, self._housekick)
+
+
+class TestSampleIndex(unittest.TestCase):
+
+    """ Test the index of sample directories and cached lookups """
+    def setUp(self):
+        super(TestSampleIndex, self).setUp()
+        self.wd = tempfile.mkdtemp()
+        os.mkdir(join(self.wd, 'snares'))
+        self._snare1 = self.touch('snares/snare1.wav')
+        self._snare2 = self.touch('snares/snare2.wav')
+        self.bm = BufferManager(index=False)
+        self.bm._paths = [self.wd]
+
+    def tearDown(self):
+        super(TestSampleIndex, self).tearDown()
+        shutil.rmtree(self.wd)
+
+    def touch(self, filename):
+        fullpath = join(self.wd, filename)
+        open(fullpath, 'w').close()
+        return fullpath
+
+    def test_cached_lookup(self):
+        """ Repeated lookups use the cache instead of the file system """
+        self.assertEqual(self.bm._lookupSample('snares', 1), self._snare2)
+        self.bm._findSample = None
+        self.assertEqual(self.bm._lookupSample('snares', 1), self._snare2)
+
+    def test_indexed_dir(self):
+        """ Directories are only listed once """
+        self.bm._findSample('snares')
+        snares = join(self.wd, 'snares')
+        self.assertIn(snares, self.bm._dir_index)
+        self.bm._dir_index[snares] = (None, [], ['snare2.wav'], [])
+        self.assertEqual(self.bm._findSample('snares'), self._snare2)
+
+    def test_refresh(self):
+        """ Refreshing picks up new files in indexed directories """
+        self.assertEqual(self.bm._lookupSample('snares', 2), self._snare1)
+        self.assertFalse(self.bm.refresh())
+        snare0 = self.touch('snares/snare0.wav')
+        snares = join(self.wd, 'snares')
+        os.utime(snares, (0, 0))
+        self.assertTrue(self.bm.refresh())
+        self.assertEqual(self.bm._lookupSample('snares', 2), self._snare2)
+        self.assertEqual(self.bm._lookupSample('snares', 0), snare0)
+
+    def test_refresh_on_lookup(self):
+        """ New lookups pick up changes without a background thread """
+        self.assertEqual(self.bm._lookupSample('snares', 0), self._snare1)
+        snare0 = self.touch('snares/snare0.wav')
+        os.utime(join(self.wd, 'snares'), (0, 0))
+        self.assertEqual(self.bm._lookupSample('snares', 1), self._snare1)
+        self.assertEqual(self.bm._lookupSample('snares', 0), snare0)
+        self.assertIsNone(self.bm._refresh_thread)
+
+    def test_lookup_checks_needed_dirs(self):
+        """ A new lookup only reads the directories it needs again """
+        os.mkdir(join(self.wd, 'kicks'))
+        kick = self.touch('kicks/kick.wav')
+        self.assertEqual(self.bm._lookupSample('kicks'), kick)
+        self.assertEqual(self.bm._lookupSample('snares', 0), self._snare1)
+        kicks, snares = join(self.wd, 'kicks'), join(self.wd, 'snares')
+        os.utime(kicks, (0, 0))
+        os.utime(snares, (0, 0))
+        self.bm._lookupSample('snares', 1)
+        self.assertEqual(self.bm._dir_index[snares][0], os.stat(snares).st_mtime)
+        self.assertNotEqual(self.bm._dir_index[kicks][0], os.stat(kicks).st_mtime)
+        self.assertIn(('kicks', 0), self.bm._sample_cache)
+
+    def test_refresh_keeps_unchanged(self):
+        """ Refreshing only forgets lookups in directories that changed """
+        os.mkdir(join(self.wd, 'kicks'))
+        kick = self.touch('kicks/kick.wav')
+        self.bm._lookupSample('kicks')
+        self.bm._lookupSample('snares')
+        os.utime(join(self.wd, 'snares'), (0, 0))
+        self.assertTrue(self.bm.refresh())
+        self.assertEqual(self.bm._sample_cache, {('kicks', 0): kick})
+
+    def test_index_on_create(self):
+        """ The search paths are indexed in the background when created """
+        bm = BufferManager(paths=[self.wd])
+        bm._index_thread.join(5)
+        self.assertIn(join(self.wd, 'snares'), bm._dir_index)
+
+    def test_refresh_search_path(self):
+        """ Refreshing picks up new files in the search paths """
+        self.assertIsNone(self.bm._lookupSample('yeah'))
+        yeah = self.touch('yeah.wav')
+        os.utime(self.wd, (0, 0))
+        self.bm.refresh()
+        self.assertEqual(self.bm._lookupSample('yeah'), yeah)
@@ -0,0 +1,68 @@
+""" Tests for encoding OSC messages """
+import unittest
+
+from FoxDot.lib.OSC3 import OSCMessage, OSCBundle, OSCArgument, OSCString, OSCBlob, OSCTimeTag
+
+
+def concat(address, args, typehint=None):
+    """ Encodes a message one argument at a time """
+    typetags, message = ",", bytes()
+    for arg in args:
+        tag, binary = OSCArgument(arg, typehint)
+        typetags += tag
+        message += binary
+    return OSCString(address) + OSCString(typetags) + message
+
+
+class TestOSCMessage(unittest.TestCase):
+
+    """ Test that messages are encoded as individual arguments would be """
+    args = ["pads", 1001, 1, "bus", 4, "freq", 261.6, "a", "abcd", "abcdefgh", 0.0, -3]
+
+    def test_append_list(self):
+        msg = OSCMessage("/s_new")
+        msg.append(self.args)
+        self.assertEqual(msg.getBinary(), concat("/s_new", self.args))
+        self.assertEqual(len(msg), len(self.args))
+
+    def test_append_single(self):
+        msg = OSCMessage("/s_new")
+        for arg in self.args:
+            msg.append(arg)
+        self.assertEqual(msg.getBinary(), concat("/s_new", self.args))
+
+    def test_typehint(self):
+        msg = OSCMessage("/test")
+        msg.append([1, 2.5], "f")
+        self.assertEqual(msg.getBinary(), concat("/test", [1, 2.5], "f"))
+
+    def test_nested(self):
+        msg = OSCMessage("/test")
+        msg.append([1, [2.0, "x"], ("y", 3)])
+        self.assertEqual(msg.getBinary(), concat("/test", [1, 2.0, "x", "y", 3]))
+
+    def test_many_arguments(self):
+        """ The buffer grows to fit large messages """
+        args = list(range(1000)) + ["end"]
+        msg = OSCMessage("/test")
+        msg.append(args)
+        self.assertEqual(msg.getBinary(), concat("/test", args))
+
+    def test_copy(self):
+        msg = OSCMessage("/test")
+        msg.append(self.args)
+        other = msg.copy()
+        self.assertEqual(msg, other)
+        other.append(1)
+        self.assertNotEqual(msg, other)
+        self.assertEqual(other.typetags, msg.typetags + "i")
+
+    def test_bundle(self):
+        bundle = OSCBundle(time=1000.5)
+        for i in range(3):
+            msg = OSCMessage("/s_new")
+            msg.append(self.args)
+            bundle.append(msg)
+        binary = OSCString("#bundle") + OSCTimeTag(1000.5) + OSCBlob(concat("/s_new", self.args)) * 3
+        self.assertEqual(bundle.getBinary(), binary)
+        self.assertEqual(bundle.typetags, ",bbb")
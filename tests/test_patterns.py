@@ -0,0 +1,175 @@
+""" Tests for Pattern """
+import random
+import unittest
+
+from FoxDot.lib.Patterns import Pattern, P, PRand
+from FoxDot.lib.Patterns import Operations, Parse
+from FoxDot.lib.Patterns.PlayString import PlayString, ParseError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestMaterialize(unittest.TestCase):
+
+    """ Test the flattened form of nested Patterns """
+    def setUp(self):
+        super(TestMaterialize, self).setUp()
+        self.pat = P[0, [1, 2], (3, 4), [5, [6, 7, 8]]]
+        self.values = [self.pat.getitem(i) for i in range(2 * len(self.pat))]
+
+    def test_same_values(self):
+        """ Indexing a materialized Pattern gives the same values """
+        self.assertTrue(self.pat.materialize())
+        self.assertTrue(self.pat.is_materialized())
+        self.assertEqual([self.pat[i] for i in range(len(self.values))], self.values)
+        self.assertEqual(list(self.pat), self.values[:len(self.pat)])
+
+    def test_not_static(self):
+        """ Patterns containing generators are not materialized """
+        pat = P[0, 1, PRand(8)]
+        self.assertFalse(pat.materialize())
+        self.assertFalse(pat.is_materialized())
+
+    def test_max_size(self):
+        """ Patterns that expand beyond the maximum size are not materialized """
+        self.assertFalse(self.pat.materialize(max_size=len(self.pat) - 1))
+
+    def test_invalidate(self):
+        """ Changing a materialized Pattern discards the expanded values """
+        self.pat.materialize()
+        self.pat[0] = 9
+        self.assertFalse(self.pat.is_materialized())
+        self.assertEqual(self.pat[0], 9)
+        self.pat.materialize()
+        self.pat.append(10)
+        self.assertEqual(self.pat[4], 10)
+        self.pat.materialize()
+        self.pat.i_reverse()
+        self.assertEqual(self.pat[0], 10)
+
+    def test_true_copy(self):
+        """ Copies with new data are not materialized """
+        self.pat.materialize()
+        new = self.pat.true_copy([1, 2])
+        self.assertFalse(new.is_materialized())
+        self.assertEqual(len(new), 2)
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestNumpyOperations(unittest.TestCase):
+
+    """ Test that operations using NumPy give the same results as in Python """
+    def setUp(self):
+        super(TestNumpyOperations, self).setUp()
+        rand = random.Random(1)
+        self.patterns = [
+            P[range(-50, 50)],
+            P[[rand.randint(-5, 5) for _ in range(70)]],
+            P[[rand.uniform(-4, 4) for _ in range(96)]],
+            P[[rand.random() for _ in range(64)]] * 0,
+            P[[2, 1.5]],
+            P[[3]],
+        ]
+        self.threshold = Operations.NUMPY_THRESHOLD
+
+    def tearDown(self):
+        super(TestNumpyOperations, self).tearDown()
+        Operations.NUMPY_THRESHOLD = self.threshold
+
+    def results(self, op):
+        values = []
+        for a in self.patterns:
+            for b in self.patterns:
+                values.append(list(op(a, b)))
+                values.append(list(op(a, 2)))
+                values.append(list(op(3.5, b)))
+        return values
+
+    def assertSameResults(self, op):
+        fast = self.results(op)
+        Operations.NUMPY_THRESHOLD = float("inf")
+        slow = self.results(op)
+        self.assertEqual(fast, slow)
+        for x, y in zip(fast, slow):
+            self.assertEqual([type(value) for value in x], [type(value) for value in y])
+
+    def test_arithmetic(self):
+        """ Arithmetic operations match the element-wise Python operations """
+        self.assertSameResults(lambda a, b: a + b)
+        self.assertSameResults(lambda a, b: a - b)
+        self.assertSameResults(lambda a, b: a * b)
+        self.assertSameResults(lambda a, b: a / b)
+        self.assertSameResults(lambda a, b: a // b)
+        self.assertSameResults(lambda a, b: a % b)
+        self.assertSameResults(lambda a, b: a ** b)
+
+    def test_comparison(self):
+        """ Comparisons match the element-wise Python comparisons """
+        self.assertSameResults(lambda a, b: P[a] > b)
+        self.assertSameResults(lambda a, b: P[a] <= b)
+        self.assertSameResults(lambda a, b: P[a].eq(b))
+        self.assertSameResults(lambda a, b: P[a].ne(b))
+
+    def test_not_numeric(self):
+        """ Patterns containing other values are not operated on using NumPy """
+        pat = P[range(100)] + P[(0, 1), 2]
+        self.assertEqual(list(pat[0]), [0, 1])
+        self.assertEqual(pat[1], 3)
+
+
+class TestParsePlayString(unittest.TestCase):
+
+    """ Test parsing and caching sample player strings """
+    def setUp(self):
+        super(TestParsePlayString, self).setUp()
+        self.cache = Parse.play_string_cache
+        self.size = self.cache.size
+        self.cache.clear()
+
+    def tearDown(self):
+        self.cache.resize(self.size)
+        super(TestParsePlayString, self).tearDown()
+
+    def test_match_brackets(self):
+        """ Closing brackets are found for the same type of bracket only """
+        string = PlayString("(x[o)]<[-]>")
+        self.assertEqual(string.pairs, {0: 4, 2: 5, 6: 10, 7: 9})
+        self.assertEqual(string.index(")", 1), 4)
+        with self.assertRaises(ParseError):
+            string.index("]", 3, 4)
+
+    def test_parse(self):
+        """ Nested brackets are parsed into Patterns, PGroups and generators """
+        self.assertEqual(str(Pattern("x-o[--]")), "P['x', '-', 'o', P%('-', '-')]")
+        self.assertEqual(str(Pattern("(x )o")), "P[P['x', ' '], 'o']")
+        self.assertEqual(str(Pattern("<xo><-->")), "P[P[P('x', '-'), P('o', '-')]]")
+        self.assertIsInstance(Pattern("x{o-}")[1], str)
+        for string in ("x[o", "(x[o)]", "x<>", "x()", "{x"):
+            with self.assertRaises(ParseError):
+                Pattern(string)
+
+    def test_cache(self):
+        """ Parsing the same string again gives an equal copy from the cache """
+        first = Pattern("x-o[-(-=)]{xo}")
+        hits = self.cache.hits
+        second = Pattern("x-o[-(-=)]{xo}")
+        self.assertEqual(self.cache.hits, hits + 1)
+        self.assertEqual(str(first), str(second))
+        # Nothing is shared between the copies
+        self.assertIsNot(first.data[3], second.data[3])
+        self.assertIsNot(first.data[4], second.data[4])
+        second.data[4].getitem(0)
+        self.assertEqual(first.data[4].cache, {})
+
+    def test_lru(self):
+        """ The least recently used string is discarded when the cache is full """
+        self.cache.resize(2)
+        for string in ("x", "o", "x", "-"):
+            Pattern(string)
+        self.assertEqual(list(self.cache.items), ["x", "-"])
+        self.cache.resize(0)
+        Pattern("x")
+        self.assertEqual(len(self.cache), 0)
@@ -0,0 +1,299 @@
+""" Tests for Player """
+import unittest
+
+from FoxDot import Clock, Player, pads, pluck, bass
+from FoxDot.lib.TempoClock import TempoClock, Prerenderer, QueueBlock
+from FoxDot.lib.ServerManager import BusAllocator
+
+
+class DummyPrerenderer(Prerenderer):
+
+    """ Doesn't start a thread, rendering is done by the tests """
+    def request(self, player):
+        return
+
+
+class DummyClock(object):
+
+    """ Uses the real clock's server and tempo but doesn't schedule anything """
+    def __init__(self):
+        self.lookahead = 0
+        self.prerenderer = DummyPrerenderer()
+
+    def schedule(self, *args, **kwargs):
+        return
+
+    def __getattr__(self, name):
+        return getattr(Clock, name)
+
+
+class Block(object):
+
+    """ Stand-in for the QueueBlock a Player adds its messages to """
+    def __init__(self):
+        self.time = 1000.0
+        self.osc_messages = []
+
+
+class TestPrerender(unittest.TestCase):
+
+    """ Test working out a Player's events ahead of the clock """
+    def setUp(self):
+        super(TestPrerender, self).setUp()
+        self.clock = DummyClock()
+        # Players made at different times start on the same beat
+        beat = Clock.now()
+        self.clock.now = lambda: beat
+        # Use node and bus ids that don't affect other tests
+        self.server = Clock.server
+        self.server_state = (self.server.node, self.server.buses)
+        self.server.buses = BusAllocator(4, 100)
+
+    def tearDown(self):
+        self.server.node, self.server.buses = self.server_state
+        super(TestPrerender, self).tearDown()
+
+    def make_player(self):
+        player = Player()
+        player.__dict__["metro"] = self.clock
+        player >> pads([0, 1, [2, 3], (3, 5)], dur=[1, 1/2, [1/4, 1/4]], amp=[1, 0.5],
+                       pan=(-1, 1), sus=[1, 2], delay=[0, 0.25], hpf=[0, 500, [1000, 2000]])
+        return player
+
+    def play(self, player, prerender=False):
+        """ Plays one event and returns its position and (time, message) of each bundle """
+        # Use the same node and bus ids for rendered and live events
+        self.server.node = 5000
+        self.server.buses.clear()
+        if prerender:
+            player.prerender()
+        player.set_queue_block(Block())
+        player()
+        bundles = [(round(b.timetag - 1000.0, 9), b.message) for b in player.queue_block.osc_messages]
+        return player.event_n, player.event_index, bundles
+
+    def test_same_bundles(self):
+        """ Rendered events are the same as those worked out by the clock """
+        live = self.make_player()
+        expected = [self.play(live) for _ in range(24)]
+        self.clock.lookahead = 4
+        player = self.make_player()
+        self.assertTrue(player.can_prerender())
+        self.assertEqual([self.play(player, True) for _ in range(24)], expected)
+        self.assertEqual(self.clock.prerenderer.used, 24)
+
+    def test_lookahead(self):
+        """ Events are rendered up to `lookahead` beats ahead """
+        self.clock.lookahead = 2
+        player = self.make_player()
+        while player.prerender():
+            pass
+        self.assertTrue(len(player.rendered) > 1)
+        self.assertTrue(all(r.event_index < player.event_index + 2 for r in player.rendered))
+
+    def test_discard(self):
+        """ Changing an attribute discards the rendered events """
+        self.clock.lookahead = 4
+        player = self.make_player()
+        player.prerender()
+        player.amp = 0.5
+        self.assertEqual(player.rendered, [])
+
+    def test_live_state_unchanged(self):
+        """ Rendering never changes the event that other threads can read """
+        self.clock.lookahead = 4
+        player = self.make_player()
+        self.play(player)
+        state = (player.event_n, player.event, dict(player.event), player.sent_messages)
+        seen = []
+        get_bundle = self.server.get_bundle
+        def check(*args, **kwargs):
+            seen.append((player.event_n, player.event, dict(player.event), player.sent_messages))
+            return get_bundle(*args, **kwargs)
+        self.server.__dict__["get_bundle"] = check
+        try:
+            while player.prerender():
+                pass
+        finally:
+            del self.server.__dict__["get_bundle"]
+        self.assertTrue(len(player.rendered) > 1)
+        self.assertTrue(seen)
+        self.assertTrue(all(item[0] == state[0] and item[1] is state[1] and item[2] == state[2]
+                            and item[3] is state[3] for item in seen))
+        self.assertEqual((player.event_n, player.event, player.sent_messages), state[:2] + state[3:])
+
+    def test_lease_delay(self):
+        """ Buses of rendered notes with a delay are leased until the note has finished """
+        self.clock.lookahead = 4
+        player = self.make_player()
+        buses = self.server.buses
+        for _ in range(12):
+            player.prerender()
+            event_index = player.event_index
+            # The time the clock would stamp the block for this event with
+            block = Block()
+            block.time = Clock.beat_to_time(event_index)
+            player.set_queue_block(block)
+            player()
+            sus = Clock.beat_dur(player.event["sus"])
+            for bundle in block.osc_messages:
+                # Bundles are stamped with the block time plus any delay
+                end = bundle.timetag + sus * self.server.max_note_duration
+                self.assertIn(bundle.lease, buses.leases)
+                self.assertGreater(bundle.lease[0], end - 0.01)
+        self.assertEqual(self.clock.prerenderer.used, 12)
+
+    def test_discard_frees_buses(self):
+        """ Buses leased by rendered events are freed when they are discarded """
+        self.clock.lookahead = 4
+        player = self.make_player()
+        while player.prerender():
+            pass
+        self.assertGreater(self.server.buses.stats()["in_use"], 0)
+        player.amp = 0.5
+        self.assertEqual(self.server.buses.stats()["in_use"], 0)
+
+    def test_not_fixed(self):
+        """ Players using values from other players are not rendered """
+        self.clock.lookahead = 4
+        player = self.make_player()
+        player.pan = self.make_player().pan
+        self.assertFalse(player.can_prerender())
+        self.assertFalse(player.prerender())
+
+
+class TestCount(unittest.TestCase):
+
+    """ Test finding the event at a given beat """
+    def setUp(self):
+        super(TestCount, self).setUp()
+        self.player = Player()
+        self.player.__dict__["metro"] = DummyClock()
+        self.player >> pads(dur=[1, 1/2, [1/4, 3/4], 1/2])
+
+    def expected(self, now, event_after):
+        """ Steps through each event from 0 """
+        n, acc, durs = 0, 0, list(self.player.rhythm())
+        while acc + durs[n % len(durs)] <= now:
+            acc += durs[n % len(durs)]
+            n += 1
+        if event_after and acc != now:
+            acc += durs[n % len(durs)]
+            n += 1
+        return n, acc
+
+    def test_count(self):
+        """ The event index and start time match stepping through each event """
+        for i in range(200):
+            now = i * 0.125
+            for event_after in (False, True):
+                self.assertEqual(self.player.count(now, event_after), self.expected(now, event_after))
+
+    def test_rhythm_unchanged(self):
+        """ The same duration Pattern is used until 'dur' changes """
+        dur = self.player.rhythm()
+        self.assertIs(self.player.rhythm(), dur)
+        self.player.dur_updated()
+        self.assertFalse(self.player.dur_updated())
+        self.player.dur = [1, 2]
+        self.assertTrue(self.player.dur_updated())
+        self.assertEqual(self.player.count(4.5), (3, 4.0))
+
+
+class DummyQueue(object):
+
+    """ Stand-in for the Queue that creates QueueBlocks """
+    def get_server(self):
+        return None
+
+
+class TestFollow(unittest.TestCase):
+
+    """ Test players that use the values of other players """
+    def setUp(self):
+        super(TestFollow, self).setUp()
+        clock = DummyClock()
+        self.leader, self.follower = Player(), Player()
+        for player in (self.leader, self.follower):
+            player.__dict__["metro"] = clock
+        self.leader >> pads([0, 1, 2, 3])
+        self.follower >> pads(self.leader.degree + 2)
+
+    def test_leader_called_once(self):
+        """ A leader called after its follower works out its event once per block """
+        calculate_event = self.leader.calculate_event
+        calls = []
+        def count_calls():
+            calls.append(self.leader.event_n)
+            return calculate_event()
+        self.leader.__dict__["calculate_event"] = count_calls
+        for beat in range(4):
+            block = QueueBlock(DummyQueue(), self.follower, beat)
+            block.add(self.leader)
+            for player in (self.leader, self.follower):
+                player.set_queue_block(block)
+            for item in block:
+                if not block.called(item):
+                    block.call(item)
+            self.assertEqual(self.follower.event["degree"], self.leader.event["degree"] + 2)
+        self.assertEqual(calls, list(range(calls[0], calls[0] + 4)))
+
+    def test_order(self):
+        """ Leaders are called before the players that use their values """
+        other = Player()
+        other.__dict__["metro"] = self.follower.metro
+        other >> pads(self.follower.degree + self.leader.degree)
+        self.assertEqual(set(map(id, other.dependencies())), set(map(id, (self.leader, self.follower))))
+        block = QueueBlock(DummyQueue(), other, 0)
+        block.add(self.follower)
+        block.add(self.leader)
+        self.assertEqual([item.obj for item in block.ordered()], [self.leader, self.follower, other])
+        self.assertIn(self.leader, block)
+        self.assertFalse(block.already_called(self.leader))
+
+    def test_key_memo(self):
+        """ Values of keys are re-used until a PlayerKey changes """
+        key = self.leader.degree + 2
+        calls = []
+        key.calculate = lambda a, b: calls.append(b) or a + b
+        self.assertEqual(key.now(), 2)
+        self.assertEqual(key.now(), 2)
+        self.assertEqual(len(calls), 1)
+        self.leader.degree.set(5, 1)
+        self.assertEqual(key.now(), 7)
+        self.assertEqual(len(calls), 2)
+
+
+class TestRenderPlayers(unittest.TestCase):
+
+    """ Test calling independent players in a block at the same time """
+    def setUp(self):
+        super(TestRenderPlayers, self).setUp()
+        clock = DummyClock()
+        self.players = []
+        for synth in (pads, pluck, bass):
+            player = Player()
+            player.__dict__["metro"] = clock
+            player >> synth([0, 1, 2], dur=1/2)
+            self.players.append(player)
+        self.block = QueueBlock(DummyQueue(), self.players[0], 0)
+        for player in self.players[1:]:
+            self.block.add(player)
+        for player in self.players:
+            player.set_queue_block(self.block)
+
+    def test_independent(self):
+        """ Players that use each other's keys are not called at the same time """
+        self.assertEqual(len(self.block.independent()), 3)
+        self.players[2].degree = self.players[1].degree + 2
+        self.assertEqual([item.obj for item in self.block.independent()], [self.players[0]])
+
+    def test_message_order(self):
+        """ Messages are added to the block in the same order as the players """
+        clock = TempoClock()
+        clock.render_workers = 3
+        clock._TempoClock__render_players(self.block, self.block.independent())
+        names = [name for bundle in self.block.osc_messages for name in (b"pads", b"pluck", b"bass") if name in bundle.message]
+        self.assertEqual(names, [b"pads", b"pluck", b"bass"])
+        self.assertTrue(all(self.block.already_called(player) for player in self.players))
+        self.assertTrue(all(player.queue_block is self.block for player in self.players))
@@ -0,0 +1,471 @@
+""" Tests for encoding OSC bundles and tempo messages in the ServerManager """
+import io
+import json
+import socket
+import sys
+import threading
+import time
+import unittest
+
+from FoxDot.lib.ServerManager import BundleTemplate, OSCBundle, OSCMessage
+from FoxDot.lib.ServerManager import Message, read_from_socket, read_message, send_to_socket
+from FoxDot.lib.ServerManager import BusAllocator, ClockOffset, TempoClient, TempoServer
+from FoxDot.lib.TempoClock import TempoClock
+from FoxDot import Clock, SynthDefs
+
+if sys.version_info >= (3, 5):
+    from contextlib import redirect_stdout
+    from FoxDot.lib.AsyncServer import AsyncTempoServer
+
+
+def encode(messages):
+    """ Encodes a bundle one message at a time """
+    bundle = OSCBundle(time=0)
+    for address, args in messages:
+        msg = OSCMessage(address)
+        msg.append(args)
+        bundle.append(msg)
+    return bundle.message
+
+
+class TestBundleTemplate(unittest.TestCase):
+
+    """ Test that templates produce the same bytes as OSCMessage """
+    messages = [("/g_new", [1001, 1, 1]),
+                ("/s_new", ["startSound", 1002, 0, 1001, "bus", 4, "sus", 8.0]),
+                ("/s_new", ["pads", 1003, 1, 1001, "bus", 4, "freq", 261.6, "amp", 0.5]),
+                ("/s_new", ["makeSound", 1004, 1, 1001, "bus", 4, "sus", 1.0])]
+
+    def test_pack(self):
+        """ Packed numbers match the normal encoding """
+        shape, numbers = BundleTemplate.get_shape(self.messages)
+        template = BundleTemplate(shape)
+        self.assertEqual(template.pack(numbers), encode(self.messages))
+        self.assertEqual(template.typetags, ",bbbb")
+
+    def test_shape(self):
+        """ Bundles with different values but the same types share a shape """
+        other = [(address, [arg * 2 if type(arg) is not str else arg for arg in args]) for address, args in self.messages]
+        shape, numbers = BundleTemplate.get_shape(other)
+        self.assertEqual(shape, BundleTemplate.get_shape(self.messages)[0])
+        self.assertEqual(BundleTemplate(shape).pack(numbers), encode(other))
+
+    def test_number_types(self):
+        """ An int and a float in the same place give different shapes """
+        a, _ = BundleTemplate.get_shape([("/s_new", ["pads", 1, "amp", 1])])
+        b, _ = BundleTemplate.get_shape([("/s_new", ["pads", 1, "amp", 1.0])])
+        self.assertNotEqual(a, b)
+
+    def test_unsupported_type(self):
+        """ Values that aren't strings or numbers don't have a shape """
+        self.assertEqual(BundleTemplate.get_shape([("/s_new", ["pads", None])]), (None, None))
+
+
+class ReversedCodec(object):
+    """ Codec that stores text backwards to check that the codec is used """
+    def encode(self, data):
+        return data[::-1].encode("utf-8")
+
+    def decode(self, data):
+        return data.decode("utf-8")[::-1]
+
+
+class TestTempoMessages(unittest.TestCase):
+
+    """ Test the framing of messages sent between TempoServer and TempoClient """
+    def setUp(self):
+        super(TestTempoMessages, self).setUp()
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+        super(TestTempoMessages, self).tearDown()
+
+    def test_round_trip(self):
+        """ Data is decoded as it was sent """
+        data = {"sync": {"bpm": [120, 1], "beat": [7, 2]}}
+        send_to_socket(self.sender, data)
+        send_to_socket(self.sender, ["init"])
+        self.assertEqual(read_from_socket(self.receiver), data)
+        self.assertEqual(read_from_socket(self.receiver), ["init"])
+
+    def test_large_message(self):
+        """ Messages longer than 9999 bytes can be sent """
+        data = {"request": ["bpm"] * 5000}
+        thread = threading.Thread(target=send_to_socket, args=(self.sender, data))
+        thread.start()
+        self.assertEqual(read_from_socket(self.receiver), data)
+        thread.join()
+
+    def test_partial_reads(self):
+        """ A message split across several packets is read whole """
+        packet = Message({"new_bpm": 140}).encode()
+        def send():
+            for i in range(len(packet)):
+                self.sender.send(packet[i:i+1])
+                time.sleep(0.001)
+        thread = threading.Thread(target=send)
+        thread.start()
+        self.assertEqual(read_from_socket(self.receiver), {"new_bpm": 140})
+        thread.join()
+
+    def test_legacy_header(self):
+        """ Messages from older versions with a 4 digit length can be read """
+        data = json.dumps({"new_bpm": 90})
+        self.sender.send("{:04d}{}".format(len(data), data).encode())
+        self.assertEqual(read_from_socket(self.receiver), {"new_bpm": 90})
+
+    def test_send_legacy(self):
+        """ Messages for older versions are sent as JSON with a 4 digit length """
+        send_to_socket(self.sender, {"new_bpm": 90}, ReversedCodec(), legacy=True)
+        packet = self.receiver.recv(100)
+        self.assertEqual(int(packet[:4]), len(packet) - 4)
+        self.assertEqual(json.loads(packet[4:].decode()), {"new_bpm": 90})
+        with self.assertRaises(ValueError):
+            Message({"padding": "x" * 10000}, legacy=True).encode()
+
+    def test_codec(self):
+        """ Data is encoded using the given codec """
+        send_to_socket(self.sender, "tempo", ReversedCodec())
+        self.assertEqual(self.receiver.recv(9)[4:], b"opmet")
+        send_to_socket(self.sender, "tempo", ReversedCodec())
+        self.assertEqual(read_from_socket(self.receiver, ReversedCodec()), "tempo")
+
+    def test_closed(self):
+        """ Reading from a closed connection returns None """
+        send_to_socket(self.sender, ["init"])
+        self.sender.close()
+        self.assertEqual(read_from_socket(self.receiver), ["init"])
+        self.assertIsNone(read_from_socket(self.receiver))
+
+
+class TestBusAllocator(unittest.TestCase):
+
+    """ Test leasing audio buses to notes """
+    def test_range(self):
+        """ Pairs of buses are used from `first` up to `last` """
+        buses = BusAllocator(4, 12)
+        self.assertEqual([buses.lease(0, now=0) for _ in range(4)], [4, 6, 8, 10])
+
+    def test_no_reuse_while_playing(self):
+        """ A bus isn't reused until its note has finished """
+        buses = BusAllocator(4, 10)
+        long_note = buses.lease(100, now=0)
+        used = [buses.lease(t + 1, now=t) for t in range(20)]
+        self.assertNotIn(long_note, used)
+        self.assertEqual(buses.overflows, 0)
+
+    def test_free_list(self):
+        """ Buses are reused in the order they were freed """
+        buses = BusAllocator(4, 10)
+        for until in (3, 1, 2):
+            buses.lease(until, now=0)
+        self.assertEqual(buses.lease(10, now=5), 6)
+        self.assertEqual(buses.lease(10, now=5), 8)
+        self.assertEqual(buses.lease(10, now=5), 4)
+
+    def test_overflow(self):
+        """ When all buses are in use, the one finishing soonest is reused """
+        buses = BusAllocator(4, 8)
+        buses.lease(20, now=0)
+        buses.lease(10, now=0)
+        self.assertEqual(buses.lease(30, now=1), 6)
+        self.assertEqual(buses.overflows, 1)
+        self.assertEqual(buses.peak, 2)
+
+    def test_threads(self):
+        """ Buses leased from several threads at once are all different """
+        buses = BusAllocator(0, 8002)
+        leased = []
+        def lease():
+            leased.extend(buses.lease(float("inf")) for _ in range(1000))
+        threads = [threading.Thread(target=lease) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(leased)), 4000)
+        self.assertEqual(buses.stats()["in_use"], 4000)
+
+
+def ping(offset, sent, delay, server_time=0.0):
+    """ Returns the times of a ping to a server `offset` seconds ahead """
+    return sent, sent + offset + delay * 0.5, sent + offset + delay * 0.5 + server_time, sent + delay + server_time
+
+
+class TestClockOffset(unittest.TestCase):
+
+    """ Test estimating the offset from a server clock """
+    def test_offset(self):
+        """ The offset and delay are calculated from the times of a ping """
+        estimate = ClockOffset()
+        self.assertTrue(estimate.add(*ping(2.0, 100.0, 0.01, 0.001)))
+        self.assertAlmostEqual(estimate.offset, 2.0)
+        self.assertAlmostEqual(estimate.delay, 0.01)
+
+    def test_min_delay(self):
+        """ The sample with the smallest delay is used """
+        estimate = ClockOffset()
+        for sent, delay, error in ((0, 0.02, 0.008), (1, 0.004, 0.001), (2, 0.01, -0.004)):
+            t0, t1, t2, t3 = ping(2.0, sent, delay)
+            estimate.add(t0, t1 + error, t2 + error, t3)
+        self.assertAlmostEqual(estimate.offset, 2.001)
+        self.assertAlmostEqual(estimate.delay, 0.004)
+        self.assertGreater(estimate.jitter, 0)
+
+    def test_outlier(self):
+        """ A single sample far from the estimate is rejected """
+        estimate = ClockOffset()
+        for sent in range(4):
+            estimate.add(*ping(2.0, sent, 0.002))
+        self.assertFalse(estimate.add(*ping(2.5, 4, 0.002)))
+        self.assertAlmostEqual(estimate.offset, 2.0)
+        self.assertEqual(estimate.stats()["rejected"], 1)
+
+    def test_step(self):
+        """ The estimate changes when several samples in a row agree on a new offset """
+        estimate = ClockOffset(max_spikes=3)
+        for sent in range(4):
+            estimate.add(*ping(2.0, sent, 0.001))
+        results = [estimate.add(*ping(2.5, sent, 0.002)) for sent in range(4, 7)]
+        self.assertEqual(results, [False, False, True])
+        self.assertAlmostEqual(estimate.offset, 2.5)
+        self.assertEqual(len(estimate.samples), 1)
+
+
+class TestTempoSync(unittest.TestCase):
+
+    """ Test syncing a TempoClock to a TempoServer over the loopback interface """
+    def test_ping(self):
+        """ The client keeps estimating the offset from the server """
+        server_clock, client_clock = TempoClock(), TempoClock()
+        server_clock.start_tempo_server(TempoServer, port=0)
+        port = server_clock.tempo_server.server_address[1]
+        client = TempoClient(client_clock, ping_interval=0.01)
+        try:
+            client.connect("127.0.0.1", port)
+            deadline = time.time() + 5
+            while client.clock_offset.count < 5 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            client.kill()
+            server_clock.kill_tempo_server()
+        stats = client.stats()
+        self.assertGreaterEqual(stats["samples"], 5)
+        # Both clocks are on the same machine
+        self.assertLess(abs(stats["offset"]), 0.01)
+        self.assertLess(abs(stats["hard_nudge"]), 0.01)
+
+    def test_legacy_client(self):
+        """ Clients from older versions get replies with a 4 digit header """
+        server_clock = TempoClock()
+        server_clock.start_tempo_server(TempoServer, port=0)
+        listener = Listener(server_clock.tempo_server.server_address[1], legacy=True)
+        try:
+            self.assertIn("clock_time", listener.clock_time)
+            send_to_socket(listener.socket, {"request": ["bpm"]}, legacy=True)
+            data, legacy = read_message(listener.socket)
+        finally:
+            listener.close()
+            server_clock.kill_tempo_server()
+        self.assertTrue(listener.legacy)
+        self.assertIn("bpm", data["sync"])
+        self.assertTrue(legacy)
+
+    def test_legacy_server(self):
+        """ Clients use 4 digit headers when connected to an older version """
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        received = []
+        def serve():
+            conn, addr = server.accept()
+            # Older versions reply to any message with the clock time
+            received.append(read_message(conn))
+            send_to_socket(conn, {"clock_time": time.time()}, legacy=True)
+            received.append(read_message(conn))
+            conn.close()
+        thread = threading.Thread(target=serve)
+        thread.start()
+        client = TempoClient(TempoClock(), ping_interval=0.01)
+        try:
+            client.connect("127.0.0.1", server.getsockname()[1])
+            client.send({"request": ["bpm"]})
+            thread.join(5)
+        finally:
+            client.kill()
+            server.close()
+        self.assertTrue(client.legacy)
+        self.assertEqual(received, [(["init", "binary"], True), ({"request": ["bpm"]}, True)])
+
+
+class Listener(threading.Thread):
+    """ Connects to a tempo server like a TempoClient and stores the messages it receives.
+        If `legacy` is True it connects like an older version of FoxDot """
+    def __init__(self, port, recv_buffer=None, legacy=False):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if recv_buffer is not None:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer)
+        self.socket.connect(("127.0.0.1", port))
+        self.received = []
+        send_to_socket(self.socket, ["init"], legacy=legacy)
+        self.clock_time, self.legacy = read_message(self.socket)
+
+    def run(self):
+        while True:
+            data, legacy = read_message(self.socket)
+            if data is None or legacy != self.legacy:
+                break
+            self.received.append(data)
+
+    def close(self):
+        self.socket.close()
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "asyncio needs Python 3.5")
+class TestAsyncTempoServer(unittest.TestCase):
+
+    """ Test the asyncio tempo server with many connected peers """
+    def setUp(self):
+        super(TestAsyncTempoServer, self).setUp()
+        self.clock = TempoClock()
+        self.server = AsyncTempoServer(self.clock, port=0, queue_size=32, send_timeout=0.2)
+        self.server.start()
+        self.port = self.server.server_address[1]
+        self.listeners = []
+
+    def tearDown(self):
+        for listener in self.listeners:
+            listener.close()
+        self.server.kill()
+        super(TestAsyncTempoServer, self).tearDown()
+
+    def connect(self, n, recv_buffer=None):
+        listeners = [Listener(self.port, recv_buffer) for _ in range(n)]
+        self.listeners.extend(listeners)
+        return listeners
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_broadcast(self):
+        """ Tempo changes are sent to every peer """
+        listeners = self.connect(30)
+        for listener in listeners:
+            self.assertIn("clock_time", listener.clock_time)
+            listener.start()
+        self.assertTrue(self.wait_for(lambda: len(self.server.peers) == 30))
+        for bpm in (100, 110, 120):
+            self.server.update_tempo(bpm)
+        expected = [{"new_bpm": 100}, {"new_bpm": 110}, {"new_bpm": 120}]
+        self.assertTrue(self.wait_for(lambda: all(len(l.received) == 3 for l in listeners)))
+        self.assertTrue(all(l.received == expected for l in listeners))
+
+    def test_legacy_peers(self):
+        """ Peers from older versions are sent tempo changes with a 4 digit header """
+        legacy = [Listener(self.port, legacy=True) for _ in range(3)]
+        self.listeners.extend(legacy)
+        listeners = legacy + self.connect(3)
+        for listener in listeners:
+            listener.start()
+        self.assertTrue(all(l.legacy for l in legacy))
+        self.assertFalse(any(l.legacy for l in listeners[3:]))
+        self.assertTrue(self.wait_for(lambda: len(self.server.peers) == 6))
+        self.server.update_tempo(100)
+        self.assertTrue(self.wait_for(lambda: all(l.received == [{"new_bpm": 100}] for l in listeners)))
+
+    def test_tempo_client(self):
+        """ A TempoClient can sync to the server """
+        client = TempoClient(TempoClock(), ping_interval=0.01)
+        client.connect("127.0.0.1", self.port)
+        try:
+            self.assertTrue(self.wait_for(lambda: client.clock_offset.count >= 5))
+        finally:
+            client.kill()
+        self.assertLess(abs(client.stats()["offset"]), 0.01)
+
+    def test_evict_stalled_peer(self):
+        """ A peer that stops reading is removed without holding up the others """
+        stalled, = self.connect(1, recv_buffer=4096)
+        listeners = self.connect(5)
+        for listener in listeners:
+            listener.start()
+        self.assertTrue(self.wait_for(lambda: len(self.server.peers) == 6))
+        peers = list(self.server.peers)
+        # Send more than fits in the socket buffers
+        data = {"padding": "x" * 250000}
+        output = io.StringIO()
+        with redirect_stdout(output):
+            for _ in range(30):
+                self.server.broadcast(data)
+            self.assertTrue(self.wait_for(lambda: all(len(l.received) == 30 for l in listeners)))
+            self.assertTrue(self.wait_for(lambda: self.server.stats()["evicted"] == 1))
+        self.assertEqual(len(self.server.peers), 5)
+        self.assertIn("Warning: Client disconnected", output.getvalue())
+        # The writer task that evicted the peer finishes without being cancelled
+        evicted, = [peer for peer in peers if peer.closed]
+        self.assertTrue(self.wait_for(lambda: evicted.task.done()))
+        self.assertFalse(evicted.task.cancelled())
+        self.assertIsNone(evicted.task.exception())
+
+    def test_disconnect(self):
+        """ Peers that close their connection are removed """
+        listeners = self.connect(5)
+        self.assertTrue(self.wait_for(lambda: len(self.server.peers) == 5))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            for listener in listeners[:2]:
+                listener.close()
+            self.assertTrue(self.wait_for(lambda: len(self.server.peers) == 3))
+        # Peers disconnecting normally are only reported when debugging
+        self.assertEqual(output.getvalue(), "")
+
+
+class TestDirectBundle(unittest.TestCase):
+
+    """ Test playing notes without effects with a single synth node """
+    packet = {"freq": 261.6, "amp": 1.0, "sus": 1.0, "pan": -1.0}
+
+    def setUp(self):
+        super(TestDirectBundle, self).setUp()
+        self.server = Clock.server
+
+    def get_binary(self, synthdef, effects, direct):
+        return self.server.get_bundle(synthdef, dict(self.packet), effects, timestamp=1.0, direct=direct).getBinary()
+
+    def test_direct(self):
+        """ A note without effects is a single /s_new for the direct SynthDef """
+        allocated = self.server.buses.allocated
+        data = self.get_binary("pads", {}, True)
+        self.assertEqual(data.count(b"/s_new"), 1)
+        self.assertNotIn(b"/g_new", data)
+        self.assertIn(b"pads_direct", data)
+        self.assertEqual(self.server.buses.allocated, allocated)
+
+    def test_effects(self):
+        """ Notes with effects use a group and bus """
+        data = self.get_binary("pads", {"room": ["room", 0.5, "mix", 0.2]}, True)
+        self.assertIn(b"/g_new", data)
+        self.assertNotIn(b"pads_direct", data)
+
+    def test_not_direct(self):
+        """ Players use a group and bus unless `direct` is set """
+        self.assertEqual(self.get_binary("pads", {}, False).count(b"/s_new"), 3)
+
+    def test_file_synthdef(self):
+        """ SynthDefs loaded from a file don't have a direct version """
+        self.assertIsNone(SynthDefs["sawbass"].direct_name)
+        self.assertIn(b"/g_new", self.get_binary("sawbass", {}, True))
+
+    def test_synthdef_string(self):
+        """ The direct version reads its frequency from an argument and writes to the output """
+        code = str(SynthDefs["pads"]).split("SynthDef.new(\\pads_direct,")[1]
+        self.assertNotIn("In.kr(bus", code)
+        self.assertIn("Out.ar(0, osc)", code)
+        self.assertIn("doneAction: 2", code)
@@ -0,0 +1,313 @@
+""" Tests for the TempoClock event queue """
+from __future__ import division
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from FoxDot.lib.TempoClock import Queue, QueueBlock, DispatchPool, History, TempoClock
+from FoxDot.lib.ServerManager import OSCBundle, OSCMessage
+
+
+class DummyClock(object):
+    server = None
+
+    def get_server(self):
+        return self.server
+
+
+class DummyClient(object):
+
+    """ Stores the binary data of each packet sent """
+    def __init__(self):
+        self.sent = []
+
+    def send(self, msg):
+        self.sent.append(msg.getBinary())
+
+    def send_binary(self, data):
+        self.sent.append(data)
+        return True
+
+
+class DummyServer(object):
+    def __init__(self):
+        self.client = DummyClient()
+        self.sclang = DummyClient()
+
+
+def event():
+    return
+
+
+class TestQueue(unittest.TestCase):
+
+    """ Test scheduling order and coalescing of QueueBlocks """
+    def setUp(self):
+        super(TestQueue, self).setUp()
+        self.queue = Queue(DummyClock())
+
+    def test_empty(self):
+        """ An empty queue has no next event """
+        self.assertEqual(self.queue.next(), sys.maxsize)
+        self.assertEqual(self.queue.pop(), [])
+
+    def test_pop_in_beat_order(self):
+        """ Blocks are popped earliest beat first regardless of insert order """
+        for beat in (8, 2, 5, 1, 3):
+            self.queue.add(event, beat)
+        self.assertEqual(self.queue.next(), 1)
+        beats = [self.queue.pop().beat for _ in range(5)]
+        self.assertEqual(beats, [1, 2, 3, 5, 8])
+
+    def test_coalesce_same_beat(self):
+        """ Events scheduled at the same beat share a block """
+        self.queue.add(event, 4)
+        self.queue.add(lambda: None, 4.0)
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(len(self.queue.pop()), 2)
+
+    def test_new_block_after_pop(self):
+        """ Scheduling at a beat that was already popped creates a new block """
+        self.queue.add(event, 4)
+        self.queue.pop()
+        self.queue.add(event, 4)
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(self.queue.next(), 4)
+
+    def test_clear(self):
+        """ Clearing the queue removes all blocks """
+        self.queue.add(event, 1)
+        self.queue.add(event, 2)
+        self.queue.clear()
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(self.queue.next(), sys.maxsize)
+
+    def test_tick_resolution(self):
+        """ With a tick resolution, float rounding errors share a block """
+        self.queue.set_resolution(1920)
+        self.queue.add(event, 1/3 + 1/3 + 1/3)
+        self.queue.add(event, 1)
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(self.queue.pop().beat, 1)
+
+    def test_wait_woken_by_earlier_event(self):
+        """ Waiting for an event returns early when an earlier one is added """
+        self.queue.add(event, 10)
+        timer = threading.Timer(0.05, self.queue.add, args=(event, 5))
+        timer.start()
+        start = time.time()
+        self.queue.wait(10, 5)
+        timer.join()
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(self.queue.next(), 5)
+
+    def test_wait_skipped_if_earlier_event(self):
+        """ Waiting does not block if an earlier event is already queued """
+        self.queue.add(event, 2)
+        start = time.time()
+        self.queue.wait(10, 5)
+        self.assertLess(time.time() - start, 1)
+
+
+class Message(object):
+
+    """ Stand-in for an OSCMessage with a fixed encoding """
+    def __init__(self, data, address="/s_new"):
+        self.data = data
+        self.address = address
+
+    def getBinary(self):
+        return self.data
+
+
+class TestHistory(unittest.TestCase):
+
+    """ Test the bounded store of sent osc messages """
+    def test_max_beats(self):
+        """ Packets older than `max_beats` before the latest are dropped """
+        history = History(max_beats=4, max_bytes=None)
+        for beat in range(10):
+            history.add(beat, [Message(b"abcd")])
+        self.assertEqual([item[0] for item in history], [5, 6, 7, 8, 9])
+
+    def test_max_bytes(self):
+        """ The oldest packets are dropped to stay within `max_bytes` """
+        history = History(max_bytes=10)
+        for beat in range(10):
+            history.add(beat, [Message(b"abcd")])
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history.size, 8)
+
+    def test_dump_and_load(self):
+        """ A range of packets can be written to and read from a file """
+        history = History()
+        history.add(1, [Message(b"one")])
+        history.add(2, [Message(b"two"), Message(b"midi", "/foxdot_midi")])
+        history.add(3, [Message(b"three")])
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            history.dump(filename, 2, 3)
+            loaded = History.load(filename)
+        finally:
+            os.remove(filename)
+        self.assertEqual(list(loaded), [(2, False, b"two"), (2, True, b"midi")])
+
+    def test_replay(self):
+        """ Stored packets are sent again to the client they were first sent to """
+        history = History()
+        history.add(1, [Message(b"one")])
+        history.add(2, [Message(b"two"), Message(b"midi", "/foxdot_midi")])
+        server = DummyServer()
+        history.replay(server, 2)
+        self.assertEqual(server.client.sent, [b"two"])
+        self.assertEqual(server.sclang.sent, [b"midi"])
+
+
+def note(timetag, *nodes):
+    """ Returns a bundle like those created for a note by the ServerManager """
+    bundle = OSCBundle(time=timetag)
+    for node in nodes:
+        for address, args in (("/g_new", [node, 1, 1]), ("/s_new", ["pads", node + 1, 1, node, "freq", 440.0])):
+            msg = OSCMessage(address)
+            msg.append(args)
+            bundle.append(msg)
+    return bundle
+
+
+class TestQueueBlockSend(unittest.TestCase):
+
+    """ Test sending the osc messages for a QueueBlock """
+    def setUp(self):
+        super(TestQueueBlockSend, self).setUp()
+        clock = DummyClock()
+        clock.server = DummyServer()
+        self.block = QueueBlock(clock, event, 0)
+        self.block.osc_messages = [note(10.0, 1000), note(10.0, 1010), note(10.5, 1020), note(10.0, 1030)]
+        self.sent = clock.server.client.sent
+
+    def test_unbatched(self):
+        """ Each bundle is sent on its own """
+        self.block.send_osc_messages()
+        self.assertEqual(self.block.datagrams, 4)
+        self.assertEqual(self.sent, [msg.getBinary() for msg in self.block.osc_messages])
+        self.assertEqual(self.block.bytes_sent, sum(len(data) for data in self.sent))
+
+    def test_batched(self):
+        """ Bundles with the same time tag are merged """
+        self.block.send_osc_messages(batch=True)
+        self.assertEqual(self.block.datagrams, 2)
+        self.assertEqual(self.sent[0], note(10.0, 1000, 1010, 1030).getBinary())
+        self.assertEqual(self.sent[1], self.block.osc_messages[2].getBinary())
+
+    def test_packets(self):
+        """ The encoded packets are kept for the clock's history """
+        self.block.send_osc_messages(batch=True)
+        self.assertEqual([data for midi, data in self.block.packets], self.sent)
+        history = History()
+        history.add_packets(1, self.block.packets)
+        self.assertEqual([item[2] for item in history], self.sent)
+
+    def test_batched_max_size(self):
+        """ A new bundle is started when the maximum size is reached """
+        size = len(self.block.osc_messages[0].getBinary())
+        self.block.send_osc_messages(batch=True, max_size=2 * size - 16)
+        self.assertEqual(self.block.datagrams, 3)
+        self.assertTrue(all(len(data) <= 2 * size - 16 for data in self.sent))
+
+
+class TestDispatchPool(unittest.TestCase):
+
+    """ Test the threads that process queue blocks """
+    def test_submit(self):
+        """ Submitted blocks are processed and counted """
+        pool = DispatchPool(2)
+        done = threading.Event()
+        processed = []
+        def run_block(block):
+            processed.append(block)
+            if len(processed) == 3:
+                done.set()
+        for block in range(3):
+            pool.submit(run_block, block)
+        self.assertTrue(done.wait(2))
+        self.assertEqual(sorted(processed), [0, 1, 2])
+        self.assertEqual(pool.stats()["dispatched"], 3)
+
+    def test_resize(self):
+        """ Changing the size adds threads """
+        pool = DispatchPool(1)
+        pool.start()
+        pool.resize(3)
+        self.assertEqual(pool.stats()["workers"], 3)
+
+    def busy_pool(self, size):
+        """ Returns a pool whose threads are all waiting on an event """
+        pool = DispatchPool(size)
+        release = threading.Event()
+        started = []
+        for block in range(size):
+            pool.submit(lambda block: (started.append(block), release.wait(2)), block)
+        deadline = time.time() + 2
+        while len(started) < size and time.time() < deadline:
+            time.sleep(0.001)
+        return pool, release
+
+    def wait_for_threads(self, pool, n):
+        deadline = time.time() + 2
+        while len(pool.threads) != n and time.time() < deadline:
+            time.sleep(0.001)
+        return len(pool.threads)
+
+    def test_shrink_twice(self):
+        """ Shrinking while threads are busy only stops the surplus threads """
+        pool, release = self.busy_pool(4)
+        pool.resize(2)
+        pool.resize(1)
+        release.set()
+        self.assertEqual(self.wait_for_threads(pool, 1), 1)
+        done = threading.Event()
+        pool.submit(lambda block: done.set(), None)
+        self.assertTrue(done.wait(2))
+
+    def test_shrink_then_grow(self):
+        """ Growing again cancels stops that have not been taken """
+        pool, release = self.busy_pool(4)
+        pool.resize(1)
+        pool.resize(3)
+        self.assertEqual(pool.stats()["workers"], 3)
+        release.set()
+        time.sleep(0.05)
+        self.assertEqual(self.wait_for_threads(pool, 3), 3)
+
+
+class TestAdjustNudge(unittest.TestCase):
+
+    """ Test slewing the hard nudge towards the offset from a TempoServer """
+    def setUp(self):
+        super(TestAdjustNudge, self).setUp()
+        self.clock = TempoClock()
+
+    def test_first_step(self):
+        """ The first estimate is used straight away """
+        self.clock.adjust_nudge(0.05)
+        self.assertEqual(self.clock.hard_nudge, 0.05)
+
+    def test_slew(self):
+        """ Later estimates are approached by at most `nudge_slew` seconds per second """
+        self.clock.adjust_nudge(0.05)
+        self.clock.nudge_time -= 2
+        self.clock.adjust_nudge(0.06)
+        self.assertAlmostEqual(self.clock.hard_nudge, 0.05 + 2 * self.clock.nudge_slew, places=4)
+        self.clock.nudge_time -= 100
+        self.clock.adjust_nudge(0.06)
+        self.assertAlmostEqual(self.clock.hard_nudge, 0.06)
+
+    def test_large_step(self):
+        """ Estimates more than `nudge_step` away are used straight away """
+        self.clock.adjust_nudge(0.05)
+        self.clock.adjust_nudge(0.5)
+        self.assertEqual(self.clock.hard_nudge, 0.5)
@@ -0,0 +1,75 @@
+""" Tests for TimeVar """
+import unittest
+
+from FoxDot.lib.TimeVar import TimeVar, linvar, var
+
+
+class DummyClock(object):
+
+    """ A clock that is already ticking and whose beat is set by the tests """
+    ticking = True
+    bpm = 120
+
+    def __init__(self):
+        self.beat = 0
+
+    def now(self):
+        return self.beat
+
+    def bar_length(self):
+        return 4
+
+
+class TestTimeVar(unittest.TestCase):
+
+    """ Test finding the current value of a TimeVar """
+    def setUp(self):
+        super(TestTimeVar, self).setUp()
+        self.metro = TimeVar.metro
+        self.clock = DummyClock()
+        TimeVar.set_clock(self.clock)
+
+    def tearDown(self):
+        TimeVar.set_clock(self.metro)
+        super(TestTimeVar, self).tearDown()
+
+    def expected(self, durs, time):
+        """ Steps through each duration from 0 """
+        i, acc = 0, 0
+        while acc + durs[i % len(durs)] <= time:
+            acc += durs[i % len(durs)]
+            i += 1
+        return i
+
+    def test_index(self):
+        """ The current index matches stepping through the durations """
+        durs = [4, 2, 0, 1.5, 0.5]
+        tv = var([0, 1, 2, 3, 4], durs)
+        for i in range(200):
+            time = i * 0.25
+            self.assertEqual(tv.get_current_index(time), self.expected(durs, time))
+
+    def test_proportion(self):
+        """ A linvar is interpolated between the current and next values """
+        tv = linvar([0, 8], [4, 4])
+        self.assertEqual(tv.now(1), 2)
+        self.assertEqual(tv.now(6), 4)
+        self.assertEqual(tv.now(9), 2)
+
+    def test_memoize(self):
+        """ Values are re-used for the same beat and updated when the beat changes """
+        tv = var([0, 1], 2)
+        self.clock.beat = 2
+        self.assertEqual(tv.now(), 1)
+        tv.proportion = None
+        self.assertEqual(tv.now(), 1)
+        self.assertEqual(tv.proportion, 0)
+        self.clock.beat = 4
+        self.assertEqual(tv.now(), 0)
+
+    def test_update(self):
+        """ Updating the durations changes the current index """
+        tv = var([0, 1, 2], [1, 1, 1])
+        self.assertEqual(tv.now(1), 1)
+        tv.update([0, 1, 2], [2, 1, 1])
+        self.assertEqual(tv.now(1), 0)
@@ -0,0 +1,40 @@
+""" Tests for the pattern utility functions """
+import unittest
+
+from FoxDot.lib.Patterns import PGroup
+from FoxDot.lib.Utils import LCM, get_expanded_len
+
+
+class TestLCM(unittest.TestCase):
+
+    """ Test the lowest common multiple of pattern lengths """
+    def test_values(self):
+        """ Zeros are ignored and no arguments returns 1 """
+        self.assertEqual(LCM(), 1)
+        self.assertEqual(LCM(0, 0), 1)
+        self.assertEqual(LCM(5), 5)
+        self.assertEqual(LCM(4, 6, 0), 12)
+        self.assertEqual(LCM(2, 2, 4), 4)
+
+    def test_coprime(self):
+        """ Large co-prime lengths are found without iterating """
+        self.assertEqual(LCM(127, 128, 129), 127 * 128 * 129)
+
+
+class TestExpandedLen(unittest.TestCase):
+
+    """ Test the expanded length of event values """
+    def test_values(self):
+        """ Nested groups multiply the length """
+        self.assertEqual(get_expanded_len(0.5), 1)
+        self.assertEqual(get_expanded_len("x"), 1)
+        self.assertEqual(get_expanded_len((0, (0, 2))), 4)
+        self.assertEqual(get_expanded_len(PGroup(0, PGroup(0, 2))), 4)
+
+    def test_cached(self):
+        """ The length of a PGroup is stored until it is changed """
+        group = PGroup(0, PGroup(1, 2, 3))
+        self.assertEqual(get_expanded_len(group), 6)
+        self.assertEqual(group._expanded_len, 6)
+        group.extend([4])
+        self.assertEqual(get_expanded_len(group), 9)